@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import time
+
+
+# ナノ秒単位の時刻取得関数 (Python 3.7以降、3.6では秒の値から換算する)
+if hasattr(time, 'perf_counter_ns'):
+    perf_counter_ns = time.perf_counter_ns
+    monotonic_ns = time.monotonic_ns
+else:
+    def perf_counter_ns():
+        """time.perf_counter()をナノ秒の整数で返す
+        """
+        return int(time.perf_counter() * 1e9)
+
+    def monotonic_ns():
+        """time.monotonic()をナノ秒の整数で返す
+        """
+        return int(time.monotonic() * 1e9)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import asyncio
+import functools
+
+
+class AsyncDevice(object):
+    """
+    Deviceをasyncioから使用するためのクラス
+
+    バスI/Oはエグゼキュータのスレッドで実行し、BUSY解除の待機中は
+    イベントループ上でスリープするため、待機中の軸がスレッドを占有しない。
+    BUSYピンのPinWaiterを与えた場合は、ステータスを取得せずピンのエッジで待機する。
+    Deviceの各メソッドは同名のコルーチンとして呼出せる。
+    """
+
+    def __init__(self, device, executor=None, poll_interval=0.005, pins=None):
+        """非同期デバイスコンストラクタ
+
+        Arguments:
+            device {Device} -- 対象のデバイス
+
+        Keyword Arguments:
+            executor {Executor} -- バスI/Oを実行するエグゼキュータ、Noneの場合はループ標準 (default: {None})
+            poll_interval {float} -- BUSY解除待ちのステータス取得周期[s] (default: {0.005})
+            pins {PinWaiter} -- BUSY/FLAGピンの待機、Noneの場合はステータスをポーリングする (default: {None})
+        """
+        self.device = device
+        self.executor = executor
+        self.poll_interval = poll_interval
+        self.pins = pins
+
+        # 1台のデバイスへのコマンドを直列化するロック (ループ内で生成する)
+        self._lock = None
+
+    async def call(self, func, *args, **kwargs):
+        """デバイスのメソッドをエグゼキュータで実行する
+
+        Arguments:
+            func {callable} -- 実行するメソッド
+
+        Returns:
+            object -- メソッドの返り値
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        loop = asyncio.get_event_loop()
+
+        async with self._lock:
+            return await loop.run_in_executor(self.executor,
+                                              functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        """Deviceのメソッドをコルーチンとして返す
+        """
+        attr = getattr(self.device, name)
+
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.call(attr, *args, **kwargs)
+
+        method.__name__ = name
+
+        return method
+
+    async def wait_idle(self, timeout=None, poll_interval=None):
+        """BUSYが解除されるまで待機する
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s]、Noneの場合は無制限 (default: {None})
+            poll_interval {float} -- ステータス取得周期[s] (default: {None})
+
+        Returns:
+            Status -- BUSY解除時のステータス
+
+        Raises:
+            asyncio.TimeoutError: タイムアウト
+        """
+        if poll_interval is None:
+            poll_interval = self.poll_interval
+
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        if self.pins is not None and self.pins.busy is not None:
+            await self._wait_pin(self.pins.busy, 1, deadline)
+            return await self.call(self.device.updateStatus)
+
+        while True:
+            status = await self.call(self.device.updateStatus)
+
+            # BUSYビットは負論理 (1:アイドル)
+            if status.BUSY:
+                return status
+
+            if deadline is not None and loop.time() >= deadline:
+                raise asyncio.TimeoutError()
+
+            await asyncio.sleep(poll_interval)
+
+    async def wait_flag(self, timeout=None):
+        """FLAGピンがアクティブ(Low)になるまで待機する
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s]、Noneの場合は無制限 (default: {None})
+
+        Returns:
+            Status -- アラーム発生時のステータス
+
+        Raises:
+            RuntimeError: FLAGピンが設定されていない
+            asyncio.TimeoutError: タイムアウト
+        """
+        if self.pins is None or self.pins.flag is None:
+            err = '"AsyncDevice"にFLAGピンが設定されていない'
+            raise RuntimeError(err)
+
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        await self._wait_pin(self.pins.flag, 0, deadline)
+
+        return await self.call(self.device.updateStatus)
+
+    async def _wait_pin(self, line, level, deadline):
+        """ピンが指定レベルになるまでイベントループ上で待機する
+        """
+        loop = asyncio.get_event_loop()
+
+        # 古いイベントを捨ててから現在値を確認する
+        while line.read(0) is not None:
+            pass
+
+        while line.value() != level:
+            remain = None if deadline is None else max(deadline - loop.time(), 0.0)
+
+            future = loop.create_future()
+            loop.add_reader(line.fileno(),
+                            lambda: future.done() or future.set_result(None))
+            try:
+                await asyncio.wait_for(future, remain)
+            finally:
+                loop.remove_reader(line.fileno())
+
+            line.read(0)
+
+    async def _motion(self, func, args, wait, timeout):
+        """モーションコマンドを実行し、必要ならBUSY解除を待つ
+        """
+        await self.call(func, *args)
+
+        if wait:
+            return await self.wait_idle(timeout)
+
+        return None
+
+    async def run(self, dir, speed, wait=True, timeout=None):
+        """RUNコマンドを実行し、目標速度に到達するまで待機する
+        """
+        return await self._motion(self.device.run, (dir, speed), wait, timeout)
+
+    async def move(self, dir, n_step, wait=True, timeout=None):
+        """MOVEコマンドを実行し、移動完了まで待機する
+        """
+        return await self._motion(self.device.move, (dir, n_step), wait, timeout)
+
+    async def goTo(self, abs_pos, wait=True, timeout=None):
+        """GO_TOコマンドを実行し、移動完了まで待機する
+        """
+        return await self._motion(self.device.goTo, (abs_pos,), wait, timeout)
+
+    async def goToDir(self, dir, abs_pos, wait=True, timeout=None):
+        """GO_TO_DIRコマンドを実行し、移動完了まで待機する
+        """
+        return await self._motion(self.device.goToDir, (dir, abs_pos), wait, timeout)
+
+    async def goUntil(self, act, dir, speed, wait=True, timeout=None):
+        """GO_UNTILコマンドを実行し、スイッチ検出後の停止まで待機する
+        """
+        return await self._motion(self.device.goUntil, (act, dir, speed), wait, timeout)
+
+    async def releaseSW(self, act, dir, wait=True, timeout=None):
+        """RELEASE_SWコマンドを実行し、スイッチ解除後の停止まで待機する
+        """
+        return await self._motion(self.device.releaseSW, (act, dir), wait, timeout)
+
+    async def goHome(self, wait=True, timeout=None):
+        """GO_HOMEコマンドを実行し、移動完了まで待機する
+        """
+        return await self._motion(self.device.goHome, (), wait, timeout)
+
+    async def goMark(self, wait=True, timeout=None):
+        """GO_MARKコマンドを実行し、移動完了まで待機する
+        """
+        return await self._motion(self.device.goMark, (), wait, timeout)
+
+    async def softStop(self, wait=True, timeout=None):
+        """SOFT_STOPコマンドを実行し、停止まで待機する
+        """
+        return await self._motion(self.device.softStop, (), wait, timeout)
+
+
+if __name__ == '__main__':
+    pass
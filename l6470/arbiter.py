@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import heapq
+import itertools
+import threading
+
+from . import l6470
+from .transport import Transport
+
+
+# 優先度 (小さいほど先に送受信する)
+STOP   = 0
+NORMAL = 1
+LOW    = 2
+
+# 優先して送受信する停止コマンド (SOFT_STOP, HARD_STOP, SOFT_HIZ, HARD_HIZ)
+STOP_OPCODES = frozenset([0xb0, 0xb8, 0xa0, 0xa8])
+
+
+def _argumentLengths():
+    """コマンド値とコマンドに続くデータのバイト数の対応表を生成する
+    """
+    lengths = [0] * 256
+
+    for param in l6470.PARAMS.values():
+        lengths[l6470.SET_PARAM.addr | param.addr] = len(param.mask)
+        lengths[l6470.GET_PARAM.addr | param.addr] = len(param.mask)
+
+    for cmd in vars(l6470).values():
+        if not isinstance(cmd, l6470.Command) or cmd is l6470.SET_PARAM or cmd is l6470.GET_PARAM:
+            continue
+        for encoders in cmd.encoders:
+            for encode in encoders:
+                lengths[encode()[0]] = len(cmd.mask)
+
+    return lengths
+
+
+ARGUMENT_LENGTHS = _argumentLengths()
+
+
+def hasStop(to_send, frame=1):
+    """送信データに停止コマンドが含まれるか判定する
+
+    各デバイスの送信データ(frameバイト毎の同じ位置のバイト列)をコマンド境界で区切り、
+    全てのコマンド値を調べる。データ部の値は停止コマンドとみなさない。
+
+    Arguments:
+        to_send {[int]} -- 送信データ
+
+    Keyword Arguments:
+        frame {int} -- CSを保持するバイト数 (default: {1})
+
+    Returns:
+        bool -- 停止コマンドを含む場合True
+    """
+    for column in range(frame):
+        values = to_send[column::frame]
+        pos = 0
+        while pos < len(values):
+            if values[pos] in STOP_OPCODES:
+                return True
+            pos += 1 + ARGUMENT_LENGTHS[values[pos]]
+
+    return False
+
+
+class BusArbiter(object):
+    """
+    1本のSPIバスを共有するトランスポートの送受信を直列化するクラス
+
+    送受信要求は優先度順のキューに並び、バスが空いた時に先頭の要求を
+    呼出し元のスレッドで送受信する。コマンド全体を1回の送受信とするため、
+    複数スレッドのコマンドのバイトが混在することはない。
+    停止コマンドはキュー内の他の要求より先に送受信する。
+    """
+
+    def __init__(self):
+        """バスアービタコンストラクタ
+        """
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._busy = False
+
+    def wrap(self, transport, priority=NORMAL):
+        """トランスポートをこのアービタ経由で送受信するようにする
+
+        Arguments:
+            transport {Transport} -- 同じバス上のトランスポート
+
+        Keyword Arguments:
+            priority {int} -- 停止コマンド以外の優先度 (default: {NORMAL})
+
+        Returns:
+            ArbitratedTransport -- アービタ経由のトランスポート
+        """
+        return ArbitratedTransport(self, transport, priority)
+
+    def pending(self):
+        """バスの空きを待っている要求数を返す
+        """
+        return len(self._queue)
+
+    def transfer(self, transport, to_send, frame=1, priority=NORMAL):
+        """バスの空きを待ち、トランスポートで送受信する
+
+        Arguments:
+            transport {Transport} -- 送受信するトランスポート
+            to_send {[int]} -- 送信データ
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+            priority {int} -- 優先度 (default: {NORMAL})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        # いずれかのコマンドが停止コマンドであれば最優先とする
+        if hasStop(to_send, frame):
+            priority = STOP
+
+        entry = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+
+            while self._busy or self._queue[0] is not entry:
+                self._cond.wait()
+
+            heapq.heappop(self._queue)
+            self._busy = True
+
+        try:
+            return transport.transfer(to_send, frame)
+        finally:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+
+class ArbitratedTransport(Transport):
+    """
+    BusArbiter経由で送受信するトランスポートクラス
+    """
+
+    def __init__(self, arbiter, transport, priority=NORMAL):
+        """アービタ経由トランスポートコンストラクタ
+
+        Arguments:
+            arbiter {BusArbiter} -- バスアービタ
+            transport {Transport} -- 実際に送受信するトランスポート
+
+        Keyword Arguments:
+            priority {int} -- 停止コマンド以外の優先度 (default: {NORMAL})
+        """
+        self.arbiter = arbiter
+        self.transport = transport
+        self.priority = priority
+
+    def transfer(self, to_send, frame=1):
+        """バスの空きを待って送受信する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        return self.arbiter.transfer(self.transport, to_send, frame, self.priority)
+
+    def close(self):
+        """トランスポートを閉じる
+        """
+        self.transport.close()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+
+class Pending(object):
+    """
+    バッチ送信後に確定するコマンドの返り値
+
+    バッチ中の取得系コマンドは値の代わりにこのオブジェクトを返す。
+    値はバッチを抜けた時点で確定し、result()で参照する。
+    """
+    __slots__ = ('batch', '_value', '_error', '_done')
+
+    def __init__(self, batch):
+        self.batch = batch
+        self._value = None
+        self._error = None
+        self._done = False
+
+    def done(self):
+        """値が確定しているか
+        """
+        return self._done
+
+    def result(self):
+        """確定した値を返す
+
+        Returns:
+            object -- コマンドの返り値
+
+        Raises:
+            RuntimeError: バッチ送信前、または値の確定時にエラーが発生した
+        """
+        if not self._done:
+            err = '"result()"はバッチ送信前には参照できない'
+            raise RuntimeError(err)
+
+        if self._error is not None:
+            raise self._error
+
+        return self._value
+
+    def then(self, func):
+        """確定した値にfuncを適用した値を返すPendingを生成する
+
+        Arguments:
+            func {callable} -- func(value)
+
+        Returns:
+            Pending -- funcの返り値
+        """
+        return self.batch.gather([self], lambda values: func(values[0]))
+
+    def __repr__(self):
+        if not self._done:
+            return 'Pending()'
+        if self._error is not None:
+            return 'Pending(error={!r})'.format(self._error)
+
+        return 'Pending({!r})'.format(self._value)
+
+
+class Batch(object):
+    """
+    Deviceのコマンドを記録し、まとめて1回の転送で送受信するクラス
+
+    Device.batch()で生成し、with文の中で呼出したコマンドを記録する。
+    with文を抜けた時に記録したコマンドを1回の転送で送受信し、
+    Pendingの値を記録した順に確定する。例外で抜けた場合は送信しない。
+    """
+
+    def __init__(self, device):
+        """バッチコンストラクタ
+
+        Arguments:
+            device {Device} -- コマンドを送信するデバイス
+        """
+        self.device = device
+
+        # 記録したコマンド [(コマンド値, パラメータ値)]
+        self.cmds = []
+
+        # 確定させる順の (Pending, コマンド番号 or (func, [Pending]))
+        self.entries = []
+
+        self.sent = False
+
+    def __enter__(self):
+        if self.device._batch is not None:
+            err = '"batch()"は入れ子にできない'
+            raise RuntimeError(err)
+
+        self.device._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.device._batch is self:
+            self.device._batch = None
+
+        if exc_type is None:
+            if not self.sent:
+                self.flush()
+        else:
+            # 送信しなかった書込みがシャドウキャッシュに残らないようにする
+            self.device.invalidate()
+
+    def __len__(self):
+        return len(self.cmds)
+
+    def add(self, to_send):
+        """送信データを記録する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Returns:
+            Pending -- 返り値 (先頭バイトを除く受信データ)
+        """
+        pending = Pending(self)
+        self.entries.append((pending, len(self.cmds)))
+        self.cmds.append((to_send[0], list(to_send[1:])))
+
+        return pending
+
+    def resolved(self, value):
+        """値が確定済みのPendingを生成する (バスを使わずに得た値)
+
+        Arguments:
+            value {object} -- 値
+
+        Returns:
+            Pending -- 確定済みのPending
+        """
+        pending = Pending(self)
+        pending._value = value
+        pending._done = True
+
+        return pending
+
+    def gather(self, pendings, func):
+        """複数のPendingの値にfuncを適用した値を返すPendingを生成する
+
+        Arguments:
+            pendings {[Pending]} -- 確定を待つPending
+            func {callable} -- func([value])
+
+        Returns:
+            Pending -- funcの返り値
+        """
+        pending = Pending(self)
+        self.entries.append((pending, (func, pendings)))
+
+        return pending
+
+    def flush(self):
+        """記録したコマンドを1回の転送で送受信し、Pendingの値を確定する
+
+        Raises:
+            RuntimeError: 送信済み、または値の確定時にエラーが発生した (最初のエラー)
+        """
+        if self.sent:
+            err = '"flush()"は送信済み'
+            raise RuntimeError(err)
+        self.sent = True
+
+        # with文の中から呼出した場合は以降のコマンドを直接送信する
+        if self.device._batch is self:
+            self.device._batch = None
+
+        results = self.device.commands(self.cmds) if len(self.cmds) > 0 else []
+
+        first = None
+        for pending, source in self.entries:
+            try:
+                if type(source) is int:
+                    pending._value = results[source]
+                else:
+                    func, pendings = source
+                    pending._value = func([p.result() for p in pendings])
+            except Exception as e:
+                pending._error = e
+                if first is None:
+                    first = e
+            pending._done = True
+
+        if first is not None:
+            raise first
+
+
+if __name__ == '__main__':
+    pass
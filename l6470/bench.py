@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from . import l6470
+from . import sim
+from . import recorder
+from ._compat import perf_counter_ns
+from .transport import NullTransport
+
+
+def cases(device):
+    """計測対象のコマンド一覧を返す
+
+    Arguments:
+        device {Device} -- 計測対象のデバイス
+
+    Returns:
+        [(str, callable)] -- (計測名, 引数なしで呼出せる関数)
+    """
+    speed = [0x00, 0x10, 0x00]
+    n_step = [0x00, 0x00, 0x10]
+    abs_pos = [0x00, 0x00, 0x00]
+
+    def apply_config():
+        device.setParam(l6470.MAX_SPEED, [0x00, 0x10])
+        device.setParam(l6470.STEP_MODE, [0x03])
+        device.setParam(l6470.KVAL_HOLD, [0x39])
+        device.setParam(l6470.KVAL_RUN,  [0x39])
+        device.setParam(l6470.KVAL_ACC,  [0x39])
+        device.setParam(l6470.KVAL_DEC,  [0x39])
+
+    return [
+        ('updateStatus',        device.updateStatus),
+        ('getStatus',           device.getStatus),
+        ('getParam(ABS_POS)',   lambda: device.getParam(l6470.ABS_POS)),
+        ('getParam(SPEED)',     lambda: device.getParam(l6470.SPEED)),
+        ('getParam(CONFIG)',    lambda: device.getParam(l6470.CONFIG)),
+        ('setParam(KVAL_RUN)',  lambda: device.setParam(l6470.KVAL_RUN, [0x39])),
+        ('setParam(MAX_SPEED)', lambda: device.setParam(l6470.MAX_SPEED, [0x00, 0x10])),
+        ('apply_config',        apply_config),
+        ('run',                 lambda: device.run(True, speed)),
+        ('move',                lambda: device.move(True, n_step)),
+        ('goTo',                lambda: device.goTo(abs_pos)),
+        ('goToDir',             lambda: device.goToDir(True, abs_pos)),
+        ('goUntil',             lambda: device.goUntil(False, True, speed)),
+        ('releaseSW',           lambda: device.releaseSW(False, True)),
+        ('goHome',              device.goHome),
+        ('goMark',              device.goMark),
+        ('resetPos',            device.resetPos),
+        ('softStop',            device.softStop),
+        ('hardStop',            device.hardStop),
+        ('softHiz',             device.softHiz),
+        ('hardHiz',             device.hardHiz),
+    ]
+
+
+def replayCase(device, path):
+    """記録ファイルの送信データを1回に1コマンドずつ順に送信する計測を返す
+
+    Arguments:
+        device {Device} -- 計測対象のデバイス
+        path {str} -- 記録ファイルのパス
+
+    Returns:
+        (str, callable) -- (計測名, 引数なしで呼出せる関数)
+    """
+    with recorder.LogReader(path) as log:
+        sends = [list(record.tx) for record in log if record.frame == 1]
+
+    if len(sends) == 0:
+        err = '"replayCase()"の記録ファイルに送信データがない: {}'.format(path)
+        raise RuntimeError(err)
+
+    state = {'index': 0}
+
+    def replay():
+        index = state['index']
+        device.send(sends[index])
+        state['index'] = (index + 1) % len(sends)
+
+    return ('replay', replay)
+
+
+def percentile(values, p):
+    """ソート済みの値からパーセンタイル値を返す
+
+    Arguments:
+        values {[float]} -- 昇順にソートされた値
+        p {float} -- パーセンタイル 0-100
+
+    Returns:
+        float -- パーセンタイル値
+    """
+    if len(values) == 0:
+        return 0.0
+
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+
+    return values[index]
+
+
+def measure(func, iterations, warmup=10):
+    """関数の実行時間と割当てメモリを計測する
+
+    Arguments:
+        func {callable} -- 計測対象の関数
+        iterations {int} -- 計測回数
+
+    Keyword Arguments:
+        warmup {int} -- 計測前の空実行回数 (default: {10})
+
+    Returns:
+        {str: float} -- 計測結果
+    """
+    for i in range(warmup):
+        func()
+
+    # 実行時間の計測
+    clock = perf_counter_ns
+    samples = [0] * iterations
+
+    start = clock()
+    for i in range(iterations):
+        t0 = clock()
+        func()
+        samples[i] = clock() - t0
+    total = clock() - start
+
+    samples.sort()
+
+    # 1回あたりの割当てメモリの計測 (計測時間には含めない)
+    #   reset_peak()はPython 3.9以降、ない場合は実行後に残った割当てのみを計測する
+    reset_peak = getattr(tracemalloc, 'reset_peak', None)
+    alloc_iterations = min(iterations, 100)
+    tracemalloc.start()
+    allocated = 0
+    for i in range(alloc_iterations):
+        if reset_peak is not None:
+            reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        func()
+        traced = tracemalloc.get_traced_memory()
+        allocated += (traced[1] if reset_peak is not None else traced[0]) - current
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_us': percentile(samples, 50) / 1e3,
+        'p99_us': percentile(samples, 99) / 1e3,
+        'max_us': samples[-1] / 1e3,
+        'calls_per_s': iterations / (total / 1e9) if total > 0 else 0.0,
+        'alloc_bytes_per_call': allocated / alloc_iterations,
+    }
+
+
+def open_device(args):
+    """引数に従ってデバイスを開く
+    """
+    if args.transport == 'null':
+        return l6470.Device(args.bus, args.client, transport=NullTransport())
+    if args.transport == 'sim':
+        return l6470.Device(args.bus, args.client, transport=sim.SimTransport())
+
+    return l6470.Device(args.bus, args.client, multi_segment=args.multi_segment)
+
+
+def run(args):
+    """ベンチマークを実行し結果を返す
+
+    Arguments:
+        args {argparse.Namespace} -- コマンドライン引数
+
+    Returns:
+        {str: object} -- ベンチマーク結果
+    """
+    device = open_device(args)
+
+    targets = cases(device)
+    if args.replay is not None:
+        targets.append(replayCase(device, args.replay))
+
+    results = {}
+    try:
+        for name, func in targets:
+            if args.filter is not None and args.filter not in name:
+                continue
+
+            results[name] = measure(func, args.iterations)
+
+            # モーションコマンドの後はモータを止めておく
+            device.hardStop()
+    finally:
+        device.hardHiz()
+
+    return {
+        'transport': args.transport,
+        'multi_segment': args.multi_segment,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+
+def report(result, out=sys.stdout):
+    """ベンチマーク結果を表形式で出力する
+    """
+    out.write('transport={} multi_segment={}\n'.format(result['transport'], result['multi_segment']))
+    out.write('{:<22} {:>10} {:>10} {:>12} {:>10}\n'.format(
+        'command', 'p50[us]', 'p99[us]', 'calls/s', 'alloc[B]'))
+
+    for name, r in result['results'].items():
+        out.write('{:<22} {:>10.1f} {:>10.1f} {:>12.0f} {:>10.0f}\n'.format(
+            name, r['p50_us'], r['p99_us'], r['calls_per_s'], r['alloc_bytes_per_call']))
+
+
+def compare(result, baseline, threshold):
+    """基準結果よりp50が閾値倍以上遅くなったコマンドを返す
+
+    Arguments:
+        result {dict} -- 今回の結果
+        baseline {dict} -- 基準の結果
+        threshold {float} -- 許容倍率
+
+    Returns:
+        [(str, float, float)] -- (コマンド名, 基準p50, 今回p50)
+    """
+    regressions = []
+    for name, r in result['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or base['p50_us'] <= 0:
+            continue
+
+        if r['p50_us'] > base['p50_us'] * threshold:
+            regressions.append((name, base['p50_us'], r['p50_us']))
+
+    return regressions
+
+
+def main(argv=None):
+    """コマンドラインエントリポイント
+
+    Returns:
+        int -- 終了コード (0:正常, 1:性能劣化あり)
+    """
+    parser = argparse.ArgumentParser(prog='python -m l6470.bench',
+                                     description='L6470 command benchmark')
+    parser.add_argument('--transport', choices=['null', 'sim', 'spi'], default='sim')
+    parser.add_argument('--bus', type=int, default=0)
+    parser.add_argument('--client', type=int, default=0)
+    parser.add_argument('--multi-segment', action='store_true')
+    parser.add_argument('--iterations', '-n', type=int, default=1000)
+    parser.add_argument('--filter', default=None, help='only commands containing this text')
+    parser.add_argument('--replay', default=None,
+                        help='also send the commands of a recorded traffic log')
+    parser.add_argument('--output', '-o', default=None, help='save results as JSON')
+    parser.add_argument('--baseline', default=None, help='compare with saved JSON results')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='allowed p50 slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    report(result)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(result, baseline, args.threshold)
+        for name, base, now in regressions:
+            sys.stdout.write('REGRESSION {}: p50 {:.1f}us -> {:.1f}us\n'.format(name, base, now))
+
+        if len(regressions) > 0:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import math
+import time
+
+from .l6470 import Device, ABS_POS, MAX_SPEED, MIN_SPEED, ACC, DEC, STEP_MODE, GO_TO
+from .daisychain import DaisyChain
+from . import planner
+from . import units
+
+
+# GO_TOは短い方向に移動するため、移動量はABS_POSの範囲の半分未満とする
+MAX_DISTANCE = 1 << 21
+
+
+def plan(distances, limits):
+    """全軸が同時に到着する各軸の最大速度、加速度、減速度を求める
+
+    移動を経路パラメータs(0-1)の1軸の台形プロファイルとみなし、各軸の
+    制限を超えない最大のsの速度、加速度、減速度を求めて各軸の移動量を掛ける。
+    全軸の速度プロファイルは相似になり、同時に加速、減速して同時に到着する。
+    MIN_SPEEDが0でない軸は相似にならないため、到着時刻のずれは
+    CoordinatedMove.finishSkewで確認する。
+
+    Arguments:
+        distances {[float]} -- 軸毎の移動量[step] (絶対値)
+        limits {[(float, float, float)]} -- 軸毎の(最大速度, 加速度, 減速度)の上限
+
+    Returns:
+        [(float, float, float)] -- 軸毎の(最大速度, 加速度, 減速度)、移動しない軸はNone
+    """
+    moving = [(distance, limit) for distance, limit in zip(distances, limits) if distance > 0]
+    if len(moving) == 0:
+        return [None] * len(distances)
+
+    speed = min(limit[0] / distance for distance, limit in moving)
+    acc = min(limit[1] / distance for distance, limit in moving)
+    dec = min(limit[2] / distance for distance, limit in moving)
+
+    return [(distance * speed, distance * acc, distance * dec) if distance > 0 else None
+            for distance in distances]
+
+
+class CoordinatedMove(object):
+    """
+    協調移動1回分の計画と実行結果
+    """
+
+    def __init__(self, targets, distances, profiles, registers, finish):
+        self.targets = targets          # 軸毎の目標絶対位置 (Noneの軸は移動しない)
+        self.distances = distances      # 軸毎の移動量[step]
+        self.profiles = profiles        # 軸毎の(最大速度, 加速度, 減速度)
+        self.registers = registers      # 軸毎の(MAX_SPEED, ACC, DEC)のレジスタ値
+        self.finish = finish            # レジスタ値から予測した軸毎の所要時間[s]
+        self.starts = []                # 軸毎のコマンド送信完了時刻[s]
+        self.saved = []                 # 書換える前の軸毎の(MAX_SPEED, ACC, DEC)のレジスタ値
+
+    @property
+    def duration(self):
+        """予測所要時間[s]
+        """
+        return max([t for t in self.finish if t is not None] + [0.0])
+
+    @property
+    def skew(self):
+        """計測した開始時刻のずれ[s]
+        """
+        if len(self.starts) == 0:
+            return 0.0
+
+        return max(self.starts) - min(self.starts)
+
+    @property
+    def finishSkew(self):
+        """レジスタ値の量子化による到着時刻のずれの予測[s]
+        """
+        finish = [t for t in self.finish if t is not None]
+        if len(finish) == 0:
+            return 0.0
+
+        return max(finish) - min(finish)
+
+
+class AxisGroup(object):
+    """
+    複数軸を同時に到着させる協調移動クラス
+
+    軸はDeviceのリスト、またはDaisyChainで与える。DaisyChainの場合は
+    全軸のGO_TOを1フレームで送信するため、開始時刻のずれはない。
+    所要時間の予測にplannerモジュール(numpy)を使用する。
+    """
+
+    def __init__(self, axes, limits=None, clock=time.monotonic):
+        """協調移動コンストラクタ
+
+        Arguments:
+            axes {[Device] or DaisyChain} -- 協調させる軸
+
+        Keyword Arguments:
+            limits {[(float, float, float)]} -- 軸毎の(最大速度[step/s], 加速度[step/s^2],
+                                                減速度[step/s^2])の上限、
+                                                Noneの場合は現在のレジスタ値 (default: {None})
+            clock {callable} -- 時刻取得関数 (default: {time.monotonic})
+        """
+        if type(axes) is not DaisyChain and (type(axes) is not list
+                                             or any(type(axis) is not Device for axis in axes)):
+            err  = '"AxisGroup()"の引数不一致\n'
+            err += '   AxisGroup(axes)\n'
+            err += '      axes: [<class Device>] or <class DaisyChain>\n'
+
+            raise RuntimeError(err)
+
+        self.axes = axes
+        self.chain = axes if type(axes) is DaisyChain else None
+        self.n_axis = axes.n_device if self.chain is not None else len(axes)
+        self.clock = clock
+
+        if limits is None:
+            limits = list(zip(map(units.regToMaxSpeed, self._read(MAX_SPEED)),
+                              map(units.regToAcc, self._read(ACC)),
+                              map(units.regToAcc, self._read(DEC))))
+
+        if len(limits) != self.n_axis:
+            err = '"AxisGroup()"のlimitsが軸数と不一致'
+            raise RuntimeError(err)
+
+        self.limits = limits
+
+    def getPositions(self):
+        """全軸の現在の絶対位置を取得する
+
+        Returns:
+            [int] -- ABS_POS [マイクロステップ] (符号付き)
+        """
+        return [units.toSigned22(value) for value in self._read(ABS_POS)]
+
+    def plan(self, targets):
+        """協調移動を計画する
+
+        Arguments:
+            targets {[int]} -- 軸毎の目標絶対位置[マイクロステップ] (Noneの軸は移動しない)
+
+        Returns:
+            CoordinatedMove -- 協調移動の計画
+
+        Raises:
+            RuntimeError: 引数の不一致、または移動量がMAX_DISTANCE以上の軸がある
+        """
+        if type(targets) is not list or len(targets) != self.n_axis:
+            err  = '"AxisGroup.goTo()"の引数不一致\n'
+            err += '      targets: [int] (len={})\n'.format(self.n_axis)
+
+            raise RuntimeError(err)
+
+        positions = self.getPositions()
+        microsteps = [units.microsteps(value) for value in self._read(STEP_MODE)]
+        min_speeds = [(value & 0x0fff) * units.MIN_SPEED_SCALE for value in self._read(MIN_SPEED)]
+
+        # 速度レジスタはフルステップ単位のため移動量もフルステップに換算する
+        distances = []
+        for target, position, n in zip(targets, positions, microsteps):
+            if target is None or target == position:
+                distances.append(0.0)
+                continue
+
+            if abs(target - position) >= MAX_DISTANCE:
+                err = '"AxisGroup.goTo()"の移動量が範囲外: {} -> {}'.format(position, target)
+                raise RuntimeError(err)
+
+            distances.append(abs(target - position) / n)
+
+        profiles = plan(distances, self.limits)
+
+        # レジスタ値の切捨て/切上げの組合せから、最も遅い軸の所要時間に
+        # 最も近くなる組合せを軸毎に選ぶ
+        candidates = [None if profile is None
+                      else self._candidates(distance, profile, limit, min_speed)
+                      for distance, profile, limit, min_speed
+                      in zip(distances, profiles, self.limits, min_speeds)]
+        slowest = max([min(c)[0] for c in candidates if c is not None] + [0.0])
+
+        registers = []
+        finish = []
+        for c in candidates:
+            if c is None:
+                registers.append(None)
+                finish.append(None)
+                continue
+
+            t, register = min(c, key=lambda item: abs(item[0] - slowest))
+            registers.append(register)
+            finish.append(t)
+
+        targets = [target if distance > 0 else None
+                   for target, distance in zip(targets, distances)]
+
+        return CoordinatedMove(targets, distances, profiles, registers, finish)
+
+    def goTo(self, targets):
+        """全軸が同時に到着するように目標絶対位置へ移動する
+
+        各軸のMAX_SPEED, ACC, DECを書換えてから、GO_TOを連続して(DaisyChainの場合は
+        1フレームで)送信する。書換える前の値はCoordinatedMove.savedに保存し、
+        移動の完了後にrestore()で元に戻す。
+
+        Arguments:
+            targets {[int]} -- 軸毎の目標絶対位置[マイクロステップ] (Noneの軸は移動しない)
+
+        Returns:
+            CoordinatedMove -- 協調移動の計画と開始時刻
+
+        Raises:
+            RuntimeError: 引数の不一致、または移動量がMAX_DISTANCE以上の軸がある
+        """
+        move = self.plan(targets)
+
+        if all(target is None for target in move.targets):
+            return move
+
+        move.saved = list(zip(self._read(MAX_SPEED), self._read(ACC), self._read(DEC)))
+
+        if self.chain is not None:
+            self._startChain(move)
+        else:
+            self._startDevices(move)
+
+        return move
+
+    def restore(self, move):
+        """goTo()で書換えたMAX_SPEED, ACC, DECを元に戻す
+
+        ACC, DECはモータ停止中のみ書込めるため、全軸の移動の完了後に呼出す。
+
+        Arguments:
+            move {CoordinatedMove} -- goTo()の返り値
+
+        Raises:
+            RuntimeError: 移動中の軸があり書込めない
+        """
+        registers = [saved if register is not None else None
+                     for saved, register in zip(move.saved, move.registers)]
+
+        if self.chain is not None:
+            self._writeChain(registers)
+            return
+
+        for axis, register in zip(self.axes, registers):
+            if register is not None:
+                axis.setParams({MAX_SPEED: register[0], ACC: register[1], DEC: register[2]})
+
+    def _startDevices(self, move):
+        """Deviceのリストで協調移動を開始する
+        """
+        starts = []
+        for axis, register in zip(self.axes, move.registers):
+            if register is not None:
+                axis.setParams({MAX_SPEED: register[0], ACC: register[1], DEC: register[2]})
+
+        # 送信データを先に生成し、GO_TOを連続して送信する
+        sends = [(axis, GO_TO.encoders[False][False](units.fromSigned22(target)))
+                 for axis, target in zip(self.axes, move.targets) if target is not None]
+
+        for axis, to_send in sends:
+            axis._motion()
+
+        for axis, to_send in sends:
+            axis.send(to_send)
+            starts.append(self.clock())
+
+        move.starts = starts
+
+    def _startChain(self, move):
+        """DaisyChainで協調移動を開始する
+        """
+        chain = self.chain
+
+        self._writeChain(move.registers)
+
+        abs_pos = [None if target is None else self._bytes(ABS_POS, units.fromSigned22(target))
+                   for target in move.targets]
+        chain.goTo(abs_pos)
+
+        # 全軸が同じCSの立上りでコマンドを実行する
+        t = self.clock()
+        move.starts = [t for target in move.targets if target is not None]
+
+    def _writeChain(self, registers):
+        """DaisyChainの軸毎にMAX_SPEED, ACC, DECを書込む (Noneの軸は書込まない)
+        """
+        for param, index in ((MAX_SPEED, 0), (ACC, 1), (DEC, 2)):
+            values = [None if register is None else self._bytes(param, register[index])
+                      for register in registers]
+            self.chain.setParam([param if value is not None else None for value in values], values)
+
+    @staticmethod
+    def _candidates(distance, profile, limit, min_speed):
+        """レジスタ値の候補と所要時間の一覧を返す
+        """
+        scales = (units.MAX_SPEED_SCALE, units.ACC_SCALE, units.ACC_SCALE)
+        uppers = (units.MAX_SPEED_MAX, units.ACC_MAX, units.ACC_MAX)
+
+        options = []
+        for value, upper_value, scale, upper in zip(profile, limit, scales, uppers):
+            # 軸の上限を超えない範囲で切捨て/切上げの両方を候補とする
+            upper = min(upper, max(int(upper_value / scale + 1e-9), 1))
+            exact = value / scale
+            options.append(sorted(set(min(max(n, 1), upper)
+                                      for n in (math.floor(exact), math.ceil(exact)))))
+
+        registers = [(speed_reg, acc_reg, dec_reg)
+                     for speed_reg in options[0]
+                     for acc_reg in options[1]
+                     for dec_reg in options[2]]
+
+        # 全ての組合せの所要時間をまとめて計算する
+        totals = planner.profile(distance,
+                                 [units.regToMaxSpeed(register[0]) for register in registers],
+                                 [units.regToAcc(register[1]) for register in registers],
+                                 [units.regToAcc(register[2]) for register in registers],
+                                 min_speed).total
+
+        return [(float(t), register) for t, register in zip(totals, registers)]
+
+    def _read(self, param):
+        """全軸のパラメータレジスタ値を整数で取得する
+        """
+        if self.chain is not None:
+            values = self.chain.getParam(param)
+        else:
+            values = [axis.getParam(param) for axis in self.axes]
+
+        result = []
+        for value in values:
+            n = 0
+            for byte in value:
+                n = (n << 8) | byte
+            result.append(n)
+
+        return result
+
+    @staticmethod
+    def _bytes(param, value):
+        """整数をパラメータのバイト列に変換する
+        """
+        size = len(param.mask)
+
+        return [(value >> (8 * (size - 1 - i))) & param.mask[i] for i in range(size)]
+
+
+if __name__ == '__main__':
+    pass
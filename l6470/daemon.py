@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import argparse
+import logging
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+from . import l6470
+from .status import Status
+
+logger = logging.getLogger(__name__)
+
+
+# 接続時にサーバが送信するヘッダ (マジック, デバイス数)
+MAGIC = b'L6D1'
+_HELLO = struct.Struct('<4sB')
+
+# フレーム長
+_LENGTH = struct.Struct('<I')
+
+# 要求/応答のヘッダ (要求ID, 呼出し数)
+_REQUEST = struct.Struct('<IH')
+
+# 呼出し (デバイス番号, メソッド番号)
+_CALL = struct.Struct('<BB')
+
+# 呼出し可能なDeviceのメソッド (番号は並び順)
+METHODS = (
+    'updateStatus', 'getStatus', 'readAll', 'invalidate',
+    'getPosition', 'getMark', 'getSpeed', 'getMicrosteps',
+    'setMaxSpeed', 'setMinSpeed', 'setAcc', 'setDec', 'setFsSpd',
+    'setParam', 'getParam', 'getParamInt', 'setParams',
+    'run', 'runSpeed', 'stepClock', 'move', 'moveSteps',
+    'goTo', 'goToDir', 'goUntil', 'releaseSW', 'goHome', 'goMark',
+    'resetPos', 'resetDevice', 'softStop', 'hardStop', 'softHiz', 'hardHiz',
+    'command',
+)
+_METHOD_IDS = dict((name, i) for i, name in enumerate(METHODS))
+
+# 結果の種別
+OK = 0
+ERROR = 1
+
+# アドレスとParamの対応表
+_PARAMS_BY_ADDR = dict((param.addr, param) for param in l6470.PARAMS.values())
+
+# 値の型タグ
+_NONE, _TRUE, _FALSE = b'N', b'T', b'F'
+_INT, _BIGINT, _FLOAT = b'i', b'I', b'd'
+_STR, _BYTES = b's', b'b'
+_LIST, _DICT = b'l', b'm'
+_STATUS, _PARAM = b'S', b'P'
+
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+
+
+def pack(value, out):
+    """値を型タグ付きのバイト列に変換してoutに追加する
+
+    Arguments:
+        value {object} -- None, bool, int, float, str, bytes, list, tuple, dict, Status, Param
+        out {bytearray} -- 出力先
+
+    Raises:
+        RuntimeError: 未対応の型
+    """
+    if value is None:
+        out += _NONE
+    elif value is True:
+        out += _TRUE
+    elif value is False:
+        out += _FALSE
+    elif type(value) is Status:
+        out += _STATUS
+        out += _U16.pack(int(value))
+    elif isinstance(value, int):
+        if -(1 << 63) <= value < (1 << 63):
+            out += _INT
+            out += _I64.pack(value)
+        else:
+            data = str(value).encode()
+            out += _BIGINT
+            out += _U16.pack(len(data))
+            out += data
+    elif type(value) is float:
+        out += _FLOAT
+        out += _F64.pack(value)
+    elif type(value) is str:
+        data = value.encode()
+        out += _STR
+        out += _U32.pack(len(data))
+        out += data
+    elif type(value) in (bytes, bytearray):
+        out += _BYTES
+        out += _U32.pack(len(value))
+        out += value
+    elif type(value) in (list, tuple):
+        out += _LIST
+        out += _U32.pack(len(value))
+        for item in value:
+            pack(item, out)
+    elif type(value) is dict:
+        out += _DICT
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            pack(key, out)
+            pack(item, out)
+    elif type(value) is l6470.Param:
+        out += _PARAM
+        out += bytes([value.addr])
+    else:
+        err = '"daemon.pack()"の未対応の型: {}'.format(type(value).__name__)
+        raise RuntimeError(err)
+
+
+def unpack(data, pos=0):
+    """型タグ付きのバイト列から値を1つ取出す
+
+    Arguments:
+        data {bytes} -- 入力データ
+
+    Keyword Arguments:
+        pos {int} -- 読出し位置 (default: {0})
+
+    Returns:
+        (object, int) -- (値, 次の読出し位置)
+
+    Raises:
+        RuntimeError: 不正なデータ
+    """
+    tag = data[pos:pos + 1]
+    pos += 1
+
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _INT:
+        return _I64.unpack_from(data, pos)[0], pos + 8
+    if tag == _FLOAT:
+        return _F64.unpack_from(data, pos)[0], pos + 8
+    if tag == _STATUS:
+        return Status(_U16.unpack_from(data, pos)[0]), pos + 2
+    if tag == _PARAM:
+        if data[pos] not in _PARAMS_BY_ADDR:
+            err = '"daemon.unpack()"の不正なアドレス: 0x{:02x}'.format(data[pos])
+            raise RuntimeError(err)
+        return _PARAMS_BY_ADDR[data[pos]], pos + 1
+    if tag == _BIGINT:
+        n = _U16.unpack_from(data, pos)[0]
+        pos += 2
+        return int(bytes(data[pos:pos + n])), pos + n
+    if tag == _STR or tag == _BYTES:
+        n = _U32.unpack_from(data, pos)[0]
+        pos += 4
+        value = bytes(data[pos:pos + n])
+        return (value.decode() if tag == _STR else value), pos + n
+    if tag == _LIST:
+        n = _U32.unpack_from(data, pos)[0]
+        pos += 4
+        items = []
+        for i in range(n):
+            item, pos = unpack(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == _DICT:
+        n = _U32.unpack_from(data, pos)[0]
+        pos += 4
+        items = {}
+        for i in range(n):
+            key, pos = unpack(data, pos)
+            items[key], pos = unpack(data, pos)
+        return items, pos
+
+    err = '"daemon.unpack()"の不正な型タグ: {}'.format(tag)
+    raise RuntimeError(err)
+
+
+def _readFrame(rfile):
+    """長さ付きのフレームを1つ読出す (接続が閉じた場合はNone)
+    """
+    header = rfile.read(_LENGTH.size)
+    if len(header) < _LENGTH.size:
+        return None
+
+    n = _LENGTH.unpack(header)[0]
+    data = rfile.read(n)
+    if len(data) < n:
+        return None
+
+    return data
+
+
+def _frame(payload):
+    """ペイロードに長さを付加したフレームを返す
+    """
+    return _LENGTH.pack(len(payload)) + payload
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    1接続の要求を順に処理するハンドラ
+    """
+
+    def handle(self):
+        daemon = self.server.owner
+        self.wfile.write(_HELLO.pack(MAGIC, len(daemon.devices)))
+        self.wfile.flush()
+
+        while True:
+            data = _readFrame(self.rfile)
+            if data is None:
+                return
+
+            out = daemon.execute(data)
+            if out is None:
+                # 要求IDが分からないため応答できない
+                logger.warning('不正な要求を受信したため切断します')
+                return
+
+            self.wfile.write(_frame(out))
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon(object):
+    """
+    SPIバスとDeviceを所有し、Unixドメインソケットで要求を受付けるデーモンクラス
+
+    1つの要求に複数の呼出しを含めることができ(バッチ)、クライアントは応答を
+    待たずに次の要求を送信できる(パイプライン)。応答は接続毎に要求の順に返す。
+    同じSPIバスのデバイスへの呼出しはバス毎のロックで直列化する。
+    """
+
+    def __init__(self, devices, path, mode=0o660):
+        """デーモンコンストラクタ
+
+        Arguments:
+            devices {[Device]} -- 公開するデバイス (番号はリストの順)
+            path {str} -- Unixドメインソケットのパス
+
+        Keyword Arguments:
+            mode {int} -- ソケットのパーミッション (default: {0o660})
+        """
+        self.devices = devices
+        self.path = path
+
+        # バス毎のロック
+        locks = {}
+        self.locks = [locks.setdefault(device.devInfo['bus'], threading.Lock())
+                      for device in devices]
+
+        if os.path.exists(path):
+            os.unlink(path)
+
+        self.server = _Server(path, _Handler)
+        self.server.owner = self
+
+        # 接続できるのは所有者とグループのみ (umaskによっては他のユーザも書込める)
+        os.chmod(path, mode)
+        self._thread = None
+
+    def serve_forever(self):
+        """要求の受付けを開始し、shutdown()まで戻らない
+        """
+        self.server.serve_forever()
+
+    def start(self):
+        """バックグラウンドのスレッドで要求の受付けを開始する
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name='l6470.daemon')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def shutdown(self):
+        """要求の受付けを停止し、ソケットを削除する
+        """
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self.server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def execute(self, data):
+        """要求を実行し、応答のペイロードを返す
+
+        Arguments:
+            data {bytes} -- 要求のペイロード
+
+        Returns:
+            bytearray -- 応答のペイロード、ヘッダを復号できない場合はNone
+        """
+        try:
+            request_id, count = _REQUEST.unpack_from(data, 0)
+        except struct.error:
+            return None
+
+        pos = _REQUEST.size
+        out = bytearray(_REQUEST.pack(request_id, count))
+
+        for i in range(count):
+            try:
+                # 復号に失敗した以降は呼出しの位置が分からないため全てエラーにする
+                if pos is None:
+                    err = '"Daemon"の不正な要求のため実行しない'
+                    raise RuntimeError(err)
+
+                try:
+                    index, method = _CALL.unpack_from(data, pos)
+                    args, pos = unpack(data, pos + _CALL.size)
+                except Exception as e:
+                    pos = None
+                    err = '"Daemon"の不正な要求: {}'.format(e)
+                    raise RuntimeError(err)
+
+                if index >= len(self.devices) or method >= len(METHODS) or type(args) is not list:
+                    err = '"Daemon"の不正な呼出し (device={}, method={})'.format(index, method)
+                    raise RuntimeError(err)
+
+                # 文字列のプロファイルはファイルパスとして開かれるため受付けない
+                if METHODS[method] == 'setParams' and any(type(arg) is not dict for arg in args):
+                    err = '"Daemon"のsetParams()はdictのみ受付ける'
+                    raise RuntimeError(err)
+
+                func = getattr(self.devices[index], METHODS[method])
+                with self.locks[index]:
+                    value = func(*args)
+
+                result = bytearray([OK])
+                pack(value, result)
+            except Exception as e:
+                logger.debug('呼出しエラー: %s', e)
+                result = bytearray([ERROR])
+                pack('{}: {}'.format(type(e).__name__, e), result)
+
+            out += result
+
+        return out
+
+
+class RemoteError(RuntimeError):
+    """
+    デーモン側で発生したエラー
+    """
+    pass
+
+
+class Pending(object):
+    """
+    送信済みで応答を受取っていない要求
+    """
+    __slots__ = ('id', 'results')
+
+    def __init__(self, id):
+        self.id = id
+        self.results = None
+
+
+class Client(object):
+    """
+    Daemonに接続するクライアントクラス
+    """
+
+    def __init__(self, path):
+        """クライアントコンストラクタ
+
+        Arguments:
+            path {str} -- Unixドメインソケットのパス
+
+        Raises:
+            RuntimeError: 接続先がデーモンではない
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.rfile = self.sock.makefile('rb')
+
+        magic, self.n_devices = _HELLO.unpack(self.rfile.read(_HELLO.size))
+        if magic != MAGIC:
+            self.close()
+            err = '"Client()"の接続先がデーモンではない: {}'.format(path)
+            raise RuntimeError(err)
+
+        self._send_lock = threading.Lock()
+        self._recv_lock = threading.Lock()
+        self._next_id = 0
+        self._received = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def device(self, index):
+        """デバイスの代理を返す
+
+        Arguments:
+            index {int} -- デバイス番号
+
+        Returns:
+            RemoteDevice -- デバイスの代理
+        """
+        if index < 0 or index >= self.n_devices:
+            err = '"Client.device()"のデバイス番号が範囲外: {}'.format(index)
+            raise RuntimeError(err)
+
+        return RemoteDevice(self, index)
+
+    def submit(self, calls):
+        """応答を待たずに要求を送信する
+
+        Arguments:
+            calls {[(int, str, tuple)]} -- (デバイス番号, メソッド名, 引数)のリスト
+
+        Returns:
+            Pending -- 送信した要求
+        """
+        with self._send_lock:
+            request_id = self._next_id
+            self._next_id = (self._next_id + 1) & 0xffffffff
+
+            out = bytearray(_REQUEST.pack(request_id, len(calls)))
+            for index, name, args in calls:
+                if name not in _METHOD_IDS:
+                    err = '"Client"の未対応のメソッド: {}'.format(name)
+                    raise RuntimeError(err)
+
+                out += _CALL.pack(index, _METHOD_IDS[name])
+                pack(list(args), out)
+
+            self.sock.sendall(_frame(out))
+
+        return Pending(request_id)
+
+    def wait(self, pending):
+        """要求の応答を受取る
+
+        Arguments:
+            pending {Pending} -- submit()の返り値
+
+        Returns:
+            [(int, object)] -- 呼出し毎の(OK or ERROR, 返り値 or エラーメッセージ)
+        """
+        if pending.results is not None:
+            return pending.results
+
+        with self._recv_lock:
+            while pending.id not in self._received:
+                data = _readFrame(self.rfile)
+                if data is None:
+                    err = '"Client"の接続が閉じられた'
+                    raise RuntimeError(err)
+
+                request_id, count = _REQUEST.unpack_from(data, 0)
+                pos = _REQUEST.size
+                results = []
+                for i in range(count):
+                    code = data[pos]
+                    value, pos = unpack(data, pos + 1)
+                    results.append((code, value))
+                self._received[request_id] = results
+
+            pending.results = self._received.pop(pending.id)
+
+        return pending.results
+
+    def call(self, index, name, *args):
+        """1つのメソッドを呼出し、返り値を返す
+
+        Arguments:
+            index {int} -- デバイス番号
+            name {str} -- メソッド名
+
+        Returns:
+            object -- 返り値
+
+        Raises:
+            RemoteError: デーモン側のエラー
+        """
+        code, value = self.wait(self.submit([(index, name, args)]))[0]
+        if code != OK:
+            raise RemoteError(value)
+
+        return value
+
+    def batch(self, calls):
+        """複数のメソッドを1回の要求で呼出す
+
+        Arguments:
+            calls {[(int, str, tuple)]} -- (デバイス番号, メソッド名, 引数)のリスト
+
+        Returns:
+            [object] -- 返り値のリスト
+
+        Raises:
+            RemoteError: デーモン側のエラー (全ての呼出しを実行した後に発生させる)
+        """
+        results = self.wait(self.submit(calls))
+
+        for code, value in results:
+            if code != OK:
+                raise RemoteError(value)
+
+        return [value for code, value in results]
+
+    def close(self):
+        """接続を閉じる
+        """
+        if self.sock is not None:
+            self.rfile.close()
+            self.sock.close()
+            self.sock = None
+
+
+class RemoteDevice(object):
+    """
+    デーモンのDeviceをDeviceと同じメソッドで呼出す代理クラス
+    """
+
+    def __init__(self, client, index):
+        """デバイス代理コンストラクタ
+
+        Arguments:
+            client {Client} -- 接続
+            index {int} -- デバイス番号
+        """
+        self.client = client
+        self.index = index
+
+    def __getattr__(self, name):
+        """Deviceのメソッドを返す
+        """
+        if name not in _METHOD_IDS:
+            raise AttributeError(name)
+
+        def method(*args):
+            return self.client.call(self.index, name, *args)
+
+        method.__name__ = name
+
+        return method
+
+
+def main(argv=None):
+    """コマンドラインエントリポイント
+    """
+    parser = argparse.ArgumentParser(prog='python -m l6470.daemon',
+                                     description='L6470 motor daemon')
+    parser.add_argument('--socket', default='/tmp/l6470.sock')
+    parser.add_argument('--device', action='append', required=True,
+                        help='BUS:CLIENT of a device, repeat for each device')
+    parser.add_argument('--reset', action='store_true',
+                        help='reset devices instead of attaching')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    clients = [tuple(int(v) for v in spec.split(':')) for spec in args.device]
+    devices = l6470.attachAll(clients, reset=args.reset)
+
+    daemon = Daemon(devices, args.socket)
+    logger.info('%sで待機します', args.socket)
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.shutdown()
+        for device in devices:
+            device.softStop()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
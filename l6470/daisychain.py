@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+from .l6470 import Param, Command
+from .l6470 import SET_PARAM, GET_PARAM, RUN, MOVE, GO_TO
+from .l6470 import RESET_DEVICE, SOFT_STOP, HARD_STOP, SOFT_HIZ, HARD_HIZ
+from .l6470 import GET_STATUS
+from .status import Status
+from .transport import SpiTransport
+
+# NOPコマンド値 (SET_PARAMのアドレス0はNOPとして扱われる)
+NOP = 0x00
+
+
+class DaisyChain:
+    """
+    デイジーチェーン接続されたL6470群のコントロールクラス
+
+    1つのチップセレクトに接続されたN台のL6470へ、各デバイスのコマンドを
+    1バイトずつインターリーブしたフレームとして送信する。
+    デバイス番号0はマスタのMOSIに最も近いデバイスとする。
+    """
+
+    def __init__(self, bus, client, n_device, multi_segment=False, transport=None):
+        """デイジーチェーンコンストラクタ
+
+        Arguments:
+            bus {int} -- SPIバスID
+            client {int} -- SPIチップセレクトID
+            n_device {int} -- チェーン接続されたデバイス数
+
+        Keyword Arguments:
+            multi_segment {bool} -- 全フレームを1回のioctlで送受信する (default: {False})
+            transport {Transport} -- 使用するトランスポート、Noneの場合はSPIを開く (default: {None})
+        """
+        # 引数の型を確認する
+        if(type(n_device) is not int or n_device < 1):
+
+            err  = '"DaisyChain()"の引数不一致\n'
+            err += '   DaisyChain(bus, client, n_device)\n'
+            err += '      n_device: int (>= 1)\n'
+
+            raise RuntimeError(err)
+
+        # SPIデバイス情報の設定
+        self.devInfo = {'bus': bus, 'client': client}
+        self.n_device = n_device
+
+        # トランスポートの初期化
+        if transport is None:
+            transport = SpiTransport(bus, client, multi_segment=multi_segment)
+        self.transport = transport
+
+    def __del__(self):
+        """デイジーチェーンデストラクタ
+        """
+        if(getattr(self, 'transport', None) is not None):
+            self.transport.close()
+
+    # === ハイレベル API ===
+    def getStatus(self):
+        """全デバイスのステータスレジスタの値を取得する
+
+        Returns:
+            [[int]] -- デバイス毎のステータスレジスタ値
+        """
+        return self.command([(GET_STATUS.addr, GET_STATUS.mask)] * self.n_device)
+
+    def updateStatus(self):
+        """全デバイスのステータス情報を取得する
+
+        Returns:
+            [Status] -- デバイス毎のステータス値
+        """
+        return [Status.fromBytes(status) for status in self.getStatus()]
+
+    def getParam(self, params):
+        """全デバイスのパラメータレジスタから値を取得する
+
+        Arguments:
+            params {Param or [Param]} -- 全デバイス共通、またはデバイス毎のパラメータ情報
+                                         (Noneのデバイスはアイドル)
+
+        Returns:
+            [[int]] -- デバイス毎のパラメータレジスタ値
+        """
+        params = self._expand(params, 'getParam')
+
+        cmds = []
+        for param in params:
+            if param is None:
+                cmds.append(None)
+                continue
+
+            if(type(param) is not Param):
+                err  = '"getParam()"関数の引数不一致\n'
+                err += '   getParam(params)\n'
+                err += '      params: <class Param> or [<class Param>]\n'
+                raise RuntimeError(err)
+
+            cmds.append((GET_PARAM.addr | param.addr, [0x00] * len(param.mask)))
+
+        return self.command(cmds)
+
+    def setParam(self, params, values):
+        """全デバイスのパラメータレジスタに値を設定する
+
+        Arguments:
+            params {Param or [Param]} -- 全デバイス共通、またはデバイス毎のパラメータ情報
+            values {[[int]]} -- デバイス毎のパラメータ値 (Noneのデバイスはアイドル)
+        """
+        params = self._expand(params, 'setParam')
+        values = self._expand(values, 'setParam')
+
+        cmds = []
+        for param, value in zip(params, values):
+            if param is None or value is None:
+                cmds.append(None)
+                continue
+
+            if(type(param) is not Param or type(value) is not list):
+                err  = '"setParam()"関数の引数不一致\n'
+                err += '   setParam(params, values)\n'
+                err += '      params: <class Param> or [<class Param>]\n'
+                err += '      values: [[int]] ex.[[0x12, 0xab], None]\n'
+                raise RuntimeError(err)
+
+            cmds.append((SET_PARAM.addr | param.addr,
+                         self._mask(param.mask, value, 'setParam')))
+
+        self.command(cmds)
+
+    def run(self, dirs, speeds):
+        """全デバイスでRUNコマンドを実行する
+
+        Arguments:
+            dirs {[bool]} -- デバイス毎の方向 True:CW, False:CCW
+            speeds {[[int]]} -- デバイス毎の速度 (Noneのデバイスはアイドル)
+        """
+        self.command(self._motion(RUN, dirs, speeds, 'run'))
+
+    def move(self, dirs, n_steps):
+        """全デバイスでMOVEコマンドを実行する
+
+        Arguments:
+            dirs {[bool]} -- デバイス毎の方向 True:CW, False:CCW
+            n_steps {[[int]]} -- デバイス毎のステップ数 (Noneのデバイスはアイドル)
+        """
+        self.command(self._motion(MOVE, dirs, n_steps, 'move'))
+
+    def goTo(self, abs_pos):
+        """全デバイスでGO_TOコマンドを実行する
+
+        Arguments:
+            abs_pos {[[int]]} -- デバイス毎の目標絶対位置 (Noneのデバイスはアイドル)
+        """
+        self.command(self._motion(GO_TO, None, abs_pos, 'goTo'))
+
+    def resetDevice(self):
+        """全デバイスでRESET_DEVICEコマンドを実行する
+        """
+        self.command([(RESET_DEVICE.addr, [])] * self.n_device)
+
+    def softStop(self):
+        """全デバイスでSOFT_STOPコマンドを実行する
+        """
+        self.command([(SOFT_STOP.addr, [])] * self.n_device)
+
+    def hardStop(self):
+        """全デバイスでHARD_STOPコマンドを実行する
+        """
+        self.command([(HARD_STOP.addr, [])] * self.n_device)
+
+    def softHiz(self):
+        """全デバイスでSOFT_HIZコマンドを実行する
+        """
+        self.command([(SOFT_HIZ.addr, [])] * self.n_device)
+
+    def hardHiz(self):
+        """全デバイスでHARD_HIZコマンドを実行する
+        """
+        self.command([(HARD_HIZ.addr, [])] * self.n_device)
+
+    # === ローレベル API ===
+    def command(self, cmds):
+        """デバイス毎のコマンドをフレームにまとめて実行する
+
+        Arguments:
+            cmds {[(int, [int])]} -- デバイス毎の(コマンド値, パラメータ値)
+                                     (Noneのデバイスはアイドル)
+
+        Returns:
+            [[int]] -- デバイス毎のコマンド実行の返り値
+        """
+        # 引数の型を確認する
+        if(type(cmds) is not list or len(cmds) != self.n_device):
+
+            err  = '"command"関数の引数不一致\n'
+            err += '   command(cmds)\n'
+            err += '      cmds: [(int, [int])] (len={})\n'.format(self.n_device)
+
+            raise RuntimeError(err)
+
+        frames = self.pack(cmds)
+
+        # 1フレームをCS1回分として全フレームをまとめて送受信する
+        to_send = [value for frame in frames for value in frame]
+        recv = self.transport.transfer(to_send, self.n_device)
+
+        from_recv = []
+        for i in range(0, len(recv), self.n_device):
+            from_recv.append(recv[i:i + self.n_device])
+
+        return self.unpack(cmds, from_recv)
+
+    def pack(self, cmds):
+        """デバイス毎のコマンドをインターリーブしたフレーム列に変換する
+
+        Arguments:
+            cmds {[(int, [int])]} -- デバイス毎の(コマンド値, パラメータ値)
+
+        Returns:
+            [[int]] -- 1フレーム(チップセレクト1回)毎の送信データ
+        """
+        to_send = []
+        for cmd in cmds:
+            if cmd is None:
+                to_send.append([])
+            else:
+                to_send.append([cmd[0]] + list(cmd[1]))
+
+        n_frame = max([len(data) for data in to_send])
+
+        # 先に送信したバイトほどチェーンの奥のデバイスに届くため逆順に並べる
+        frames = []
+        for i in range(n_frame):
+            frame = []
+            for data in reversed(to_send):
+                frame.append(data[i] if i < len(data) else NOP)
+            frames.append(frame)
+
+        return frames
+
+    def unpack(self, cmds, frames):
+        """受信フレーム列をデバイス毎の返り値に分解する
+
+        Arguments:
+            cmds {[(int, [int])]} -- デバイス毎の(コマンド値, パラメータ値)
+            frames {[[int]]} -- 1フレーム毎の受信データ
+
+        Returns:
+            [[int]] -- デバイス毎のコマンド実行の返り値
+        """
+        from_recv = []
+        for i, cmd in enumerate(cmds):
+            pos = self.n_device - 1 - i
+
+            if cmd is None:
+                from_recv.append([])
+            else:
+                from_recv.append([frames[j][pos] for j in range(1, 1 + len(cmd[1]))])
+
+        return from_recv
+
+    def _expand(self, value, name):
+        """デバイス共通の値をデバイス毎のリストに展開する
+        """
+        if type(value) is not list or (len(value) > 0 and type(value[0]) is int):
+            value = [value] * self.n_device
+
+        if len(value) != self.n_device:
+            err = '"{}()"関数の引数がデバイス数と不一致'.format(name)
+            raise RuntimeError(err)
+
+        return value
+
+    def _mask(self, mask, values, name):
+        """データマスクを適用した新しいリストを返す
+        """
+        if len(mask) != len(values):
+            err = '"{}()"関数の引数がサイズ不一致'.format(name)
+            raise RuntimeError(err)
+
+        return [m & v for m, v in zip(mask, values)]
+
+    def _motion(self, cmd: Command, dirs, values, name):
+        """方向ビット付きのデバイス毎モーションコマンドを生成する
+        """
+        if dirs is None:
+            dirs = [False] * self.n_device
+
+        dirs = self._expand(dirs, name)
+        values = self._expand(values, name)
+
+        cmds = []
+        for dir, value in zip(dirs, values):
+            if value is None:
+                cmds.append(None)
+                continue
+
+            if(type(dir) is not bool or type(value) is not list):
+                err  = '"{}()"関数の引数不一致\n'.format(name)
+                err += '      dirs  : [bool]\n'
+                err += '      values: [[int]] ex.[[0x00, 0x12, 0x34], None]'
+                raise RuntimeError(err)
+
+            reg = cmd.addr
+            if dir:
+                reg = 0x01 | reg
+
+            cmds.append((reg, self._mask(cmd.mask, value, name)))
+
+        return cmds
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import fcntl
+import os
+import select
+import struct
+import time
+
+from ._compat import monotonic_ns
+
+
+def _IOWR(type, nr, size):
+    """_IOWR(type, nr, size)のioctlリクエスト値を返す
+    """
+    return (3 << 30) | (size << 16) | (type << 8) | nr
+
+
+# GPIOキャラクタデバイス(v1 ABI)の定義
+_GPIOEVENT_REQUEST = struct.Struct('III32si')    # struct gpioevent_request
+_GPIOEVENT_DATA = struct.Struct('QI4x')          # struct gpioevent_data
+_GPIOHANDLE_DATA_SIZE = 64                       # struct gpiohandle_data
+
+GPIO_GET_LINEEVENT_IOCTL = _IOWR(0xb4, 0x04, _GPIOEVENT_REQUEST.size)
+GPIOHANDLE_GET_LINE_VALUES_IOCTL = _IOWR(0xb4, 0x08, _GPIOHANDLE_DATA_SIZE)
+
+GPIOHANDLE_REQUEST_INPUT = 1 << 0
+GPIOHANDLE_REQUEST_BIAS_PULL_UP = 1 << 5
+
+# エッジ種別
+RISING = 0x01
+FALLING = 0x02
+BOTH = RISING | FALLING
+
+
+class LineEvent(object):
+    """
+    GPIOキャラクタデバイス(/dev/gpiochipN)のラインエッジイベントを受け取るクラス
+    """
+
+    def __init__(self, chip, line, edges=BOTH, pull_up=False, label='l6470'):
+        """ラインイベントコンストラクタ
+
+        Arguments:
+            chip {int or str} -- GPIOチップ番号、またはデバイスパス ex.0, '/dev/gpiochip0'
+            line {int} -- ラインオフセット
+
+        Keyword Arguments:
+            edges {int} -- 検出するエッジ RISING, FALLING, BOTH (default: {BOTH})
+            pull_up {bool} -- 内部プルアップを有効にする (default: {False})
+            label {str} -- コンシューマ名 (default: {'l6470'})
+        """
+        if type(chip) is int:
+            chip = '/dev/gpiochip{}'.format(chip)
+
+        handleflags = GPIOHANDLE_REQUEST_INPUT
+        if pull_up:
+            handleflags |= GPIOHANDLE_REQUEST_BIAS_PULL_UP
+
+        request = bytearray(_GPIOEVENT_REQUEST.pack(line, handleflags, edges,
+                                                    label.encode()[:31], 0))
+
+        chip_fd = os.open(chip, os.O_RDONLY)
+        try:
+            fcntl.ioctl(chip_fd, GPIO_GET_LINEEVENT_IOCTL, request, True)
+        finally:
+            os.close(chip_fd)
+
+        self.fd = _GPIOEVENT_REQUEST.unpack(request)[4]
+
+    def fileno(self):
+        """イベントのファイルディスクリプタを返す
+        """
+        return self.fd
+
+    def value(self):
+        """現在のライン値を返す
+
+        Returns:
+            int -- 0:Low, 1:High
+        """
+        data = bytearray(_GPIOHANDLE_DATA_SIZE)
+        fcntl.ioctl(self.fd, GPIOHANDLE_GET_LINE_VALUES_IOCTL, data, True)
+
+        return data[0]
+
+    def read(self, timeout=None):
+        """エッジイベントを1つ読出す
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s]、Noneの場合は無制限 (default: {None})
+
+        Returns:
+            (int, int) -- (カーネルのタイムスタンプ[ns], RISING or FALLING)、タイムアウト時はNone
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) == 0:
+            return None
+
+        data = os.read(self.fd, _GPIOEVENT_DATA.size)
+
+        return _GPIOEVENT_DATA.unpack(data)
+
+    def close(self):
+        """イベントを閉じる
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class FakeLineEvent(object):
+    """
+    LineEventと同じインターフェイスを持つテスト用のイベント源
+
+    set()でライン値を変更すると、パイプ経由でエッジイベントを発生させる。
+    """
+
+    def __init__(self, value=1):
+        """テスト用ラインイベントコンストラクタ
+
+        Keyword Arguments:
+            value {int} -- 初期ライン値 (default: {1})
+        """
+        self._value = value
+        self.fd, self._wfd = os.pipe()
+
+    def set(self, value):
+        """ライン値を変更し、変化があればエッジイベントを発生させる
+
+        Arguments:
+            value {int} -- ライン値 0:Low, 1:High
+        """
+        if value == self._value:
+            return
+
+        self._value = value
+        edge = RISING if value else FALLING
+        os.write(self._wfd, _GPIOEVENT_DATA.pack(monotonic_ns(), edge))
+
+    def fileno(self):
+        """イベントのファイルディスクリプタを返す
+        """
+        return self.fd
+
+    def value(self):
+        """現在のライン値を返す
+        """
+        return self._value
+
+    def read(self, timeout=None):
+        """エッジイベントを1つ読出す (LineEvent.read()と同じ)
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) == 0:
+            return None
+
+        return _GPIOEVENT_DATA.unpack(os.read(self.fd, _GPIOEVENT_DATA.size))
+
+    def close(self):
+        """イベントを閉じる
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            os.close(self._wfd)
+            self.fd = None
+
+
+class PinWaiter(object):
+    """
+    L6470のBUSY/FLAG出力(オープンドレイン, Lowアクティブ)のエッジを待つクラス
+
+    待機中はSPIを使用しない。
+    """
+
+    def __init__(self, busy=None, flag=None):
+        """ピン待機コンストラクタ
+
+        Keyword Arguments:
+            busy {LineEvent} -- BUSYピンのイベント (default: {None})
+            flag {LineEvent} -- FLAGピンのイベント (default: {None})
+        """
+        self.busy = busy
+        self.flag = flag
+
+    def waitIdle(self, timeout=None):
+        """BUSYピンが解除(High)されるまで待機する
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s]、Noneの場合は無制限 (default: {None})
+
+        Returns:
+            bool -- True:解除, False:タイムアウト
+        """
+        return self._wait(self.busy, 1, timeout)
+
+    def waitFlag(self, timeout=None):
+        """FLAGピンがアクティブ(Low)になるまで待機する
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s]、Noneの場合は無制限 (default: {None})
+
+        Returns:
+            bool -- True:アラーム発生, False:タイムアウト
+        """
+        return self._wait(self.flag, 0, timeout)
+
+    def wait(self, timeout=None):
+        """BUSY解除またはFLAGアクティブのどちらかを待機する
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s]、Noneの場合は無制限 (default: {None})
+
+        Returns:
+            str -- 'BUSY', 'FLAG'、タイムアウト時はNone
+        """
+        lines = [line for line in (self.busy, self.flag) if line is not None]
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        for line in lines:
+            self._drain(line)
+
+        while True:
+            if self.flag is not None and self.flag.value() == 0:
+                return 'FLAG'
+            if self.busy is not None and self.busy.value() == 1:
+                return 'BUSY'
+
+            remain = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            ready, _, _ = select.select(lines, [], [], remain)
+            if len(ready) == 0:
+                return None
+
+            for line in ready:
+                line.read(0)
+
+    def _wait(self, line, level, timeout):
+        """ラインが指定レベルになるまで待機する
+        """
+        if line is None:
+            err = '"PinWaiter"に待機対象のピンが設定されていない'
+            raise RuntimeError(err)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        # 古いイベントを捨ててから現在値を確認する
+        self._drain(line)
+
+        while line.value() != level:
+            remain = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            if line.read(remain) is None:
+                return False
+
+        return True
+
+    @staticmethod
+    def _drain(line):
+        """溜まっているイベントを読捨てる
+        """
+        while line.read(0) is not None:
+            pass
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import statistics
+import time
+
+from .l6470 import MIN_SPEED, STALL_TH
+from . import units
+
+
+# STALL_THの最大値 (31.25mA x 128 = 4A)
+STALL_TH_MAX = 0x7f
+
+# 原点復帰の方式
+METHODS = ('switch', 'sensorless')
+
+
+class HomingResult(object):
+    """
+    1回の原点復帰の記録
+    """
+    __slots__ = ('method', 'start', 'end', 'position')
+
+    def __init__(self, method, start, end, position):
+        self.method = method        # 方式 'switch' or 'sensorless'
+        self.start = start          # 開始時刻[s]
+        self.end = end              # 完了時刻[s]
+        self.position = position    # 原点を検出した位置 (リセット前のABS_POS)
+
+    @property
+    def duration(self):
+        """原点復帰に要した時間[s]
+        """
+        return self.end - self.start
+
+    def __repr__(self):
+        return 'HomingResult(method={}, duration={:.3f}, position={})'.format(
+            self.method, self.duration, self.position)
+
+
+class HomingReport(object):
+    """
+    原点復帰を繰返した時間と再現性の集計
+    """
+
+    def __init__(self, results):
+        """集計コンストラクタ
+
+        Arguments:
+            results {[HomingResult]} -- 原点復帰の記録
+        """
+        self.results = results
+
+    @property
+    def durations(self):
+        """各回の所要時間[s]
+        """
+        return [result.duration for result in self.results]
+
+    @property
+    def positions(self):
+        """2回目以降の原点の検出位置 (前回の原点からの位置)
+        """
+        return [result.position for result in self.results[1:]]
+
+    @property
+    def mean_time(self):
+        """平均所要時間[s]
+        """
+        return statistics.mean(self.durations)
+
+    @property
+    def max_time(self):
+        """最大所要時間[s]
+        """
+        return max(self.durations)
+
+    @property
+    def spread(self):
+        """検出位置のばらつき (最大 - 最小)[マイクロステップ]
+        """
+        positions = self.positions
+        return max(positions) - min(positions) if len(positions) > 0 else 0
+
+    @property
+    def stdev(self):
+        """検出位置の標準偏差[マイクロステップ]
+        """
+        positions = self.positions
+        return statistics.pstdev(positions) if len(positions) > 0 else 0.0
+
+    def __repr__(self):
+        return 'HomingReport(n={}, mean_time={:.3f}, max_time={:.3f}, spread={}, stdev={:.2f})'.format(
+            len(self.results), self.mean_time, self.max_time, self.spread, self.stdev)
+
+
+class Homing(object):
+    """
+    原点復帰を行うクラス
+
+    switch()はリミットスイッチまでGO_UNTILで高速に接近し、RELEASE_SWで
+    低速に離れた位置を原点とする。sensorless()はハードストップに向けてRUNし、
+    定速中のSTEP_LOSS_A/Bを高い周期でポーリングして検出した位置を原点とする。
+    STALL_THはcalibrate()で自由回転中に誤検出しない最小値から求める。
+    """
+
+    def __init__(self, device, dir=False, pins=None, poll_interval=0.0, timeout=30.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        """原点復帰コンストラクタ
+
+        Arguments:
+            device {Device} -- 対象のデバイス
+
+        Keyword Arguments:
+            dir {bool} -- 原点の方向 True:CW, False:CCW (default: {False})
+            pins {PinWaiter} -- BUSYピンの待機、Noneの場合はステータスをポーリングする (default: {None})
+            poll_interval {float} -- ポーリング周期[s]、0の場合は連続で取得する (default: {0.0})
+            timeout {float} -- 1回の原点復帰のタイムアウト[s] (default: {30.0})
+            clock {callable} -- 時刻取得関数 (default: {time.monotonic})
+            sleep {callable} -- 待機関数 (default: {time.sleep})
+        """
+        self.device = device
+        self.dir = dir
+        self.pins = pins
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.clock = clock
+        self.sleep = sleep
+
+        # calibrate()で求めたSTALL_TH
+        self.stall_th = None
+
+    def switch(self, fast_speed, slow_speed=None):
+        """リミットスイッチで原点復帰する
+
+        Arguments:
+            fast_speed {float} -- スイッチへの接近速度[step/s]
+
+        Keyword Arguments:
+            slow_speed {float} -- スイッチから離れる速度[step/s]、Noneの場合はMIN_SPEED (default: {None})
+
+        Returns:
+            HomingResult -- 原点復帰の記録
+
+        Raises:
+            RuntimeError: タイムアウト、スイッチを検出できない、またはMIN_SPEEDを元に戻せない
+        """
+        device = self.device
+        start = self.clock()
+        deadline = start + self.timeout
+
+        # 以前のフラグを解除する
+        status = device.getStatus()
+
+        # SW_Fがオンなら接近を省略する
+        if not (status[1] & 0x04):
+            device.goUntil(True, self.dir, units.speedToReg(fast_speed))
+            status = self._waitIdle(deadline)
+
+            if not (status[1] & 0x04):
+                err = '"switch()"でスイッチを検出できない'
+                raise RuntimeError(err)
+
+        # RELEASE_SWはMIN_SPEEDで動作する (WS: 停止中に書換える)
+        saved = None
+        if slow_speed is not None:
+            saved = device.getParam(MIN_SPEED)
+            device.setMinSpeed(slow_speed)
+
+        try:
+            device.releaseSW(True, not self.dir)
+            self._waitIdle(deadline)
+        except Exception:
+            # 減速中はMIN_SPEEDを書換えられないため即時停止する
+            device.hardStop()
+            raise
+        finally:
+            if saved is not None:
+                self._waitIdle(self.clock() + self.timeout)
+                device.setParams({MIN_SPEED: saved})
+
+        # ACT=1でスイッチを離れた位置がMARKに入る
+        position = device.getMark()
+        device.resetPos()
+
+        return HomingResult('switch', start, self.clock(), position)
+
+    def sensorless(self, speed, stall_th=None):
+        """ハードストップでのストール検出で原点復帰する
+
+        Arguments:
+            speed {float} -- ハードストップへの接近速度[step/s]
+
+        Keyword Arguments:
+            stall_th {int} -- STALL_TH、Noneの場合はcalibrate()の値または設定済みの値 (default: {None})
+
+        Returns:
+            HomingResult -- 原点復帰の記録
+
+        Raises:
+            RuntimeError: タイムアウト
+        """
+        device = self.device
+        start = self.clock()
+        deadline = start + self.timeout
+
+        if stall_th is None:
+            stall_th = self.stall_th
+        if stall_th is not None:
+            device.setParam(STALL_TH, stall_th)
+
+        # 以前のフラグを解除する
+        device.getStatus()
+        device.run(self.dir, units.speedToReg(speed))
+
+        if not self._watchStall(deadline):
+            device.softStop()
+            err = '"sensorless()"でストールを検出できない (タイムアウト)'
+            raise RuntimeError(err)
+
+        device.hardStop()
+
+        position = device.getPosition()
+        device.resetPos()
+
+        return HomingResult('sensorless', start, self.clock(), position)
+
+    def calibrate(self, speed, duration=0.2, margin=2):
+        """自由回転中に誤検出しないSTALL_THを求めて設定する
+
+        原点と逆方向にspeedで定速回転させ、STEP_LOSS_A/Bが発生しない
+        最小のSTALL_THを2分探索し、marginを加えた値を設定する。
+        各試行の後は開始位置に戻る。
+
+        Arguments:
+            speed {float} -- 原点復帰と同じ接近速度[step/s]
+
+        Keyword Arguments:
+            duration {float} -- 1回の試行の定速回転時間[s] (default: {0.2})
+            margin {int} -- 求めた値に加える余裕 (default: {2})
+
+        Returns:
+            int -- 設定したSTALL_TH
+
+        Raises:
+            RuntimeError: 最大値でも誤検出する、またはタイムアウト
+        """
+        device = self.device
+        origin = device.getPosition()
+        reg = units.speedToReg(speed)
+
+        def trips(stall_th):
+            deadline = self.clock() + self.timeout
+
+            device.setParam(STALL_TH, stall_th)
+            device.getStatus()
+            device.run(not self.dir, reg)
+
+            stalled = self._watchStall(deadline, duration)
+
+            device.softStop()
+            self._waitIdle(deadline)
+            device.goTo(origin)
+            self._waitIdle(deadline)
+
+            return stalled
+
+        # 誤検出しない最小値 (STALL_TH_MAX + 1は未確認)
+        lo, hi = 0, STALL_TH_MAX + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if trips(mid):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo > STALL_TH_MAX:
+            err = '"calibrate()"で誤検出しないSTALL_THがない'
+            raise RuntimeError(err)
+
+        self.stall_th = min(lo + margin, STALL_TH_MAX)
+        device.setParam(STALL_TH, self.stall_th)
+
+        return self.stall_th
+
+    def repeatability(self, method='switch', n=5, backoff=1000, **kwargs):
+        """原点復帰を繰返し、所要時間と検出位置のばらつきを集計する
+
+        各回の後に原点と逆方向へbackoffだけ離れてから次の原点復帰を行う。
+
+        Keyword Arguments:
+            method {str} -- 方式 'switch' or 'sensorless' (default: {'switch'})
+            n {int} -- 繰返し回数 (default: {5})
+            backoff {int} -- 原点から離れる距離[マイクロステップ] (default: {1000})
+            **kwargs -- switch()またはsensorless()の引数
+
+        Returns:
+            HomingReport -- 集計
+
+        Raises:
+            RuntimeError: 未知の方式、またはタイムアウト
+        """
+        if method not in METHODS:
+            err = '"repeatability()"の未知の方式: {} ({})'.format(method, ', '.join(METHODS))
+            raise RuntimeError(err)
+
+        home = getattr(self, method)
+        results = []
+
+        for i in range(n):
+            if i > 0:
+                self.device.move(not self.dir, backoff)
+                self._waitIdle(self.clock() + self.timeout)
+
+            results.append(home(**kwargs))
+
+        return HomingReport(results)
+
+    def _watchStall(self, deadline, duration=None):
+        """定速中のSTEP_LOSS_A/Bを監視する
+
+        Keyword Arguments:
+            duration {float} -- 定速に達してから監視する時間[s]、Noneの場合は検出まで (default: {None})
+
+        Returns:
+            bool -- True:ストールを検出した, False:監視時間を経過した
+
+        Raises:
+            RuntimeError: タイムアウト (durationを指定した場合)
+        """
+        device = self.device
+        const_since = None
+
+        while True:
+            status = device.getStatus()
+            now = self.clock()
+
+            # 加減速中に立ったフラグを除くため、定速が続いている間のみ判定する
+            if (status[1] & 0x60) == 0x60:
+                if const_since is not None and (status[0] & 0x60) != 0x60:
+                    return True
+                if const_since is None:
+                    const_since = now
+                elif duration is not None and now - const_since >= duration:
+                    return False
+            else:
+                const_since = None
+
+            if now >= deadline:
+                if duration is None:
+                    return False
+                device.softStop()
+                err = '"Homing"の定速回転がタイムアウト'
+                raise RuntimeError(err)
+
+            if self.poll_interval > 0:
+                self.sleep(self.poll_interval)
+
+    def _waitIdle(self, deadline):
+        """BUSY解除を待ち、ステータスを返す
+
+        Raises:
+            RuntimeError: タイムアウト
+        """
+        device = self.device
+
+        if self.pins is not None and self.pins.busy is not None:
+            if not self.pins.waitIdle(max(deadline - self.clock(), 0.0)):
+                self._timeout()
+            return device.getStatus()
+
+        while True:
+            status = device.getStatus()
+
+            # BUSYビットは負論理 (1:アイドル)
+            if status[1] & 0x02:
+                return status
+
+            if self.clock() >= deadline:
+                self._timeout()
+
+            if self.poll_interval > 0:
+                self.sleep(self.poll_interval)
+
+    def _timeout(self):
+        """モータを停止し、タイムアウトのエラーを発生させる
+        """
+        self.device.softStop()
+        err = '"Homing"の動作完了待ちがタイムアウト'
+        raise RuntimeError(err)
+
+
+if __name__ == '__main__':
+    pass
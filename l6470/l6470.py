@@ -2,28 +2,89 @@
 # coding: utf-8
 
 # モジュールインポート
-import spidev
+import json
+import logging
+
+from .batch import Batch, Pending
+from .status import Status
+from .transport import SpiTransport
+from . import units
+
+logger = logging.getLogger(__name__)
+
+# コマンドエンコーダ生成
+def _encoder(opcode, mask):
+    """マスクを埋め込んだコマンドエンコーダを生成する
+
+    Arguments:
+        opcode {int} -- コマンド値
+        mask {[int]} -- コマンドデータマスク
+
+    Returns:
+        callable -- 整数値を受け取り送信データ[int]を返す関数
+    """
+    if len(mask) == 0:
+        def encode(value=0):
+            return [opcode]
+    elif len(mask) == 1:
+        m0, = mask
+        def encode(value=0):
+            return [opcode, value & m0]
+    elif len(mask) == 2:
+        m0, m1 = mask
+        def encode(value=0):
+            return [opcode, (value >> 8) & m0, value & m1]
+    else:
+        m0, m1, m2 = mask
+        def encode(value=0):
+            return [opcode, (value >> 16) & m0, (value >> 8) & m1, value & m2]
+
+    return encode
+
+
+def _toInt(values):
+    """バイトリストを整数値に変換する (整数値はそのまま返す)
+    """
+    if type(values) is int:
+        return values
+
+    value = 0
+    for v in values:
+        value = (value << 8) | v
+
+    return value
+
 
 # L6470パラメータリスト
 class Param(object):
     """パラメータレジスタ情報を格納するクラス
     """
-    def __init__(self, _addr, _mask, _rw):
+    __slots__ = ('addr', 'mask', 'rw', 'cache', 'setter', 'getter')
+
+    def __init__(self, _addr, _mask, _rw, _cache=2):
         """パラメータレジスタクラスコンストラクタ
         
         Arguments:
             _addr {int} -- パラメータレジスタアドレス
             _mask {[int]} -- 書込みデータマスク
             _rw {[int]} -- 書込み可能タイミング -1:R, 0:WR, 1:WS, 2:WH
+
+        Keyword Arguments:
+            _cache {int} -- シャドウキャッシュ可否 0:不可, 1:停止中のみ可, 2:可 (default: {2})
         """        
         self.addr = _addr
         self.mask = _mask
         self.rw = _rw
+        self.cache = _cache
+
+        # SET_PARAM/GET_PARAMの送信データ生成関数
+        self.setter = _encoder(0x00 | _addr, _mask)
+        self.getter = _encoder(0x20 | _addr, [0x00] * len(_mask))
 
-ABS_POS     = Param(0x01, [0x3f, 0xff, 0xff], 1)
-EL_POS      = Param(0x02, [0x01, 0xff]      , 1)
-MARK        = Param(0x03, [0x3f, 0xff, 0xff], 0)
-SPEED       = Param(0x04, [0x0f, 0xff, 0xff],-1)
+ABS_POS     = Param(0x01, [0x3f, 0xff, 0xff], 1, 0)
+EL_POS      = Param(0x02, [0x01, 0xff]      , 1, 1)
+MARK        = Param(0x03, [0x3f, 0xff, 0xff], 0, 1)
+SPEED       = Param(0x04, [0x0f, 0xff, 0xff],-1, 0)
 ACC         = Param(0x05, [0x0f, 0xff]      , 1)
 DEC         = Param(0x06, [0x0f, 0xff]      , 1)
 MAX_SPEED   = Param(0x07, [0x03, 0xff]      , 0)
@@ -38,37 +99,73 @@ ST_SLP      = Param(0x0e, [0xff]            , 2)
 FN_SLP_ACC  = Param(0x0f, [0xff]            , 2)
 FN_SLP_DEC  = Param(0x10, [0xff]            , 2)
 K_THERM     = Param(0x11, [0x0f]            , 0)
-ADC_OUT     = Param(0x12, [0x1f]            ,-1)
+ADC_OUT     = Param(0x12, [0x1f]            ,-1, 0)
 OCD_TH      = Param(0x13, [0x0f]            , 0)
 STALL_TH    = Param(0x14, [0x7f]            , 0)
 STEP_MODE   = Param(0x16, [0xff]            , 2)
 ALARM_EN    = Param(0x17, [0xff]            , 1)
 CONFIG      = Param(0x18, [0xff ,0xff]      , 2)
-STATUS      = Param(0x19, [0xff ,0xff]      ,-1)
+STATUS      = Param(0x19, [0xff ,0xff]      ,-1, 0)
+
+# パラメータ名とParamの対応表
+PARAMS = dict((name, value) for name, value in list(globals().items())
+              if isinstance(value, Param))
+
+# 停止中のみキャッシュ可能なレジスタアドレス
+_MOVING_VOLATILE = frozenset(param.addr for param in PARAMS.values() if param.cache == 1)
+
+# GET_STATUSで解除されるアラームフラグ (WRONG_CMD, SW_EVNは正論理、UVLO-STEP_LOSS_Bは負論理)
+#   NOTPERF_CMDは直前のコマンドの結果のため含めない
+_ALARM_HIGH = 0x0108
+_ALARM_LOW = 0x7e00
 
 # L6470コマンドリスト
 class Command(object):
     """コマンドレジスタ情報を格納するクラス
     """
-    def __init__(self, _addr, _mask):
+    __slots__ = ('addr', 'mask', 'encoders')
+
+    def __init__(self, _addr, _mask, _flags=0x00):
         """コマンドレジスタコンストラクタ
         
         Arguments:
             _addr {int} -- コマンドアドレス
             _mask {[int]} -- コマンドデータマスク
+
+        Keyword Arguments:
+            _flags {int} -- コマンド値に持つビット 0x01:DIR, 0x08:ACT (default: {0x00})
         """
         self.addr = _addr
         self.mask = _mask
 
+        # ACT/DIRの組合せ毎のエンコーダ encoders[act][dir](value)
+        self.encoders = tuple(
+            tuple(_encoder(_addr | (_flags & ((0x08 if act else 0x00) | (0x01 if dir else 0x00))), _mask)
+                  for dir in (False, True))
+            for act in (False, True))
+
+    def encode(self, value=0, dir=False, act=False):
+        """送信データを生成する
+
+        Keyword Arguments:
+            value {int} -- コマンドデータ (default: {0})
+            dir {bool} -- 方向 True:CW, False:CCW (default: {False})
+            act {bool} -- ACTビット (default: {False})
+
+        Returns:
+            [int] -- 送信データ
+        """
+        return self.encoders[act][dir](value)
+
 SET_PARAM   = Command(0x00, [])
 GET_PARAM   = Command(0x20, [0x00, 0x00])
-RUN         = Command(0x50, [0x0f, 0xff, 0xff])
-STEP_CLOCK  = Command(0x58, [])
-MOVE        = Command(0x40, [0x3f, 0xff, 0xff])
+RUN         = Command(0x50, [0x0f, 0xff, 0xff], 0x01)
+STEP_CLOCK  = Command(0x58, [], 0x01)
+MOVE        = Command(0x40, [0x3f, 0xff, 0xff], 0x01)
 GO_TO       = Command(0x60, [0x3f, 0xff, 0xff])
-GO_TO_DIR   = Command(0x68, [0x3f, 0xff, 0xff])
-GO_UNTIL    = Command(0x82, [0x0f, 0xff, 0xff])
-RELEASE_SW  = Command(0x92, [])
+GO_TO_DIR   = Command(0x68, [0x3f, 0xff, 0xff], 0x01)
+GO_UNTIL    = Command(0x82, [0x0f, 0xff, 0xff], 0x09)
+RELEASE_SW  = Command(0x92, [], 0x09)
 GO_HOME     = Command(0x70, [])
 GO_MARK     = Command(0x78, [])
 RESET_POS   = Command(0xd8, [])
@@ -80,111 +177,322 @@ HARD_HIZ    = Command(0xa8, [])
 GET_STATUS  = Command(0xd0, [0x00, 0x00])
 
 
+# スナップショットのレイアウト {パラメータ名: (Param, オフセット)} (レジスタアドレス順)
+_SNAPSHOT_LAYOUT = {}
+SNAPSHOT_SIZE = 0
+for _name, _param in sorted(PARAMS.items(), key=lambda item: item[1].addr):
+    _SNAPSHOT_LAYOUT[_name] = (_param, SNAPSHOT_SIZE)
+    SNAPSHOT_SIZE += len(_param.mask)
+
+
+class Snapshot(object):
+    """
+    全パラメータレジスタ値を保持する不変クラス
+
+    レジスタアドレス順に連結したバイト列を保持し、値はパラメータ名または
+    Paramで参照した時に取り出す。bytes()で保存し、Snapshot(data)で復元できる。
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        """スナップショットコンストラクタ
+
+        Arguments:
+            data {bytes} -- レジスタアドレス順に連結したレジスタ値
+
+        Raises:
+            RuntimeError: データのサイズ不一致
+        """
+        if len(data) != SNAPSHOT_SIZE:
+            err = '"Snapshot()"のデータがサイズ不一致: {} (期待値 {})'.format(len(data), SNAPSHOT_SIZE)
+            raise RuntimeError(err)
+
+        self.data = bytes(data)
+
+    def getBytes(self, key):
+        """パラメータのレジスタ値をバイトリストで取得する
+
+        Arguments:
+            key {str or Param} -- パラメータ名、またはパラメータ情報
+
+        Returns:
+            [int] -- レジスタ値 ex.[0x12, 0xab]
+        """
+        param, offset = _SNAPSHOT_LAYOUT[key if type(key) is str else _paramName(key)]
+
+        return list(self.data[offset:offset + len(param.mask)])
+
+    def __getitem__(self, key):
+        """パラメータのレジスタ値を整数で取得する
+
+        Arguments:
+            key {str or Param} -- パラメータ名、またはパラメータ情報 ex.'ACC'
+
+        Returns:
+            int -- レジスタ値
+        """
+        return _toInt(self.getBytes(key))
+
+    def keys(self):
+        """パラメータ名の一覧を返す (レジスタアドレス順)
+        """
+        return list(_SNAPSHOT_LAYOUT)
+
+    def items(self):
+        """(パラメータ名, レジスタ値)の一覧を返す
+        """
+        return [(name, self[name]) for name in _SNAPSHOT_LAYOUT]
+
+    def asdict(self):
+        """パラメータ名をキーとする辞書に変換する
+        """
+        return dict(self.items())
+
+    def diff(self, other):
+        """値が異なるパラメータ名を返す
+
+        Arguments:
+            other {Snapshot} -- 比較するスナップショット
+
+        Returns:
+            [str] -- パラメータ名のリスト
+        """
+        return [name for name, (param, offset) in _SNAPSHOT_LAYOUT.items()
+                if self.data[offset:offset + len(param.mask)]
+                != other.data[offset:offset + len(param.mask)]]
+
+    def __bytes__(self):
+        return self.data
+
+    def __eq__(self, other):
+        return isinstance(other, Snapshot) and self.data == other.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __repr__(self):
+        return 'Snapshot({})'.format(', '.join('{}=0x{:x}'.format(name, value)
+                                               for name, value in self.items()))
+
+
+def _paramName(param: Param):
+    """Paramのパラメータ名を返す
+    """
+    for name, value in PARAMS.items():
+        if value is param:
+            return name
+
+    err = '未知のパラメータ: 0x{:02x}'.format(param.addr)
+    raise RuntimeError(err)
+
+
+def _toBytes(param: Param, values, name):
+    """パラメータ値をマスク適用済みのバイトリストに変換する
+    """
+    size = len(param.mask)
+
+    if type(values) is int:
+        values = [(values >> (8 * (size - 1 - i))) & 0xff for i in range(size)]
+
+    if type(values) is not list or len(values) != size:
+        err = '"{}()"関数のパラメータ値がサイズ不一致'.format(name)
+        raise RuntimeError(err)
+
+    return [m & v for m, v in zip(param.mask, values)]
+
+
+def loadProfile(path):
+    """JSONファイルからパラメータ設定を読込む
+
+    Arguments:
+        path {str} -- JSONファイルのパス ex.{"MAX_SPEED": [0x00, 0x10], "KVAL_RUN": 57}
+
+    Returns:
+        {str: [int] or int} -- パラメータ設定
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
 class Device:
     """
     L6470コントロールクラス
     """
     
-    def __init__(self, bus, client):        
+    def __init__(self, bus, client, multi_segment=False, transport=None, cache=True,
+                 fast=False, metrics=None, reset=True):
         """L6470コンストラクタ
         
         Arguments:
             bus {int} -- SPIバスID
             client {int} -- SPIチップセレクトID
+
+        Keyword Arguments:
+            multi_segment {bool} -- コマンド全体を1回のioctlで送受信する (default: {False})
+            transport {Transport} -- 使用するトランスポート、Noneの場合はSPIを開く (default: {None})
+            cache {bool} -- 書込んだレジスタ値をシャドウキャッシュから読出す (default: {True})
+            fast {bool} -- コマンド引数の型/サイズ確認を省略する (default: {False})
+            metrics {Metrics} -- 転送の計測、Noneの場合は計測しない (default: {None})
+            reset {bool} -- Falseの場合はリセットせず、全レジスタを読出して状態を復元する (default: {True})
         """
         # SPIデバイス情報の設定
         self.devInfo = {'bus':0, 'client':0}
         self.devInfo['bus'] = bus
         self.devInfo['client'] =client
 
-        # SPIデバイスの初期化
-        self.spi = spidev.SpiDev(bus, client)
-        self.spi.max_speed_hz = 5000
-        self.spi.mode = 0b11
+        # トランスポートの初期化
+        if transport is None:
+            transport = SpiTransport(bus, client, multi_segment=multi_segment)
+        self.transport = transport
+
+        # 引数確認の省略
+        self.fast = fast
+
+        # 転送の計測
+        self.metrics = metrics
         
-        self.param = {
-            'ABS_POS'
-        }
+        # レジスタのシャドウキャッシュ {アドレス: [int]}
+        self.cache = cache
+        self.shadow = {}
+
+        # モーションコマンド発行後、停止を確認するまでTrue
+        self.moving = False
+
+        # 記録中のバッチ
+        self._batch = None
 
         # ステータス情報の初期化
-        self.status = {
-            'HiZ': 0b0,
-            'BUSY': 0b0,
-            'SW_F': 0b0,
-            'SW_EVN': 0b00,
-            'DIR': 0b0,
-            'MOT_STATUS': 0b00,
-            'NOTPERF_CMD': 0b0,
-            'WRONG_CMD': 0b0,
-            'UVLO': 0b0,
-            'TH_WRN': 0b0,
-            'TH_SD': 0b0,
-            'OCD': 0b0,
-            'STEP_LOSS_A': 0b0,
-            'STEP_LOSS_B': 0b0,
-            'SCK_MOD': 0b0
-        }
-
-        # リセット
-        self.resetDevice()
-
-        # 起動時ステータスに更新
-        self.updateStatus()
-
-        print('SPI.{}.{}を開きます'.format(bus, client))
+        self.status = Status(0)
+
+        if reset:
+            # リセット
+            self.resetDevice()
+
+            # 起動時ステータスに更新
+            self.updateStatus()
+        else:
+            # 動作中のデバイスに接続し、レジスタ値を読出す
+            self.readAll()
+
+        logger.debug('SPI.%s.%sを開きます', bus, client)
 
 
     def __del__(self):
         """L6470デストラクタ
         """
 
-        if(self.spi is not None):
-            self.spi.close()
+        if(getattr(self, 'transport', None) is not None):
+            self.transport.close()
 
-        print('SPI.{}.{}を閉じます'.format(self.devInfo['bus'], self.devInfo['client']))
+        logger.debug('SPI.%s.%sを閉じます', self.devInfo['bus'], self.devInfo['client'])
 
     # === ハイレベル API ===
     def updateStatus(self):
         """ステータス情報の更新
 
         Returns:
-            {string, int} -- ステータス値
-        """
-        status = self.getStatus()        
-
-        # HiZ: 
-        self.status['HiZ']        = (0x01 & status[1])
-        # BUSY: 
-        self.status['BUSY']       = (0x02 & status[1]) >> 1
-        # SW_F: 
-        self.status['SW_F']       = (0x04 & status[1]) >> 2
-        # SW_ENV: 
-        self.status['SW_ENV']     = (0x08 & status[1]) >> 3
-        # DIR: 
-        self.status['DIR']        = (0x10 & status[1]) >> 4        
-        # MOT_STATUS: モータ制御状態ビット
-        #   0b00: STOPPED, 0b01: ACC, 0b10: DEC, 0b11: CONST
-        self.status['MOT_STATUS'] = (0x60 & status[1]) >> 5
-        # NOTPERF_CMD: 
-        self.status['NOTPERF_CMD']= (0x80 & status[1]) >> 7
-        # WRONG_CMD: 
-        self.status['WRONG_CMD']  = (0x01 & status[0])
-        # UVLO: 低電圧状態ビット
-        self.status['UVLO']       = (0x02 & status[0]) >> 1
-        # TH_WRN:
-        self.status['TH_WRN']     = (0x04 & status[0]) >> 2
-        # TH_SD: 
-        self.status['TH_SD']      = (0x08 & status[0]) >> 3
-        # OCD
-        self.status['OCD']        = (0x10 & status[0]) >> 4
-        # STEP_LOSS_A: 
-        self.status['STEP_LOSS_A']= (0x20 & status[0]) >> 5
-        # STEP_LOSS_B:
-        self.status['STEP_LOSS_B']= (0x40 & status[0]) >> 6
-        # SCK_MOD: 
-        self.status['SCK_MOD']    = (0x80 & status[0]) >> 7
-
-        return self.status
+            Status -- ステータス値 (status['BUSY'], status.BUSY でフィールドを参照できる)
+        """
+        def update(status):
+            self.status = Status.fromBytes(status)
+            return self.status
+
+        return self._then(self.getStatus(), update)
+
+    def getPosition(self):
+        """現在の絶対位置を取得する
+
+        Returns:
+            int -- ABS_POS [マイクロステップ] (符号付き)
+        """
+        return self.getParamInt(ABS_POS)
+
+    def getMark(self):
+        """MARK位置を取得する
+
+        Returns:
+            int -- MARK [マイクロステップ] (符号付き)
+        """
+        return self.getParamInt(MARK)
+
+    def getSpeed(self):
+        """現在の速度を取得する
+
+        Returns:
+            float -- 速度[step/s]
+        """
+        return self._then(self.getParamInt(SPEED), units.regToSpeed)
+
+    def getMicrosteps(self):
+        """1フルステップあたりのマイクロステップ数を取得する
+
+        Returns:
+            int -- マイクロステップ数 (1 - 128)
+        """
+        return self._then(self.getParamInt(STEP_MODE), units.microsteps)
+
+    def setMaxSpeed(self, speed):
+        """最大速度を設定する
+
+        Arguments:
+            speed {float} -- 最大速度[step/s]
+        """
+        self.setParam(MAX_SPEED, units.maxSpeedToReg(speed))
+
+    def setMinSpeed(self, speed, lspd_opt=False):
+        """最小速度を設定する
+
+        Arguments:
+            speed {float} -- 最小速度[step/s]
+
+        Keyword Arguments:
+            lspd_opt {bool} -- 低速最適化(LSPD_OPT)を有効にする (default: {False})
+        """
+        value = units.minSpeedToReg(speed)
+        if lspd_opt:
+            value = 0x1000 | value
+
+        self.setParam(MIN_SPEED, value)
+
+    def setAcc(self, acc):
+        """加速度を設定する
+
+        Arguments:
+            acc {float} -- 加速度[step/s^2]
+        """
+        self.setParam(ACC, units.accToReg(acc))
+
+    def setDec(self, dec):
+        """減速度を設定する
+
+        Arguments:
+            dec {float} -- 減速度[step/s^2]
+        """
+        self.setParam(DEC, units.accToReg(dec))
+
+    def setFsSpd(self, speed):
+        """フルステップ切替速度を設定する
+
+        Arguments:
+            speed {float} -- 切替速度[step/s]
+        """
+        self.setParam(FS_SPD, units.fsSpdToReg(speed))
+
+    def runSpeed(self, speed):
+        """符号付き速度でRUNコマンドを実行する
+
+        Arguments:
+            speed {float} -- 速度[step/s] 正:CW, 負:CCW
+        """
+        self.run(speed >= 0, units.speedToReg(abs(speed)))
+
+    def moveSteps(self, n_step):
+        """符号付きステップ数でMOVEコマンドを実行する
+
+        Arguments:
+            n_step {int} -- ステップ数[マイクロステップ] 正:CW, 負:CCW
+        """
+        self.move(n_step >= 0, abs(n_step))
 
     # === ローレベル API ===
     def setParam(self, param: Param, values: list):
@@ -192,32 +500,40 @@ class Device:
         
         Arguments:
             param {(int, int)} -- パラメータ情報 ex.(0x12, 3)
-            values {[int]} -- パレメータ値 ex.[0x12, 0xab]
+            values {[int] or int} -- パレメータ値 ex.[0x12, 0xab] or 0x12ab
 
         Raises:
             RuntimeError: 引数の型不一致
         """        
-        # 引数の型を確認する
-        if(type(param) is not Param
-            or type(values) is not list):
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(param) is not Param
+                or type(values) not in (list, int)):
 
-            err  = '"setParam()"関数の引数不一致\n'
-            err += '   setParam(param, values)\n'
-            err += '      param : <class Param>\n'
-            err += '      values: [int] ex.[0x12, 0xab]\n'
+                err  = '"setParam()"関数の引数不一致\n'
+                err += '   setParam(param, values)\n'
+                err += '      param : <class Param>\n'
+                err += '      values: [int] or int ex.[0x12, 0xab]\n'
 
-            raise RuntimeError(err)
+                raise RuntimeError(err)
 
-        # パラメータサイズを確認する
-        if len(param.mask) != len(values):
-            err = '"setParam()"関数のvalues[]がサイズ不一致'
-            raise RuntimeError(err)
+            # パラメータサイズを確認する
+            if type(values) is list and len(param.mask) != len(values):
+                err = '"setParam()"関数のvalues[]がサイズ不一致'
+                raise RuntimeError(err)
 
-        # データマスクを適用する
-        for i in range(len(param.mask)):
-            values[i] = param.mask[i] & values[i]
-        
-        self.command(param.addr, values)
+        # データマスクを適用した送信データを生成する
+        to_send = param.setter(_toInt(values))
+
+        self.send(to_send)
+
+        # シャドウキャッシュに書込む
+        #   現在の状態で書込めない可能性がある場合はNOTPERF_CMDで無視されるため破棄する
+        if self.cache and self._cacheable(param):
+            if self._writable(param):
+                self.shadow[param.addr] = to_send[1:]
+            else:
+                self.shadow.pop(param.addr, None)
 
 
     def getParam(self, param: Param):
@@ -233,56 +549,179 @@ class Device:
             RuntimeError: 引数の型不一致
         """
 
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(param) is not Param):
+
+                err  = '"getParam()"関数の引数不一致\n'
+                err += '   setParam(param, values)\n'
+                err += '      param : (int, int) ex.(0x12, 2)\n'            
+
+                raise RuntimeError(err)
+
+        cacheable = self.cache and self._cacheable(param)
+
+        # シャドウキャッシュにあればバスを使わずに返す (バッチ中は確定済みのPending)
+        if cacheable and param.addr in self.shadow:
+            values = list(self.shadow[param.addr])
+            if self._batch is not None:
+                return self._batch.resolved(values)
+            return values
+
+        values = self.send(param.getter())
+
+        if cacheable:
+            def store(values):
+                self.shadow[param.addr] = list(values)
+                return values
+
+            values = self._then(values, store)
+
+        return values
+
+    def getParamInt(self, param: Param):
+        """パラメータレジスタから値を整数で取得する
+
+        ABS_POS, MARKは22bitの2の補数として符号付きに変換する。
+
+        Arguments:
+            param {Param} -- パラメータ情報
+
+        Returns:
+            int -- パレメータレジスタ値
+        """
+        def convert(values):
+            value = _toInt(values)
+
+            if param is ABS_POS or param is MARK:
+                return units.toSigned22(value)
+
+            return value
+
+        return self._then(self.getParam(param), convert)
+
+    def setParams(self, profile):
+        """複数のパラメータレジスタに値を一括設定する
+
+        シャドウキャッシュと値が一致するレジスタは書込まず、残りを
+        書込み可能タイミングの厳しい順(WH, WS, WR)に1回の転送で書込む。
+        転送の前後に取得したステータスはself.statusに保持し、書込み前に
+        発生していたアラームも残す。
+
+        Arguments:
+            profile {dict or str} -- {パラメータ名 or Param: [int] or int}、
+                                     またはそれを格納したJSONファイルのパス
+
+        Returns:
+            [Param] -- 書込んだパラメータ
+
+        Raises:
+            RuntimeError: 引数の不一致、または現在の状態で書込めないレジスタがある
+        """
+        if type(profile) is str:
+            profile = loadProfile(profile)
+
         # 引数の型を確認する
-        if(type(param) is not Param):
+        if(type(profile) is not dict):
 
-            err  = '"getParam()"関数の引数不一致\n'
-            err += '   setParam(param, values)\n'
-            err += '      param : (int, int) ex.(0x12, 2)\n'            
+            err  = '"setParams()"関数の引数不一致\n'
+            err += '   setParams(profile)\n'
+            err += '      profile: {str or Param: [int] or int} or str\n'
 
             raise RuntimeError(err)
 
+        writes = []
+        for key, values in profile.items():
+            param = PARAMS.get(key) if type(key) is str else key
+
+            if(type(param) is not Param):
+                err = '"setParams()"関数の未知のパラメータ: {}'.format(key)
+                raise RuntimeError(err)
+
+            if param.rw < 0:
+                err = '"setParams()"関数の読出し専用パラメータ: {}'.format(key)
+                raise RuntimeError(err)
 
-        reg = GET_PARAM.addr | param.addr
+            values = _toBytes(param, values, 'setParams')
 
-        return self.command(reg, [0x00]*len(param.mask))
+            # シャドウキャッシュと一致するレジスタは書込まない
+            if self.cache and self.shadow.get(param.addr) == values:
+                continue
+
+            writes.append((param, values))
+
+        if len(writes) == 0:
+            return []
+
+        # 書込み可能タイミングの厳しい順に並べ、最後にステータスを確認する
+        # (以前のコマンドのフラグと区別するため、先頭でもステータスを取得して解除する)
+        writes.sort(key=lambda write: -write[0].rw)
+
+        cmds = [(GET_STATUS.addr, GET_STATUS.mask)]
+        cmds += [(SET_PARAM.addr | param.addr, values) for param, values in writes]
+        cmds.append((GET_STATUS.addr, GET_STATUS.mask))
+
+        def finish(results):
+            first, status = results[0], results[-1]
+            self._checkStatus(first)
+            self._checkStatus(status)
+
+            # 先頭のGET_STATUSで解除したアラームをステータスに残す
+            value = (first[0] << 8) | first[1]
+            merged = (status[0] << 8) | status[1]
+            merged |= value & _ALARM_HIGH
+            merged &= ~(_ALARM_LOW & ~value)
+            self.status = Status(merged)
+
+            if 0x80 & status[1]:
+                err  = '"setParams()"関数で書込めないレジスタがある (NOTPERF_CMD)\n'
+                err += '   WS: モータ停止中, WH: ブリッジHiZ中のみ書込み可能'
+                raise RuntimeError(err)
+
+            # シャドウキャッシュに書込む
+            if self.cache:
+                for param, values in writes:
+                    if self._cacheable(param):
+                        self.shadow[param.addr] = values
+
+            return [param for param, values in writes]
+
+        return self._thenAll(self.commands(cmds), finish)
 
     def run(self, dir, speed):
         """RUNコマンドを実行する
         
         Arguments:
             dir {bool} -- 方向 True:CW, False:CCW
-            speed {[int]} -- 速度 ex.[0x12, 0xab]
+            speed {[int] or int} -- 速度 ex.[0x00, 0x12, 0xab] or 0x12ab
 
         Raises:
-            RuntimeError: 引数の型不一致
+            RuntimeError: 引数の型不一致、または値が範囲外
         """
 
-        # 引数の型を確認する
-        if(type(dir) is not bool
-            or type(speed) is not list):
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(dir) is not bool
+                or type(speed) not in (list, int)):
 
-            err  = '"run()"関数の引数不一致\n'
-            err += '   run(dir, speed)\n'
-            err += '      dir  : bool\n'
-            err += '      speed: [int]'
+                err  = '"run()"関数の引数不一致\n'
+                err += '   run(dir, speed)\n'
+                err += '      dir  : bool\n'
+                err += '      speed: [int] or int'
 
-            raise RuntimeError(err)
-
-        if len(RUN.mask) != len(speed):
-            err = '"run()"関数のspeed[]がサイズ不一致'
-            raise RuntimeError(err)
+                raise RuntimeError(err)
 
-        # データマスクを適用する
-        for i in range(len(RUN.mask)):
-            speed[i] = RUN.mask[i] & speed[i]
+            if type(speed) is list and len(RUN.mask) != len(speed):
+                err = '"run()"関数のspeed[]がサイズ不一致'
+                raise RuntimeError(err)
 
-        # "RUN"コマンドに方向ビットを適用する
-        reg = RUN.addr
-        if dir:
-            reg = 0x01 | reg
+            if type(speed) is int and not 0 <= speed <= units.SPEED_MAX:
+                err = '"run()"関数のspeedが範囲外 (0 - 0xfffff): {}'.format(speed)
+                raise RuntimeError(err)
 
-        self.command(reg, speed)
+        # "RUN"コマンドに方向ビットとデータマスクを適用する
+        self._motion()
+        self.send(RUN.encoders[False][dir](_toInt(speed)))
 
     def stepClock(self, dir):
         """STEP_CLOCKコマンドを実行する
@@ -293,21 +732,19 @@ class Device:
         Raises:
             RuntimeError: 引数の型不一致
         """
-        # 引数の型を確認する
-        if(type(dir) is not bool):
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(dir) is not bool):
 
-            err  = '"stepClock()"関数の引数不一致\n'
-            err += '   stepClock(dir)\n'
-            err += '      dir  : bool'            
+                err  = '"stepClock()"関数の引数不一致\n'
+                err += '   stepClock(dir)\n'
+                err += '      dir  : bool'            
 
-            raise RuntimeError(err)
+                raise RuntimeError(err)
 
         # "STEP_CLOCK"コマンドに方向ビットを適用する
-        reg = STEP_CLOCK.addr
-        if dir:
-            reg = 0x01 | reg
-
-        self.command(reg)
+        self._motion()
+        self.send(STEP_CLOCK.encoders[False][dir]())
 
 
     def move(self, dir, n_step):
@@ -315,66 +752,63 @@ class Device:
         
         Arguments:
             dir {bool} -- 方向 True:CW, False:CCW
-            n_step {[int]} -- ステップ数 ex.[0x03, 0xff]
+            n_step {[int] or int} -- ステップ数 ex.[0x00, 0x03, 0xff] or 0x3ff
         
         Raises:
-            RuntimeError: 引数の型不一致            
+            RuntimeError: 引数の型不一致、または値が範囲外
         """
         
-        # 引数の型を確認する
-        if(type(dir) is not bool
-            or type(n_step) is not list):
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(dir) is not bool
+                or type(n_step) not in (list, int)):
 
-            err  = '"move()"関数の引数不一致\n'
-            err += '   move(dir, n_step)\n'
-            err += '      dir  : bool\n'
-            err += '      dir  : [int] ex.[0x12, 0x34, 0x56]'
+                err  = '"move()"関数の引数不一致\n'
+                err += '   move(dir, n_step)\n'
+                err += '      dir  : bool\n'
+                err += '      n_step: [int] or int ex.[0x12, 0x34, 0x56]'
 
-            raise RuntimeError(err)
-
-        if len(MOVE.mask) != len(n_step):
-            err = '"move()"関数のn_step[]がサイズ不一致'
-            raise RuntimeError(err)
+                raise RuntimeError(err)
 
-        # データマスクを適用する
-        for i in range(len(MOVE.mask)):
-            n_step[i] = MOVE.mask[i] & n_step[i]
+            if type(n_step) is list and len(MOVE.mask) != len(n_step):
+                err = '"move()"関数のn_step[]がサイズ不一致'
+                raise RuntimeError(err)
 
-        # "MOVE"コマンドに方向ビットを適用する
-        reg = MOVE.addr
-        if dir:
-            reg = 0x01 | reg
+            if type(n_step) is int and not 0 <= n_step <= 0x3fffff:
+                err = '"move()"関数のn_stepが範囲外 (0 - 0x3fffff): {}'.format(n_step)
+                raise RuntimeError(err)
 
-        self.command(reg, n_step)
+        # "MOVE"コマンドに方向ビットとデータマスクを適用する
+        self._motion()
+        self.send(MOVE.encoders[False][dir](_toInt(n_step)))
 
 
     def goTo(self, abs_pos):
         """GO_TOコマンドを実行する
         
         Arguments:
-            abs_pos {[int]} -- 目標絶対位置 ex.[0x00, 0x12, 0x34]
+            abs_pos {[int] or int} -- 目標絶対位置 ex.[0x00, 0x12, 0x34] or -0x1234
         
         Raises:
             RuntimeError: 引数の型不一致
         """
-        # 引数の型を確認する
-        if(type(abs_pos) is not list):
-
-            err  = '"goTo()"関数の引数不一致\n'
-            err += '   goTo(abs_pos)\n'            
-            err += '      abs_pos  : [int] ex.[0x12, 0x34, 0x56]'
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(abs_pos) not in (list, int)):
 
-            raise RuntimeError(err)
+                err  = '"goTo()"関数の引数不一致\n'
+                err += '   goTo(abs_pos)\n'            
+                err += '      abs_pos  : [int] or int ex.[0x12, 0x34, 0x56]'
 
-        if len(GO_TO.mask) != len(abs_pos):
-            err = '"goTo()"関数のabs_pos[]がサイズ不一致'
-            raise RuntimeError(err)
+                raise RuntimeError(err)
 
-        # データマスクを適用する
-        for i in range(len(GO_TO.mask)):
-            abs_pos[i] = GO_TO.mask[i] & abs_pos[i]
+            if type(abs_pos) is list and len(GO_TO.mask) != len(abs_pos):
+                err = '"goTo()"関数のabs_pos[]がサイズ不一致'
+                raise RuntimeError(err)
 
-        self.command(GO_TO.addr, abs_pos)
+        # "GO_TO"コマンドにデータマスクを適用する
+        self._motion()
+        self.send(GO_TO.encoders[False][False](_toInt(abs_pos)))
 
 
     def goToDir(self, dir, abs_pos):
@@ -382,37 +816,31 @@ class Device:
         
         Arguments:
             dir {bool} -- 方向 True:CW, False:CCW
-            abs_pos {[int]} -- 目標絶対位置 ex.[0x00, 0x12, 0x34]
+            abs_pos {[int] or int} -- 目標絶対位置 ex.[0x00, 0x12, 0x34] or -0x1234
         
         Raises:
             RuntimeError: 引数の型不一致
         """
 
-        # 引数の型を確認する
-        if(type(dir) is not bool
-            or type(abs_pos) is not list):
-
-            err  = '"goToDir()"関数の引数不一致\n'
-            err += '   goToDir(dir, abs_pos)\n'
-            err += '      dir  : bool\n'
-            err += '      abs_pos  : [int] ex.[0x12, 0x34, 0x56]'
-
-            raise RuntimeError(err)
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(dir) is not bool
+                or type(abs_pos) not in (list, int)):
 
-        if len(GO_TO_DIR.mask) != len(abs_pos):
-            err = '"goToDir()"関数のabs_pos[]がサイズ不一致'
-            raise RuntimeError(err)
+                err  = '"goToDir()"関数の引数不一致\n'
+                err += '   goToDir(dir, abs_pos)\n'
+                err += '      dir  : bool\n'
+                err += '      abs_pos  : [int] or int ex.[0x12, 0x34, 0x56]'
 
-        # データマスクを適用する
-        for i in range(len(GO_TO_DIR.mask)):
-            abs_pos[i] = GO_TO_DIR.mask[i] & abs_pos[i]
+                raise RuntimeError(err)
 
-        # "MOVE"コマンドに方向ビットを適用する
-        reg = GO_TO_DIR.addr
-        if dir:
-            reg = 0x01 | reg
+            if type(abs_pos) is list and len(GO_TO_DIR.mask) != len(abs_pos):
+                err = '"goToDir()"関数のabs_pos[]がサイズ不一致'
+                raise RuntimeError(err)
 
-        self.command(reg, abs_pos)
+        # "GO_TO_DIR"コマンドに方向ビットとデータマスクを適用する
+        self._motion()
+        self.send(GO_TO_DIR.encoders[False][dir](_toInt(abs_pos)))
 
 
     def goUntil(self, act, dir, speed):
@@ -421,42 +849,37 @@ class Device:
         Arguments:
             act {bool} -- 方向 True:Move False:Stop
             dir {bool} -- 方向 True:CW, False:CCW
-            speed {[int]} -- 目標速度 ex.[0x00, 0x12, 0x34]
+            speed {[int] or int} -- 目標速度 ex.[0x00, 0x12, 0x34] or 0x1234
         
         Raises:
-            RuntimeError: 引数の型不一致
+            RuntimeError: 引数の型不一致、または値が範囲外
         """
         
-        # 引数の型を確認する
-        if(type(act) is not bool
-            or type(dir) is not bool
-            or type(speed) is not list):
-
-            err  = '"goUntil()"関数の引数不一致\n'
-            err += '   goToDir(act, dir, speed)\n'
-            err += '      act  : bool\n'
-            err += '      dir  : bool\n'
-            err += '      speed: [int] ex.[0x12, 0x34, 0x56]'
-
-            raise RuntimeError(err)
-
-        if len(GO_UNTIL.mask) != len(speed):
-            err = '"goUtil()"関数のspeed[]がサイズ不一致'
-            raise RuntimeError(err)
-
-        # データマスクを適用する
-        for i in range(len(GO_UNTIL.mask)):
-            speed[i] = GO_UNTIL.mask[i] & speed[i]
-
-        # "GO_UNTIL"コマンドに方向ビットを適用する
-        reg = GO_UNTIL.addr
-        if dir:
-            reg = 0x01 | reg
-
-        if act:
-            reg = 0x08 | reg
-
-        self.command(reg, speed)
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(act) is not bool
+                or type(dir) is not bool
+                or type(speed) not in (list, int)):
+
+                err  = '"goUntil()"関数の引数不一致\n'
+                err += '   goToDir(act, dir, speed)\n'
+                err += '      act  : bool\n'
+                err += '      dir  : bool\n'
+                err += '      speed: [int] or int ex.[0x12, 0x34, 0x56]'
+
+                raise RuntimeError(err)
+
+            if type(speed) is list and len(GO_UNTIL.mask) != len(speed):
+                err = '"goUtil()"関数のspeed[]がサイズ不一致'
+                raise RuntimeError(err)
+
+            if type(speed) is int and not 0 <= speed <= units.SPEED_MAX:
+                err = '"goUntil()"関数のspeedが範囲外 (0 - 0xfffff): {}'.format(speed)
+                raise RuntimeError(err)
+
+        # "GO_UNTIL"コマンドにACT/方向ビットとデータマスクを適用する
+        self._motion()
+        self.send(GO_UNTIL.encoders[act][dir](_toInt(speed)))
         
 
     def releaseSW(self, act, dir):
@@ -469,67 +892,70 @@ class Device:
         Raises:
             RuntimeError: 引数の型不一致
         """
-        # 引数の型を確認する
-        if(type(act) is not bool
-            or type(dir) is not bool):
+        if not self.fast:
+            # 引数の型を確認する
+            if(type(act) is not bool
+                or type(dir) is not bool):
         
-            err  = '"releaseSW()"関数の引数不一致\n'
-            err += '   releaseSW(act, dir)\n'
-            err += '      act  : bool\n'
-            err += '      dir  : bool'            
-
-            raise RuntimeError(err)
-
-        # "RELEASE_SW"コマンドに方向ビットを適用する
-        reg = RELEASE_SW.addr
-        if dir:
-            reg = 0x01 | reg
+                err  = '"releaseSW()"関数の引数不一致\n'
+                err += '   releaseSW(act, dir)\n'
+                err += '      act  : bool\n'
+                err += '      dir  : bool'            
 
-        if act:
-            reg = 0x08 | reg
+                raise RuntimeError(err)
 
-        self.command(reg)
+        # "RELEASE_SW"コマンドにACT/方向ビットを適用する
+        self._motion()
+        self.send(RELEASE_SW.encoders[act][dir]())
 
 
     def goHome(self):
         """GO_HOMEコマンドを実行する
         """
-        self.command(GO_HOME.addr)
+        self._motion()
+        self.send(GO_HOME.encoders[False][False]())
 
     def goMark(self):
         """GO_MARKコマンドを実行する
         """
-        self.command(GO_MARK.addr)
+        self._motion()
+        self.send(GO_MARK.encoders[False][False]())
 
     def resetPos(self):
         """RESET_POSコマンドを実行する
         """
-        self.command(RESET_POS.addr)
+        self.send(RESET_POS.encoders[False][False]())
 
     def resetDevice(self):
         """RESET_DEVICEコマンドを実行する
         """
-        self.command(RESET_DEVICE.addr)
+        self.send(RESET_DEVICE.encoders[False][False]())
+
+        # リセットでレジスタは初期値に戻る
+        self.shadow.clear()
+        self.moving = False
 
     def softStop(self):
         """SOFT_STOPコマンドを実行する
         """
-        self.command(SOFT_STOP.addr)
+        self.send(SOFT_STOP.encoders[False][False]())
 
     def hardStop(self):
         """HARD_STOPコマンドを実行する
         """
-        self.command(HARD_STOP.addr)
+        self.send(HARD_STOP.encoders[False][False]())
+        self.moving = False
 
     def softHiz(self):
         """SOFT_HIZコマンドを実行する
         """
-        self.command(SOFT_HIZ.addr)
+        self.send(SOFT_HIZ.encoders[False][False]())
 
     def hardHiz(self):
         """HARD_HIZコマンドを実行する
         """
-        self.command(HARD_HIZ.addr)
+        self.send(HARD_HIZ.encoders[False][False]())
+        self.moving = False
 
     def getStatus(self):
         """ステータスレジスタの値を取得する
@@ -537,7 +963,167 @@ class Device:
         Returns:
             [int] -- ステータスレジスタ値
         """
-        return self.command(GET_STATUS.addr, GET_STATUS.mask)
+        def check(status):
+            self._checkStatus(status)
+            return status
+
+        return self._then(self.send(GET_STATUS.encoders[False][False]()), check)
+
+    def readAll(self):
+        """全レジスタを1回の転送で読出し、ステータスとシャドウキャッシュを更新する
+
+        STATUSはGET_PARAMで読出すため、保持されたフラグは解除しない。
+
+        Returns:
+            {str: int} -- {パラメータ名: レジスタ値}
+        """
+        return self._then(self.snapshot(), Snapshot.asdict)
+
+    def snapshot(self):
+        """全レジスタを1回の転送で読出し、スナップショットを返す
+
+        ステータスとシャドウキャッシュも更新する。STATUSはGET_PARAMで
+        読出すため、保持されたフラグは解除しない。
+
+        Returns:
+            Snapshot -- 全レジスタ値
+        """
+        layout = list(_SNAPSHOT_LAYOUT.values())
+
+        results = self.commands([(param.getter()[0], [0x00] * len(param.mask))
+                                 for param, offset in layout])
+
+        return self._thenAll(results, self._snapshot)
+
+    def _snapshot(self, results):
+        """全レジスタの読出し結果からスナップショットを生成する
+        """
+        layout = list(_SNAPSHOT_LAYOUT.values())
+
+        # STATUSはアドレスが最大のため末尾
+        status = results[-1]
+        self.status = Status.fromBytes(status)
+
+        # BUSY(負論理)がアクティブ、またはMOT_STATUSが停止以外なら動作中とみなす
+        self.moving = not (0x02 & status[1]) or bool(0x60 & status[1])
+
+        self.shadow.clear()
+        if self.cache:
+            for (param, offset), values in zip(layout, results):
+                if self._cacheable(param):
+                    self.shadow[param.addr] = list(values)
+
+        return Snapshot(b''.join(bytes(values) for values in results))
+
+    def restore(self, snapshot, params=None):
+        """スナップショットの書込み可能なレジスタを書戻す
+
+        setParams()と同様に、シャドウキャッシュと一致するレジスタは書込まず、
+        書込み可能タイミングの厳しい順(WH, WS, WR)に1回の転送で書込む。
+        WHのレジスタを含む場合はブリッジをHiZにしてから呼出すこと。
+
+        Arguments:
+            snapshot {Snapshot or bytes} -- 書戻すスナップショット
+
+        Keyword Arguments:
+            params {[str or Param]} -- 書戻すパラメータ、Noneの場合は全て (default: {None})
+
+        Returns:
+            [Param] -- 書込んだパラメータ
+
+        Raises:
+            RuntimeError: 引数の不一致、または現在の状態で書込めないレジスタがある
+        """
+        if type(snapshot) is not Snapshot:
+            snapshot = Snapshot(snapshot)
+
+        if params is None:
+            names = [name for name, (param, offset) in _SNAPSHOT_LAYOUT.items() if param.rw >= 0]
+        else:
+            names = [key if type(key) is str else _paramName(key) for key in params]
+
+        return self.setParams(dict((name, snapshot.getBytes(name)) for name in names))
+
+    def invalidate(self):
+        """シャドウキャッシュを破棄する
+        """
+        self.shadow.clear()
+
+    def batch(self):
+        """コマンドを記録し、with文を抜けた時に1回の転送で送受信するバッチを返す
+
+        バッチ中の取得系コマンドは値の代わりにPendingを返し、値は
+        with文を抜けた後にresult()で参照する。
+
+        Returns:
+            Batch -- バッチ ex. with device.batch(): ...
+        """
+        return Batch(self)
+
+    def _then(self, values, func):
+        """返り値にfuncを適用する (バッチ中は値の確定時に適用する)
+        """
+        if type(values) is Pending:
+            return values.then(func)
+
+        return func(values)
+
+    def _thenAll(self, results, func):
+        """複数の返り値のリストにfuncを適用する (バッチ中は全ての値の確定時に適用する)
+        """
+        if len(results) > 0 and type(results[0]) is Pending:
+            return results[0].batch.gather(results, func)
+
+        return func(results)
+
+    def _checkStatus(self, status):
+        """取得したステータスからシャドウキャッシュと停止状態を更新する
+        """
+        # UVLO(負論理)、NOTPERF_CMD、WRONG_CMDの発生時はレジスタ値が
+        # シャドウキャッシュと一致しない可能性があるため破棄する
+        if(not (0x02 & status[0])
+            or (0x01 & status[0])
+            or (0x80 & status[1])):
+
+            self.shadow.clear()
+
+        if self.metrics is not None:
+            self.metrics.status(status)
+
+        # BUSY解除(負論理)かつMOT_STATUSが停止ならモータ停止とみなす
+        if (0x02 & status[1]) and not (0x60 & status[1]):
+            self.moving = False
+
+    def _cacheable(self, param: Param):
+        """パラメータをシャドウキャッシュから読出せるか判定する
+        """
+        if param.cache == 2:
+            return True
+        if param.cache == 1:
+            return not self.moving
+
+        return False
+
+    def _writable(self, param: Param):
+        """パラメータが現在の状態で書込めることが分かっているか判定する
+        """
+        # WS: モータ停止中のみ
+        if param.rw == 1:
+            return not self.moving
+        # WH: ブリッジHiZ中のみ (最後に取得したステータスで判定する)
+        if param.rw == 2:
+            return not self.moving and bool(self.status.HiZ)
+
+        return param.rw == 0
+
+    def _motion(self):
+        """モーションコマンドの発行前処理
+        """
+        self.moving = True
+
+        # 停止中のみキャッシュ可能なレジスタを破棄する
+        for addr in [addr for addr in self.shadow if addr in _MOVING_VOLATILE]:
+            del self.shadow[addr]
 
 
     def command(self, cmd, values=[]):
@@ -571,12 +1157,101 @@ class Device:
         if(len(values) > 0):
             to_send += values
 
-        from_recv = []        
+        return self.send(to_send)
+
+    def send(self, to_send):
+        """コマンド値と続くデータからなる送信データを送受信する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Returns:
+            [int] -- コマンド実行の返り値 (先頭バイトを除く)、バッチ中はPending
+        """
+        if self._batch is not None:
+            return self._batch.add(to_send)
+
+        if self.metrics is None:
+            return self.transport.transfer(to_send)[1:]
+
+        return self.metrics.transfer(self.transport, to_send)[1:]
+
+    def commands(self, cmds):
+        """複数のコマンドを1回の転送で実行する
+
+        Arguments:
+            cmds {[(int, [int])]} -- (コマンド値, パラメータ値)のリスト
+
+        Returns:
+            [[int]] -- コマンド毎の実行の返り値、バッチ中は[Pending]
+        """
+        if self._batch is not None:
+            return [self._batch.add([cmd] + list(values)) for cmd, values in cmds]
+
+        to_send = []
+        for cmd, values in cmds:
+            to_send.append(cmd)
+            to_send += values
+
+        if self.metrics is None:
+            from_recv = self.transport.transfer(to_send)
+        else:
+            from_recv = self.metrics.transfer(self.transport, to_send,
+                                              [(cmd, 1 + len(values)) for cmd, values in cmds])
+
+        results = []
+        pos = 0
+        for cmd, values in cmds:
+            results.append(from_recv[pos + 1:pos + 1 + len(values)])
+            pos += 1 + len(values)
+
+        return results
+
+
+def attachAll(clients, reset=False, max_workers=None, factory=None, **kwargs):
+    """複数のデバイスを並行して開く
+
+    同じバスのデバイスは1つのスレッドで順に開き、異なるバスは並行して開く。
+
+    Arguments:
+        clients {[(int, int)]} -- (SPIバスID, SPIチップセレクトID)のリスト
+
+    Keyword Arguments:
+        reset {bool} -- Trueの場合はリセットする (default: {False})
+        max_workers {int} -- 最大スレッド数、Noneの場合はバス数 (default: {None})
+        factory {callable} -- (バスID, チップセレクトID)からトランスポートを生成する関数、
+                              Noneの場合はSPIを開く (default: {None})
+        **kwargs -- Deviceの他のキーワード引数
+
+    Returns:
+        [Device] -- clientsと同じ順のデバイス
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    buses = {}
+    for index, (bus, client) in enumerate(clients):
+        buses.setdefault(bus, []).append((index, client))
+
+    def open_bus(bus, targets):
+        opened = []
+        for index, client in targets:
+            transport = None if factory is None else factory(bus, client)
+            opened.append((index, Device(bus, client, transport=transport, reset=reset, **kwargs)))
+
+        return opened
+
+    devices = [None] * len(clients)
+    if len(buses) == 0:
+        return devices
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(buses)) as executor:
+        futures = [executor.submit(open_bus, bus, targets) for bus, targets in buses.items()]
 
-        for value in to_send:
-            from_recv += self.spi.xfer([value])
+        for future in futures:
+            for index, device in future.result():
+                devices[index] = device
 
-        return from_recv[1:]
+    return devices
 
 
 if __name__ == '__main__':
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import bisect
+import threading
+import time
+
+from . import l6470
+from ._compat import perf_counter_ns
+
+
+# 転送時間ヒストグラムの上限値[s]
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1)
+
+# 複数コマンドを1回で転送した場合の転送時間のキー
+BATCH = 256
+
+# 計数するステータスフラグ (フィールド名, ビット, 負論理)
+STATUS_FLAGS = (
+    ('NOTPERF_CMD', 0x0080, False),
+    ('WRONG_CMD',   0x0100, False),
+    ('UVLO',        0x0200, True),
+    ('TH_WRN',      0x0400, True),
+    ('TH_SD',       0x0800, True),
+    ('OCD',         0x1000, True),
+    ('STEP_LOSS_A', 0x2000, True),
+    ('STEP_LOSS_B', 0x4000, True),
+)
+
+
+def _opcodeNames():
+    """コマンド値と名前の対応表を生成する
+    """
+    names = ['0x{:02x}'.format(value) for value in range(256)] + ['BATCH']
+
+    for name, param in l6470.PARAMS.items():
+        names[l6470.SET_PARAM.addr | param.addr] = 'SET_PARAM.' + name
+        names[l6470.GET_PARAM.addr | param.addr] = 'GET_PARAM.' + name
+
+    for name, cmd in vars(l6470).items():
+        if not isinstance(cmd, l6470.Command) or cmd is l6470.SET_PARAM or cmd is l6470.GET_PARAM:
+            continue
+        for encoders in cmd.encoders:
+            for encode in encoders:
+                names[encode()[0]] = name
+
+    names[0x00] = 'NOP'
+
+    return names
+
+
+OPCODE_NAMES = _opcodeNames()
+
+
+class Metrics(object):
+    """
+    Deviceの転送を計測するクラス
+
+    Device(metrics=Metrics())で有効にする。無効(None)の場合の追加処理は
+    属性の確認1回のみ。コマンド値毎に回数、バイト数、エラー数、転送時間の
+    ヒストグラムを保持し、snapshot()またはprometheus()で出力する。
+    """
+
+    def __init__(self, labels=None, buckets=BUCKETS, clock=perf_counter_ns):
+        """計測コンストラクタ
+
+        Keyword Arguments:
+            labels {dict} -- 出力に付加するラベル ex.{'axis': 'x'} (default: {None})
+            buckets {(float)} -- 転送時間ヒストグラムの上限値[s] (default: {BUCKETS})
+            clock {callable} -- 時刻取得関数[ns] (default: {time.perf_counter_ns})
+        """
+        self.labels = dict(labels or {})
+        self.buckets = tuple(buckets)
+        self.clock = clock
+
+        self._bounds = [int(bound * 1e9) for bound in self.buckets]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """計測値を0に戻す
+        """
+        with self._lock:
+            # コマンド値(0-255)毎のコマンド数、バイト数、エラー数
+            self.commands = [0] * 256
+            self.bytes = [0] * 256
+            self.errors = [0] * 256
+
+            # 転送の先頭コマンド値(複数コマンドの場合はBATCH)毎の転送時間
+            self.latency_count = [0] * 257
+            self.latency_sum = [0] * 257
+            self.latency_buckets = [None] * 257
+
+            # ステータスフラグの検出回数
+            self.flags = dict((name, 0) for name, bit, active_low in STATUS_FLAGS)
+
+            self.started = time.time()
+
+    def transfer(self, transport, to_send, opcodes=None):
+        """トランスポートで送受信し、計測する
+
+        Arguments:
+            transport {Transport} -- 送受信するトランスポート
+            to_send {[int]} -- 送信データ
+
+        Keyword Arguments:
+            opcodes {[(int, int)]} -- 複数コマンドの場合の(コマンド値, バイト数)のリスト (default: {None})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        start = self.clock()
+        try:
+            from_recv = transport.transfer(to_send)
+        except Exception:
+            with self._lock:
+                for opcode, size in opcodes or [(to_send[0], len(to_send))]:
+                    self.errors[opcode] += 1
+            raise
+
+        elapsed = self.clock() - start
+
+        if opcodes is None:
+            self.record(to_send[0], len(to_send), elapsed)
+        else:
+            self.recordBatch(opcodes, elapsed)
+
+        return from_recv
+
+    def record(self, opcode, size, elapsed):
+        """1コマンドの転送を記録する
+
+        Arguments:
+            opcode {int} -- コマンド値
+            size {int} -- 転送バイト数
+            elapsed {int} -- 転送時間[ns]
+        """
+        with self._lock:
+            self.commands[opcode] += 1
+            self.bytes[opcode] += size
+            self._latency(opcode, elapsed)
+
+    def recordBatch(self, opcodes, elapsed):
+        """複数コマンドの1回の転送を記録する
+
+        Arguments:
+            opcodes {[(int, int)]} -- (コマンド値, バイト数)のリスト
+            elapsed {int} -- 転送時間[ns]
+        """
+        with self._lock:
+            for opcode, size in opcodes:
+                self.commands[opcode] += 1
+                self.bytes[opcode] += size
+            self._latency(BATCH, elapsed)
+
+    def status(self, status):
+        """ステータスのエラー/アラームフラグを記録する
+
+        Arguments:
+            status {[int]} -- ステータスレジスタ値 ex.[0x7e, 0x03]
+        """
+        value = (status[0] << 8) | status[1]
+
+        with self._lock:
+            for name, bit, active_low in STATUS_FLAGS:
+                if bool(value & bit) != active_low:
+                    self.flags[name] += 1
+
+    def snapshot(self):
+        """計測値を辞書で返す
+
+        Returns:
+            dict -- {'labels', 'uptime', 'commands': {名前: {'count', 'bytes', 'errors'}},
+                     'latency': {名前: {'count', 'sum', 'buckets'}}, 'flags': {名前: 回数}}
+        """
+        with self._lock:
+            commands = {}
+            for opcode in range(256):
+                if self.commands[opcode] or self.errors[opcode]:
+                    commands[OPCODE_NAMES[opcode]] = {
+                        'count': self.commands[opcode],
+                        'bytes': self.bytes[opcode],
+                        'errors': self.errors[opcode],
+                    }
+
+            latency = {}
+            for key in range(257):
+                if self.latency_count[key]:
+                    latency[OPCODE_NAMES[key]] = {
+                        'count': self.latency_count[key],
+                        'sum': self.latency_sum[key] * 1e-9,
+                        'buckets': list(zip(self.buckets, self.latency_buckets[key])),
+                    }
+
+            return {
+                'labels': dict(self.labels),
+                'uptime': time.time() - self.started,
+                'commands': commands,
+                'latency': latency,
+                'flags': dict(self.flags),
+            }
+
+    def prometheus(self):
+        """計測値をPrometheusのテキスト形式で返す
+        """
+        return prometheus([self])
+
+    def _latency(self, key, elapsed):
+        """転送時間をヒストグラムに加える (ロック取得済み)
+        """
+        buckets = self.latency_buckets[key]
+        if buckets is None:
+            buckets = self.latency_buckets[key] = [0] * len(self._bounds)
+
+        index = bisect.bisect_left(self._bounds, elapsed)
+        if index < len(buckets):
+            buckets[index] += 1
+
+        self.latency_count[key] += 1
+        self.latency_sum[key] += elapsed
+
+
+def _labels(labels, **extra):
+    """Prometheusのラベル文字列を生成する
+    """
+    items = list(labels.items()) + list(extra.items())
+    if len(items) == 0:
+        return ''
+
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                          for key, value in items) + '}'
+
+
+def prometheus(metrics):
+    """複数の計測値をPrometheusのテキスト形式で返す
+
+    Arguments:
+        metrics {[Metrics]} -- 計測 (デバイス毎にlabelsで区別する)
+
+    Returns:
+        str -- テキスト形式の計測値
+    """
+    snapshots = [m.snapshot() for m in metrics]
+    lines = []
+
+    for name, key, help in (
+            ('l6470_commands_total', 'count', 'Commands sent to the L6470.'),
+            ('l6470_bytes_total', 'bytes', 'Bytes transferred including the command byte.'),
+            ('l6470_errors_total', 'errors', 'Transfers that raised an exception.')):
+        lines.append('# HELP {} {}'.format(name, help))
+        lines.append('# TYPE {} counter'.format(name))
+        for snapshot in snapshots:
+            for opcode, values in sorted(snapshot['commands'].items()):
+                lines.append('{}{} {}'.format(name, _labels(snapshot['labels'], opcode=opcode),
+                                              values[key]))
+
+    name = 'l6470_transfer_seconds'
+    lines.append('# HELP {} Time spent in one SPI transfer.'.format(name))
+    lines.append('# TYPE {} histogram'.format(name))
+    for snapshot in snapshots:
+        for opcode, values in sorted(snapshot['latency'].items()):
+            total = 0
+            for bound, count in values['buckets']:
+                total += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(snapshot['labels'], opcode=opcode, le=repr(bound)), total))
+            lines.append('{}_bucket{} {}'.format(
+                name, _labels(snapshot['labels'], opcode=opcode, le='+Inf'), values['count']))
+            lines.append('{}_sum{} {}'.format(
+                name, _labels(snapshot['labels'], opcode=opcode), repr(values['sum'])))
+            lines.append('{}_count{} {}'.format(
+                name, _labels(snapshot['labels'], opcode=opcode), values['count']))
+
+    name = 'l6470_status_flags_total'
+    lines.append('# HELP {} Error and alarm flags seen in GET_STATUS.'.format(name))
+    lines.append('# TYPE {} counter'.format(name))
+    for snapshot in snapshots:
+        for flag, count in sorted(snapshot['flags'].items()):
+            lines.append('{}{} {}'.format(name, _labels(snapshot['labels'], flag=flag), count))
+
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import array
+import threading
+import time
+
+from .l6470 import ABS_POS, GET_STATUS, SPEED
+from .status import Status, ACC, DEC, CONST
+from .units import toSigned22, regToSpeed
+
+
+class History(object):
+    """
+    ステータス履歴を保持する固定長のリングバッファ
+
+    書込みはモニタスレッドのみが行い、読出しはロックなしで任意のスレッドから行える。
+    領域は生成時に確保し、以降は確保しない。書込み中の要素を読出さないよう、
+    保持するサンプル数より1つ多い要素を確保する。
+    """
+
+    def __init__(self, size):
+        """リングバッファコンストラクタ
+
+        Arguments:
+            size {int} -- 保持するサンプル数
+        """
+        self.size = size
+        self.slots = size + 1
+        self.times = array.array('d', bytes(8 * self.slots))       # 取得時刻[s]
+        self.status = array.array('H', bytes(2 * self.slots))      # ステータスレジスタ値
+        self.positions = array.array('i', bytes(4 * self.slots))   # ABS_POS (符号付き)
+        self.speeds = array.array('d', [float('nan')] * self.slots)  # SPEED[step/s] (未取得はnan)
+
+        # 書込んだサンプルの総数 (次の書込み位置は count % slots)
+        self.count = 0
+
+    def append(self, t, status, position, speed=float('nan')):
+        """サンプルを追加する (モニタスレッドのみ)
+        """
+        index = self.count % self.slots
+        self.times[index] = t
+        self.status[index] = status
+        self.positions[index] = position
+        self.speeds[index] = speed
+
+        # 要素を書終えてから公開する
+        self.count += 1
+
+    def latest(self):
+        """最新のサンプルを返す
+
+        Returns:
+            (float, Status, int) -- (時刻, ステータス, 位置)、サンプルがない場合はNone
+        """
+        count = self.count
+        if count == 0:
+            return None
+
+        index = (count - 1) % self.slots
+
+        return (self.times[index], Status(self.status[index]), self.positions[index])
+
+    def latestSpeed(self):
+        """最新のサンプルの速度を返す
+
+        Returns:
+            float -- 速度[step/s]、サンプルがない、または取得していない場合はnan
+        """
+        count = self.count
+        if count == 0:
+            return float('nan')
+
+        return self.speeds[(count - 1) % self.slots]
+
+    def read(self, n=None):
+        """古い順にサンプルを返す
+
+        読出し中に上書きされたサンプルは結果から除く。
+
+        Keyword Arguments:
+            n {int} -- 最新から数えたサンプル数、Noneの場合は保持している全て (default: {None})
+
+        Returns:
+            [(float, Status, int)] -- (時刻, ステータス, 位置)のリスト
+        """
+        end = self.count
+        begin = max(end - self.size, 0)
+        if n is not None:
+            begin = max(begin, end - n)
+
+        samples = []
+        for seq in range(begin, end):
+            index = seq % self.slots
+            samples.append((self.times[index], Status(self.status[index]),
+                            self.positions[index]))
+
+        # 読出し中に書込まれたサンプル、および書込み中のサンプルの位置は
+        # 上書きされている可能性がある (seq <= count - slots)
+        lost = self.count - self.slots - begin + 1
+        if lost > 0:
+            samples = samples[lost:]
+
+        return samples
+
+
+class StatusMonitor(object):
+    """
+    複数のデバイスのステータスをバックグラウンドで取得するクラス
+
+    MOT_STATUSが加減速中は短い周期で、停止/HiZ中は周期を延ばしながら取得する。
+    GET_STATUSは保持されたフラグを解除するため、フラグを参照する側は
+    デバイスを直接ポーリングせず、履歴またはリスナーを使用すること。
+    """
+
+    def __init__(self, devices, size=1024, fast_interval=0.002, cruise_interval=0.01,
+                 slow_interval=0.1, lock=None, speed=False, clock=time.monotonic):
+        """ステータスモニタコンストラクタ
+
+        Arguments:
+            devices {Device or [Device]} -- 監視するデバイス
+
+        Keyword Arguments:
+            size {int} -- デバイス毎の履歴のサンプル数 (default: {1024})
+            fast_interval {float} -- 加減速中の取得周期[s] (default: {0.002})
+            cruise_interval {float} -- 定速中の取得周期[s] (default: {0.01})
+            slow_interval {float} -- 停止/HiZ中の最大取得周期[s] (default: {0.1})
+            lock {Lock} -- バスアクセスを直列化するロック、Noneの場合は生成する (default: {None})
+            speed {bool} -- SPEEDも同じ転送で取得する (default: {False})
+            clock {callable} -- 時刻取得関数 (default: {time.monotonic})
+        """
+        if type(devices) is not list:
+            devices = [devices]
+
+        self.devices = devices
+        self.histories = [History(size) for device in devices]
+
+        self.fast_interval = fast_interval
+        self.cruise_interval = cruise_interval
+        self.slow_interval = slow_interval
+
+        # 他スレッドからデバイスを操作する場合もこのロックを取得すること
+        self.lock = threading.Lock() if lock is None else lock
+        self.clock = clock
+
+        # 1回の転送で取得するコマンド
+        self._cmds = [(GET_STATUS.addr, [0x00, 0x00]),
+                      (ABS_POS.getter()[0], [0x00, 0x00, 0x00])]
+        if speed:
+            self._cmds.append((SPEED.getter()[0], [0x00, 0x00, 0x00]))
+
+        self.listeners = []
+
+        now = clock()
+        self._intervals = [fast_interval for device in devices]
+        self._due = [now for device in devices]
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def history(self, device=0):
+        """デバイスの履歴を返す
+
+        Keyword Arguments:
+            device {int or Device} -- デバイス番号、またはデバイス (default: {0})
+
+        Returns:
+            History -- 履歴
+        """
+        if type(device) is not int:
+            device = self.devices.index(device)
+
+        return self.histories[device]
+
+    def addListener(self, func):
+        """サンプル取得時に呼出す関数を登録する
+
+        関数はモニタスレッドから func(device_index, t, status, position) の形で呼出す。
+
+        Arguments:
+            func {callable} -- 登録する関数
+        """
+        self.listeners.append(func)
+
+    def removeListener(self, func):
+        """登録した関数を解除する
+        """
+        self.listeners.remove(func)
+
+    def notify(self, device=None):
+        """モーションコマンドの発行を通知し、直ちに短い周期での取得に戻す
+
+        Keyword Arguments:
+            device {int or Device} -- 対象のデバイス、Noneの場合は全て (default: {None})
+        """
+        if device is None:
+            targets = range(len(self.devices))
+        elif type(device) is int:
+            targets = [device]
+        else:
+            targets = [self.devices.index(device)]
+
+        now = self.clock()
+        for i in targets:
+            self._intervals[i] = self.fast_interval
+            self._due[i] = now
+
+        self._wake.set()
+
+    def start(self):
+        """モニタスレッドを開始する
+        """
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='StatusMonitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """モニタスレッドを停止する
+        """
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def poll(self):
+        """取得時刻に達したデバイスのステータスを取得する
+
+        Returns:
+            float -- 次の取得時刻までの時間[s]
+        """
+        now = self.clock()
+
+        for i, device in enumerate(self.devices):
+            if self._due[i] <= now:
+                self.sample(i)
+                now = self.clock()
+
+        return max(min(self._due) - now, 0.0)
+
+    def sample(self, i):
+        """デバイスのステータスと位置(と速度)を1回の転送で取得し、履歴に追加する
+
+        Arguments:
+            i {int} -- デバイス番号
+
+        Returns:
+            Status -- ステータス
+        """
+        device = self.devices[i]
+
+        with self.lock:
+            results = device.commands(self._cmds)
+            device._checkStatus(results[0])
+
+        t = self.clock()
+        status = Status.fromBytes(results[0])
+        position = results[1]
+        position = toSigned22((position[0] << 16) | (position[1] << 8) | position[2])
+        device.status = status
+
+        speed = float('nan')
+        if len(results) > 2:
+            value = results[2]
+            speed = regToSpeed((value[0] << 16) | (value[1] << 8) | value[2])
+
+        history = self.histories[i]
+        previous = history.latest()
+        history.append(t, status, position, speed)
+
+        self._intervals[i] = self._interval(status, previous, self._intervals[i])
+        self._due[i] = t + self._intervals[i]
+
+        for func in self.listeners:
+            func(i, t, status, position)
+
+        return status
+
+    def _interval(self, status, previous, interval):
+        """ステータスから次の取得周期を決める
+        """
+        if status.MOT_STATUS in (ACC, DEC):
+            return self.fast_interval
+
+        # ステータスが変化した直後は短い周期に戻す
+        if previous is not None and previous[1] != status:
+            return self.fast_interval
+
+        if status.MOT_STATUS == CONST and not status.HiZ:
+            return self.cruise_interval
+
+        # 停止/HiZ中は周期を倍々に延ばす
+        return min(interval * 2, self.slow_interval)
+
+    def _loop(self):
+        """モニタスレッドの処理
+        """
+        while not self._stop.is_set():
+            delay = self.poll()
+
+            self._wake.wait(delay)
+            self._wake.clear()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import threading
+import time
+
+from .l6470 import _toInt
+from .l6470 import RUN, MOVE, GO_TO, GO_TO_DIR, GO_UNTIL, RELEASE_SW, GO_HOME, GO_MARK
+
+
+# キューに入れられるモーションコマンドの送信データ生成
+#   (コマンド名, 引数...) -> 送信データ
+_MOVES = {
+    'run':       lambda dir, speed: RUN.encoders[False][dir](_toInt(speed)),
+    'move':      lambda dir, n_step: MOVE.encoders[False][dir](_toInt(n_step)),
+    'goTo':      lambda abs_pos: GO_TO.encoders[False][False](_toInt(abs_pos)),
+    'goToDir':   lambda dir, abs_pos: GO_TO_DIR.encoders[False][dir](_toInt(abs_pos)),
+    'goUntil':   lambda act, dir, speed: GO_UNTIL.encoders[act][dir](_toInt(speed)),
+    'releaseSW': lambda act, dir: RELEASE_SW.encoders[act][dir](),
+    'goHome':    lambda: GO_HOME.encoders[False][False](),
+    'goMark':    lambda: GO_MARK.encoders[False][False](),
+}
+
+
+def encode(move):
+    """モーションを送信データに変換する
+
+    Arguments:
+        move {tuple} -- (コマンド名, 引数...) ex.('goTo', 0x1000), ('move', True, 200)
+
+    Returns:
+        [int] -- 送信データ
+
+    Raises:
+        RuntimeError: 未対応のコマンド、または引数不一致
+    """
+    if type(move) is not tuple or len(move) == 0 or move[0] not in _MOVES:
+        err  = '"MotionQueue"のモーション不一致\n'
+        err += '   (name, args...)\n'
+        err += '      name: {}\n'.format(', '.join(sorted(_MOVES)))
+        err += '      ex. (\'goTo\', 0x1000), (\'move\', True, 200)'
+
+        raise RuntimeError(err)
+
+    try:
+        return _MOVES[move[0]](*move[1:])
+    except (TypeError, IndexError):
+        err = '"MotionQueue"のモーション{}の引数不一致'.format(move)
+        raise RuntimeError(err)
+
+
+class Segment(object):
+    """
+    キューから実行した1つのモーションの記録
+    """
+    __slots__ = ('move', 'start', 'end')
+
+    def __init__(self, move, start, end=None):
+        self.move = move
+        self.start = start      # コマンド送信完了時刻[s]
+        self.end = end          # BUSY解除を検出した時刻[s]
+
+    @property
+    def duration(self):
+        """モーションの所要時間[s]
+        """
+        return self.end - self.start
+
+    def __repr__(self):
+        return 'Segment({}, start={}, end={})'.format(self.move, self.start, self.end)
+
+
+class MotionQueue(object):
+    """
+    1台のデバイスのモーションを順に実行するクラス
+
+    次のモーションの送信データを実行中に生成しておき、BUSY解除を検出した直後に送信する。
+    BUSYはPinWaiterがあればBUSYピンのエッジで、なければGET_STATUSのポーリングで検出する。
+    """
+
+    def __init__(self, device, pins=None, poll_interval=0.0, clock=time.monotonic):
+        """モーションキューコンストラクタ
+
+        Arguments:
+            device {Device} -- 対象のデバイス
+
+        Keyword Arguments:
+            pins {PinWaiter} -- BUSY/FLAGピンの待機、Noneの場合はステータスをポーリングする (default: {None})
+            poll_interval {float} -- ポーリング周期[s]、0の場合は連続で取得する (default: {0.0})
+            clock {callable} -- 時刻取得関数 (default: {time.monotonic})
+        """
+        self.device = device
+        self.pins = pins
+        self.poll_interval = poll_interval
+        self.clock = clock
+
+        self.segments = []
+
+        self._cancel = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def run(self, moves, timeout=None):
+        """モーションを順に実行し、最後のモーションの完了まで待機する
+
+        Arguments:
+            moves {iterable} -- (コマンド名, 引数...)のリスト、またはジェネレータ
+
+        Keyword Arguments:
+            timeout {float} -- 1モーションあたりのタイムアウト[s] (default: {None})
+
+        Returns:
+            [Segment] -- 実行したモーションの記録
+
+        Raises:
+            RuntimeError: モーション不一致、コマンド不実行、タイムアウト
+        """
+        self.segments = []
+        self._cancel.clear()
+
+        device = self.device
+        moves = iter(moves)
+
+        # 以前のフラグを解除しておく
+        device.getStatus()
+
+        move = next(moves, None)
+        to_send = None if move is None else encode(move)
+
+        while to_send is not None and not self._cancel.is_set():
+            device._motion()
+            device.send(to_send)
+            segment = Segment(move, self.clock())
+            self.segments.append(segment)
+
+            # 待機中に次のモーションを準備する
+            move = next(moves, None)
+            next_send = None if move is None else encode(move)
+
+            segment.end = self._waitIdle(segment, timeout)
+            to_send = next_send
+
+        return self.segments
+
+    def start(self, moves, timeout=None):
+        """モーションの実行をバックグラウンドで開始する
+
+        Arguments:
+            moves {iterable} -- (コマンド名, 引数...)のリスト、またはジェネレータ
+
+        Keyword Arguments:
+            timeout {float} -- 1モーションあたりのタイムアウト[s] (default: {None})
+        """
+        self._error = None
+
+        def target():
+            try:
+                self.run(moves, timeout)
+            except Exception as e:
+                self._error = e
+
+        self._thread = threading.Thread(target=target, name='MotionQueue')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def join(self, timeout=None):
+        """バックグラウンドの実行完了を待つ
+
+        Keyword Arguments:
+            timeout {float} -- タイムアウト[s] (default: {None})
+
+        Returns:
+            [Segment] -- 実行したモーションの記録
+
+        Raises:
+            RuntimeError: 実行中に発生したエラー
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
+
+        if self._error is not None:
+            raise self._error
+
+        return self.segments
+
+    def cancel(self):
+        """実行中のモーションの完了後、以降のモーションを送信しない
+        """
+        self._cancel.set()
+
+    def gaps(self):
+        """モーション間の空き時間を返す
+
+        Returns:
+            [float] -- 前のモーションのBUSY解除から次のモーション送信完了までの時間[s]
+        """
+        return [b.start - a.end for a, b in zip(self.segments, self.segments[1:])
+                if a.end is not None]
+
+    def _waitIdle(self, segment, timeout):
+        """BUSY解除を待ち、検出した時刻を返す
+        """
+        device = self.device
+        deadline = None if timeout is None else segment.start + timeout
+
+        if self.pins is not None and self.pins.busy is not None:
+            remain = None if deadline is None else max(deadline - self.clock(), 0.0)
+            if not self.pins.waitIdle(remain):
+                self._timeout(segment)
+            end = self.clock()
+
+            # FLAGピンがアクティブならコマンド不実行を確認する
+            if self.pins.flag is not None and self.pins.flag.value() == 0:
+                self._check(segment, device.getStatus())
+
+            return end
+
+        while True:
+            status = device.getStatus()
+            end = self.clock()
+
+            self._check(segment, status)
+
+            # BUSYビットは負論理 (1:アイドル)
+            if status[1] & 0x02:
+                return end
+
+            if deadline is not None and end >= deadline:
+                self._timeout(segment)
+
+            if self.poll_interval > 0:
+                time.sleep(self.poll_interval)
+
+    def _check(self, segment, status):
+        """コマンド不実行(NOTPERF_CMD, WRONG_CMD)を確認する
+        """
+        if (status[1] & 0x80) or (status[0] & 0x01):
+            err = '"MotionQueue"のモーション{}が実行されなかった'.format(segment.move)
+            raise RuntimeError(err)
+
+    def _timeout(self, segment):
+        """タイムアウトのエラーを発生させる
+        """
+        err = '"MotionQueue"のモーション{}がタイムアウト'.format(segment.move)
+        raise RuntimeError(err)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .l6470 import ABS_POS, ACC, DEC, MAX_SPEED, MIN_SPEED, STEP_MODE
+from . import units
+
+
+class Profile(object):
+    """
+    台形速度プロファイルの計算結果
+
+    各値は入力の形に合わせたnumpy配列 (スカラー入力の場合は0次元配列)。
+    """
+    __slots__ = ('t_acc', 't_const', 't_dec', 'v_peak')
+
+    def __init__(self, t_acc, t_const, t_dec, v_peak):
+        self.t_acc = t_acc          # 加速時間[s]
+        self.t_const = t_const      # 定速時間[s]
+        self.t_dec = t_dec          # 減速時間[s]
+        self.v_peak = v_peak        # 最高速度[step/s]
+
+    @property
+    def total(self):
+        """所要時間[s]
+        """
+        return self.t_acc + self.t_const + self.t_dec
+
+    def __repr__(self):
+        return 'Profile(t_acc={}, t_const={}, t_dec={}, total={}, v_peak={})'.format(
+            self.t_acc, self.t_const, self.t_dec, self.total, self.v_peak)
+
+
+def _numpy():
+    """numpyモジュールを返す
+    """
+    if np is None:
+        err = '"planner"にはnumpyモジュールが必要'
+        raise RuntimeError(err)
+
+    return np
+
+
+def profile(distance, max_speed, acc, dec, min_speed=0.0):
+    """L6470が実行する台形速度プロファイルを計算する
+
+    MIN_SPEEDから加速してMAX_SPEEDで定速移動し、MIN_SPEEDまで減速して停止する。
+    距離が短い場合はMAX_SPEEDに達しない三角形のプロファイルになる。
+    引数は同じ形、またはブロードキャスト可能な形の配列を受付ける。
+
+    Arguments:
+        distance {float or array} -- 移動量[step] (フルステップ)
+        max_speed {float or array} -- 最大速度[step/s]
+        acc {float or array} -- 加速度[step/s^2]
+        dec {float or array} -- 減速度[step/s^2]
+
+    Keyword Arguments:
+        min_speed {float or array} -- 最小速度[step/s] (default: {0.0})
+
+    Returns:
+        Profile -- プロファイル
+
+    Raises:
+        RuntimeError: numpyモジュールが存在しない
+    """
+    np = _numpy()
+
+    distance, max_speed, acc, dec, min_speed = np.broadcast_arrays(
+        np.abs(np.asarray(distance, dtype=np.float64)),
+        np.asarray(max_speed, dtype=np.float64),
+        np.asarray(acc, dtype=np.float64),
+        np.asarray(dec, dtype=np.float64),
+        np.asarray(min_speed, dtype=np.float64))
+
+    # MAX_SPEEDがMIN_SPEEDより小さい場合はMIN_SPEEDで移動する
+    top = np.maximum(max_speed, min_speed)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_acc = 1.0 / acc
+        inv_dec = 1.0 / dec
+
+        # 最大速度までの加減速に必要な距離
+        ramp = (top * top - min_speed * min_speed) * 0.5 * (inv_acc + inv_dec)
+        ramp = np.where(top > min_speed, ramp, 0.0)
+
+        # 最大速度に達しない場合の最高速度 v^2 = vmin^2 + 2*D*a*d/(a+d)
+        peak = np.sqrt(min_speed * min_speed + 2.0 * distance / (inv_acc + inv_dec))
+        v_peak = np.where(distance >= ramp, top, np.minimum(peak, top))
+
+        t_acc = np.where(v_peak > min_speed, (v_peak - min_speed) * inv_acc, 0.0)
+        t_dec = np.where(v_peak > min_speed, (v_peak - min_speed) * inv_dec, 0.0)
+        t_const = np.where(distance > ramp, (distance - ramp) / top, 0.0)
+
+    # 移動しない場合は0、加減速度が0の場合は終了しない
+    moving = distance > 0
+    t_const = np.where(moving & ((acc <= 0) | (dec <= 0)), np.inf, t_const)
+    v_peak = np.where(moving, v_peak, 0.0)
+    t_acc = np.where(moving, t_acc, 0.0)
+    t_const = np.where(moving, t_const, 0.0)
+    t_dec = np.where(moving, t_dec, 0.0)
+
+    return Profile(t_acc, t_const, t_dec, v_peak)
+
+
+def fromRegisters(distance, max_speed, acc, dec, min_speed=0, step_mode=0x07):
+    """レジスタ値から台形速度プロファイルを計算する
+
+    Arguments:
+        distance {int or array} -- 移動量[マイクロステップ]
+        max_speed {int or array} -- MAX_SPEEDのレジスタ値
+        acc {int or array} -- ACCのレジスタ値
+        dec {int or array} -- DECのレジスタ値
+
+    Keyword Arguments:
+        min_speed {int or array} -- MIN_SPEEDのレジスタ値 (LSPD_OPTビットは無視する) (default: {0})
+        step_mode {int or array} -- STEP_MODEのレジスタ値 (default: {0x07})
+
+    Returns:
+        Profile -- プロファイル
+
+    Raises:
+        RuntimeError: numpyモジュールが存在しない
+    """
+    np = _numpy()
+
+    step_sel = np.minimum(np.asarray(step_mode, dtype=np.int64) & 0x07, 7)
+    microsteps = np.left_shift(1, step_sel).astype(np.float64)
+
+    return profile(np.asarray(distance, dtype=np.float64) / microsteps,
+                   np.asarray(max_speed, dtype=np.float64) * units.MAX_SPEED_SCALE,
+                   np.asarray(acc, dtype=np.float64) * units.ACC_SCALE,
+                   np.asarray(dec, dtype=np.float64) * units.ACC_SCALE,
+                   (np.asarray(min_speed, dtype=np.int64) & 0x0fff) * units.MIN_SPEED_SCALE)
+
+
+def predict(device, distance=None, target=None):
+    """デバイスの現在のレジスタ値から移動の所要時間を予測する
+
+    停止中のデバイスで、移動量(MOVE)または目標絶対位置(GO_TO)を指定する。
+
+    Arguments:
+        device {Device} -- 対象のデバイス
+
+    Keyword Arguments:
+        distance {int} -- 移動量[マイクロステップ] (default: {None})
+        target {int} -- 目標絶対位置[マイクロステップ] (default: {None})
+
+    Returns:
+        Profile -- プロファイル
+
+    Raises:
+        RuntimeError: 移動量と目標絶対位置のどちらも指定されていない
+    """
+    if target is not None:
+        # GO_TOは短い方向に移動する
+        distance = abs(target - device.getParamInt(ABS_POS)) & 0x3fffff
+        distance = min(distance, 0x400000 - distance)
+    elif distance is None:
+        err = '"predict()"関数にはdistanceまたはtargetが必要'
+        raise RuntimeError(err)
+
+    return fromRegisters(distance,
+                         device.getParamInt(MAX_SPEED),
+                         device.getParamInt(ACC),
+                         device.getParamInt(DEC),
+                         device.getParamInt(MIN_SPEED),
+                         device.getParamInt(STEP_MODE))
+
+
+def waitIdle(device, duration, start=None, margin=0.005, poll_interval=0.001,
+             timeout=None):
+    """予測した終了時刻の直前までスリープし、その後BUSY解除までポーリングする
+
+    Arguments:
+        device {Device} -- 対象のデバイス
+        duration {float or Profile} -- 予測所要時間[s]、またはプロファイル
+
+    Keyword Arguments:
+        start {float} -- モーション開始時刻 (time.monotonic)、Noneの場合は現在 (default: {None})
+        margin {float} -- 予測終了時刻より前にポーリングを始める時間[s] (default: {0.005})
+        poll_interval {float} -- ポーリング周期[s] (default: {0.001})
+        timeout {float} -- 予測終了時刻からのタイムアウト[s]、Noneの場合は無制限 (default: {None})
+
+    Returns:
+        Status -- BUSY解除時のステータス
+
+    Raises:
+        RuntimeError: タイムアウト
+    """
+    if type(duration) is Profile:
+        duration = float(duration.total)
+
+    if start is None:
+        start = time.monotonic()
+
+    end = start + duration
+    delay = end - margin - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+    while True:
+        status = device.updateStatus()
+
+        # BUSYビットは負論理 (1:アイドル)
+        if status.BUSY:
+            return status
+
+        if timeout is not None and time.monotonic() > end + timeout:
+            err = '"waitIdle()"がタイムアウト (予測所要時間 {:.3f}s)'.format(duration)
+            raise RuntimeError(err)
+
+        time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import mmap
+import os
+import struct
+import time
+
+from .transport import Transport
+from ._compat import monotonic_ns
+
+
+# ファイルヘッダ (マジック, バージョン, 予約, 記録開始時刻[UNIX時刻])
+MAGIC = b'L6470REC'
+VERSION = 1
+_HEADER = struct.Struct('<8sHHd')
+
+# レコードヘッダ (記録開始からの時刻[ns], CSを保持するバイト数, 送信バイト数)
+#   続けて送信データ、受信データを同じバイト数ずつ格納する
+_RECORD = struct.Struct('<QHH')
+
+# 追記を開始したことを示すレコードのframe値 (転送のframeは1以上)
+#   送信データに記録開始時刻[UNIX時刻]を格納し、以降のレコードの時刻はこの記録開始からとする
+SESSION = 0
+_SESSION = struct.Struct('<d')
+
+
+class Record(object):
+    """
+    記録した1回の転送
+    """
+    __slots__ = ('t', 'frame', 'tx', 'rx', 'session')
+
+    def __init__(self, t, frame, tx, rx, session=0):
+        self.t = t              # 記録開始からの時刻[ns]
+        self.frame = frame      # CSを保持するバイト数
+        self.tx = tx            # 送信データ {bytes}
+        self.rx = rx            # 受信データ {bytes}
+        self.session = session  # 記録開始の番号 (追記する毎に増える)
+
+    @property
+    def opcode(self):
+        """先頭のコマンド値
+        """
+        return self.tx[0] if len(self.tx) > 0 else None
+
+    def __repr__(self):
+        return 'Record(t={}, frame={}, tx={}, rx={}, session={})'.format(
+            self.t, self.frame, self.tx.hex(), self.rx.hex(), self.session)
+
+
+class RecordingTransport(Transport):
+    """
+    転送をバイナリファイルに追記しながら送受信するトランスポートクラス
+    """
+
+    def __init__(self, transport, path, buffering=65536, clock=monotonic_ns):
+        """記録トランスポートコンストラクタ
+
+        Arguments:
+            transport {Transport} -- 実際に送受信するトランスポート
+            path {str} -- 記録ファイルのパス (存在する場合は記録開始のレコードに続けて追記する)
+
+        Keyword Arguments:
+            buffering {int} -- 書込みバッファのバイト数 (default: {65536})
+            clock {callable} -- 時刻取得関数[ns] (default: {time.monotonic_ns})
+        """
+        self.transport = transport
+        self.clock = clock
+
+        self.file = open(path, 'ab', buffering=buffering)
+        if self.file.tell() == 0:
+            self.file.write(_HEADER.pack(MAGIC, VERSION, 0, time.time()))
+        else:
+            # 時刻は記録開始からのため、追記する場合は区切りを記録する
+            self.file.write(_RECORD.pack(0, SESSION, _SESSION.size)
+                            + _SESSION.pack(time.time()) + bytes(_SESSION.size))
+
+        self.start = clock()
+
+    def transfer(self, to_send, frame=1):
+        """送受信し、転送を記録する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        from_recv = self.transport.transfer(to_send, frame)
+
+        self.file.write(_RECORD.pack(self.clock() - self.start, frame, len(to_send))
+                        + bytes(to_send) + bytes(from_recv))
+
+        return from_recv
+
+    def flush(self):
+        """書込みバッファをファイルに書出す
+        """
+        self.file.flush()
+
+    def close(self):
+        """記録ファイルとトランスポートを閉じる
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        self.transport.close()
+
+
+class LogReader(object):
+    """
+    記録ファイルをメモリマップして読出すクラス
+    """
+
+    def __init__(self, path):
+        """記録読出しコンストラクタ
+
+        Arguments:
+            path {str} -- 記録ファイルのパス
+
+        Raises:
+            RuntimeError: 記録ファイルではない、または未対応のバージョン
+        """
+        self.path = path
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                err = '"LogReader()"の記録ファイルが不正: {}'.format(path)
+                raise RuntimeError(err)
+
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, reserved, self.started = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            err = '"LogReader()"の記録ファイルが不正: {}'.format(path)
+            raise RuntimeError(err)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        """記録した転送を順に返す
+
+        書込み途中の末尾のレコードは無視する。時刻は記録開始(Record.session)毎に0から始まる。
+        """
+        for record in self._records():
+            if record.frame != SESSION:
+                yield record
+
+    def sessions(self):
+        """記録開始時刻の一覧を返す
+
+        Returns:
+            [float] -- 記録開始時刻[UNIX時刻] (Record.sessionの順)
+        """
+        return [self.started] + [_SESSION.unpack(record.tx)[0]
+                                 for record in self._records() if record.frame == SESSION]
+
+    def _records(self):
+        """記録開始のレコードを含む全てのレコードを順に返す
+        """
+        data = self.map
+        size = len(data)
+        pos = _HEADER.size
+        session = 0
+
+        while pos + _RECORD.size <= size:
+            t, frame, n = _RECORD.unpack_from(data, pos)
+            pos += _RECORD.size
+
+            if pos + 2 * n > size:
+                break
+
+            if frame == SESSION:
+                session += 1
+
+            yield Record(t, frame, data[pos:pos + n], data[pos + n:pos + 2 * n], session)
+            pos += 2 * n
+
+    def count(self):
+        """記録した転送の数を返す
+        """
+        return sum(1 for record in self)
+
+    def close(self):
+        """メモリマップを閉じる
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+class ReplayTransport(Transport):
+    """
+    記録した受信データを順に返すトランスポートクラス
+
+    strictの場合は送信データが記録と異なるとエラーにする。
+    """
+
+    def __init__(self, log, strict=True, realtime=False):
+        """再生トランスポートコンストラクタ
+
+        Arguments:
+            log {str or LogReader} -- 記録ファイルのパス、または記録読出し
+
+        Keyword Arguments:
+            strict {bool} -- 送信データを記録と照合する (default: {True})
+            realtime {bool} -- 記録した時刻の間隔を再現する (default: {False})
+        """
+        if type(log) is str:
+            log = LogReader(log)
+
+        self.log = log
+        self.strict = strict
+        self.realtime = realtime
+
+        self.index = 0
+        self._records = iter(log)
+        self._start = None
+        self._session = None
+
+    def transfer(self, to_send, frame=1):
+        """次の記録の受信データを返す
+
+        Arguments:
+            to_send {[int]} -- 送信データ
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 記録した受信データ
+
+        Raises:
+            RuntimeError: 記録の終端、または送信データが記録と不一致
+        """
+        record = next(self._records, None)
+        if record is None:
+            err = '"ReplayTransport"の記録の終端 ({}件)'.format(self.index)
+            raise RuntimeError(err)
+
+        if self.strict and (record.frame != frame or record.tx != bytes(to_send)):
+            err  = '"ReplayTransport"の送信データが記録と不一致 (#{})\n'.format(self.index)
+            err += '   記録: {} (frame={})\n'.format(record.tx.hex(), record.frame)
+            err += '   送信: {} (frame={})'.format(bytes(to_send).hex(), frame)
+            raise RuntimeError(err)
+
+        if self.realtime:
+            # 記録開始毎に時刻が0に戻るため、基準を取り直す
+            if self._start is None or record.session != self._session:
+                self._start = monotonic_ns() - record.t
+                self._session = record.session
+            delay = self._start + record.t - monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+
+        self.index += 1
+
+        return list(record.rx)
+
+    def close(self):
+        """記録読出しを閉じる
+        """
+        self._records = iter(())
+        self.log.close()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import math
+import time
+
+from . import l6470
+from .transport import Transport
+from .units import SPEED_SCALE, ACC_SCALE, MAX_SPEED_SCALE, MIN_SPEED_SCALE
+from .units import toSigned22
+
+# モーション計算の積分周期[s]
+SLICE = 0.001
+
+# 電源投入時のレジスタ値
+RESET_VALUES = {
+    l6470.ABS_POS.addr:    0x000000,
+    l6470.EL_POS.addr:     0x000,
+    l6470.MARK.addr:       0x000000,
+    l6470.SPEED.addr:      0x00000,
+    l6470.ACC.addr:        0x08a,
+    l6470.DEC.addr:        0x08a,
+    l6470.MAX_SPEED.addr:  0x041,
+    l6470.MIN_SPEED.addr:  0x000,
+    l6470.FS_SPD.addr:     0x027,
+    l6470.KVAL_HOLD.addr:  0x29,
+    l6470.KVAL_RUN.addr:   0x29,
+    l6470.KVAL_ACC.addr:   0x29,
+    l6470.KVAL_DEC.addr:   0x29,
+    l6470.INIT_SPEED.addr: 0x0408,
+    l6470.ST_SLP.addr:     0x19,
+    l6470.FN_SLP_ACC.addr: 0x29,
+    l6470.FN_SLP_DEC.addr: 0x29,
+    l6470.K_THERM.addr:    0x0,
+    l6470.ADC_OUT.addr:    0x00,
+    l6470.OCD_TH.addr:     0x8,
+    l6470.STALL_TH.addr:   0x40,
+    l6470.STEP_MODE.addr:  0x07,
+    l6470.ALARM_EN.addr:   0xff,
+    l6470.CONFIG.addr:     0x2e88,
+    l6470.STATUS.addr:     0x0000,
+}
+
+# ステータスレジスタのラッチフラグ (GET_STATUSでクリアされる)
+#   {フラグ名: (ビット位置, 負論理)}
+LATCHED_FLAGS = {
+    'SW_EVN':      (3,  False),
+    'NOTPERF_CMD': (7,  False),
+    'WRONG_CMD':   (8,  False),
+    'UVLO':        (9,  True),
+    'TH_WRN':      (10, True),
+    'TH_SD':       (11, True),
+    'OCD':         (12, True),
+    'STEP_LOSS_A': (13, True),
+    'STEP_LOSS_B': (14, True),
+}
+
+# STALL_THの分解能[mA]
+STALL_TH_STEP = 31.25
+
+# モーション状態
+STOPPED = 'STOPPED'
+RUNNING = 'RUN'
+POSITIONING = 'POSITIONING'
+GO_UNTIL = 'GO_UNTIL'
+RELEASE_SW = 'RELEASE_SW'
+STOPPING = 'STOPPING'
+
+
+class ManualClock(object):
+    """
+    手動で進める時計 (テスト用)
+    """
+
+    def __init__(self, now=0.0):
+        """手動時計コンストラクタ
+
+        Keyword Arguments:
+            now {float} -- 初期時刻[s] (default: {0.0})
+        """
+        self.now = now
+
+    def __call__(self):
+        """現在時刻を返す
+        """
+        return self.now
+
+    def advance(self, seconds):
+        """時刻を進める
+
+        Arguments:
+            seconds {float} -- 進める時間[s]
+        """
+        self.now += seconds
+
+
+class SimulatedL6470(object):
+    """
+    L6470のSPIプロトコル、レジスタ、ステータスおよび
+    ACC/DEC/MAX_SPEEDに従う台形モーションを模擬するクラス
+    """
+
+    # パラメータレジスタ定義 {アドレス: Param}
+    PARAMS = dict((param.addr, param) for param in l6470.PARAMS.values())
+
+    def __init__(self, clock=time.monotonic):
+        """シミュレータコンストラクタ
+
+        Keyword Arguments:
+            clock {callable} -- 現在時刻[s]を返す関数 (default: {time.monotonic})
+        """
+        self.clock = clock
+
+        # 外部スイッチ入力 (True:オン)
+        self.switch = False
+
+        # 機械的な位置[マイクロステップ] (ABS_POSのリセットやストールでずれる)
+        self.mech = 0.0
+
+        # 機械的な限界 (setLimits()で設定する)
+        self.limit_dir = -1
+        self.switch_pos = None
+        self.stop_pos = None
+
+        # 相電流のモデル[mA] (自由回転中は速度に比例して増え、ハードストップに当たると増える)
+        self.free_current = 400.0
+        self.current_slope = 0.5
+        self.stall_current = 1500.0
+
+        self.powerOn()
+
+    # === 外部操作 ===
+    def powerOn(self):
+        """電源投入時の状態に初期化する
+        """
+        self.regs = {}
+        for addr, param in self.PARAMS.items():
+            self.regs[addr] = RESET_VALUES[addr] & self._fullMask(param)
+
+        # モーション状態
+        self.pos = 0.0
+        self.speed = 0.0
+        self.dir = 1
+        self.motion = STOPPED
+        self.mot_status = 0b00
+        self.target_pos = 0.0
+        self.target_speed = 0.0
+        self.act = False
+        self.hiz = True
+        self.hiz_after_stop = False
+        self.sck_mod = False
+        self.el_base = 0
+
+        # ラッチフラグ (True:アクティブ)、電源投入直後は低電圧フラグがアクティブ
+        self.flags = dict.fromkeys(LATCHED_FLAGS, False)
+        self.flags['UVLO'] = True
+
+        # SPIシリアル受信状態
+        self.cmd = None
+        self.args = []
+        self.n_args = 0
+        self.out = []
+
+        self.last = self.clock()
+
+    def inject(self, name):
+        """ラッチフラグをアクティブにする (故障注入)
+
+        Arguments:
+            name {str} -- フラグ名 ex.'UVLO', 'OCD'
+        """
+        if name not in self.flags:
+            err = '"inject()"関数の未知のフラグ名: {}'.format(name)
+            raise RuntimeError(err)
+
+        self.flags[name] = True
+
+    def setSwitch(self, on):
+        """外部スイッチ入力を変更する
+
+        Arguments:
+            on {bool} -- True:オン, False:オフ
+        """
+        self.update()
+        self._setSwitch(on)
+
+    def _setSwitch(self, on):
+        """スイッチ入力の変化を処理する
+        """
+        if on and not self.switch:
+            self.flags['SW_EVN'] = True
+            if self.motion == GO_UNTIL:
+                self._switchAction()
+                self.motion = STOPPING
+        elif not on and self.switch:
+            if self.motion == RELEASE_SW:
+                self._switchAction()
+                self._stop()
+
+        self.switch = on
+
+    def setLimits(self, switch_pos=None, stop_pos=None, dir=False):
+        """機械的なリミットスイッチとハードストップを設定する
+
+        Keyword Arguments:
+            switch_pos {float} -- この位置を越えるとスイッチがオンになる、Noneの場合はなし (default: {None})
+            stop_pos {float} -- これ以上進めないハードストップの位置、Noneの場合はなし (default: {None})
+            dir {bool} -- リミットの方向 True:正方向, False:負方向 (default: {False})
+        """
+        self.update()
+
+        self.limit_dir = 1 if dir else -1
+        self.switch_pos = switch_pos
+        self.stop_pos = stop_pos
+
+        self._mechanics(0.0)
+
+    # === SPI ===
+    def shift(self, value):
+        """1バイト(CS1回分)を送受信する
+
+        Arguments:
+            value {int} -- 受信バイト
+
+        Returns:
+            int -- 送信バイト
+        """
+        self.update()
+
+        out = self.out.pop(0) if len(self.out) > 0 else 0x00
+
+        if self.cmd is None:
+            self._decode(value & 0xff)
+        else:
+            self.args.append(value & 0xff)
+
+        if self.cmd is not None and len(self.args) >= self.n_args:
+            cmd, args = self.cmd, self.args
+            self.cmd, self.args = None, []
+            self._execute(cmd, args)
+
+        return out
+
+    # === レジスタ ===
+    def read(self, addr):
+        """レジスタ値を読出す
+
+        Arguments:
+            addr {int} -- レジスタアドレス
+
+        Returns:
+            int -- レジスタ値
+        """
+        if addr == l6470.ABS_POS.addr:
+            return int(math.floor(self.pos)) & 0x3fffff
+        if addr == l6470.EL_POS.addr:
+            return (self.el_base + int(self.pos * (128 >> self._stepSel()))) & 0x1ff
+        if addr == l6470.SPEED.addr:
+            return int(self.speed / SPEED_SCALE) & 0xfffff
+        if addr == l6470.STATUS.addr:
+            return self.status()
+
+        return self.regs[addr]
+
+    def write(self, addr, value):
+        """レジスタ値を書込む
+
+        Arguments:
+            addr {int} -- レジスタアドレス
+            value {int} -- レジスタ値
+        """
+        value &= self._fullMask(self.PARAMS[addr])
+
+        if addr == l6470.ABS_POS.addr:
+            self.pos = float(toSigned22(value))
+        elif addr == l6470.EL_POS.addr:
+            self.el_base = value - int(self.pos * (128 >> self._stepSel()))
+
+        self.regs[addr] = value
+
+    def status(self):
+        """ステータスレジスタ値を返す
+
+        Returns:
+            int -- 16bitステータス値
+        """
+        value = 0
+        if self.hiz:
+            value |= 0x0001
+        if not self.busy():
+            value |= 0x0002
+        if self.switch:
+            value |= 0x0004
+        if self.dir > 0:
+            value |= 0x0010
+        value |= self.mot_status << 5
+        if self.sck_mod:
+            value |= 0x8000
+
+        for name, (bit, active_low) in LATCHED_FLAGS.items():
+            if self.flags[name] != active_low:
+                value |= 1 << bit
+
+        return value
+
+    def busy(self):
+        """BUSY状態を返す
+
+        Returns:
+            bool -- True:コマンド実行中
+        """
+        if self.motion in (POSITIONING, GO_UNTIL, RELEASE_SW, STOPPING):
+            return True
+        if self.motion == RUNNING:
+            return self.speed != self._runTarget()
+
+        return False
+
+    # === モーション ===
+    def update(self):
+        """現在時刻までモーションを進める
+        """
+        now = self.clock()
+        dt = now - self.last
+        self.last = now
+
+        while dt > 0 and self.motion != STOPPED:
+            h = min(dt, SLICE)
+            dt -= h
+            before = self.pos
+            self._step(h)
+            self._mechanics(self.pos - before)
+
+        if self.motion == STOPPED:
+            self.mot_status = 0b00
+
+    def _step(self, h):
+        """積分周期hだけモーションを進める
+        """
+        acc = self.regs[l6470.ACC.addr] * ACC_SCALE
+        dec = self.regs[l6470.DEC.addr] * ACC_SCALE
+        vmin = (self.regs[l6470.MIN_SPEED.addr] & 0x0fff) * MIN_SPEED_SCALE
+        usteps = 1 << self._stepSel()
+
+        if self.motion == STOPPING:
+            target = 0.0
+        elif self.motion == POSITIONING:
+            remain = abs(self.target_pos - self.pos) / usteps
+            brake = max(self.speed * self.speed - vmin * vmin, 0.0) / (2 * dec) if dec > 0 else 0.0
+            if remain <= brake:
+                target = vmin
+            else:
+                target = self._maxSpeed()
+        elif self.motion == RELEASE_SW:
+            target = max(vmin, 5.0)
+        else:
+            target = self._runTarget()
+
+        v = self.speed
+        if v < target:
+            v = min(target, max(v, vmin) + acc * h)
+            self.mot_status = 0b01
+        elif v > target:
+            v = max(target, v - dec * h)
+            self.mot_status = 0b10
+        else:
+            self.mot_status = 0b11
+
+        if self.motion == POSITIONING:
+            move = v * usteps * h
+            remain = abs(self.target_pos - self.pos)
+            if move >= remain or remain < 1e-9:
+                self.pos = self.target_pos
+                self._stop()
+                return
+            self.pos += self.dir * move
+        else:
+            self.pos += self.dir * v * usteps * h
+
+        self.speed = v
+
+        if self.motion == STOPPING and v <= vmin:
+            self._stop()
+
+    def _mechanics(self, delta):
+        """ABS_POSの変化delta[マイクロステップ]を機械的な位置に反映する
+
+        ハードストップを越える分は脱調とし、相電流がSTALL_THを越えたら
+        STEP_LOSS_A/Bをアクティブにする。リミットスイッチの状態も更新する。
+        """
+        self.mech += delta
+
+        current = self.free_current + self.current_slope * self.speed
+        if self.stop_pos is not None and (self.mech - self.stop_pos) * self.limit_dir >= 0:
+            self.mech = float(self.stop_pos)
+            if delta * self.limit_dir > 0:
+                current = self.stall_current
+
+        if delta != 0 and not self.hiz:
+            threshold = (self.regs[l6470.STALL_TH.addr] + 1) * STALL_TH_STEP
+            if current > threshold:
+                self.flags['STEP_LOSS_A'] = True
+                self.flags['STEP_LOSS_B'] = True
+
+        if self.switch_pos is not None:
+            self._setSwitch((self.mech - self.switch_pos) * self.limit_dir >= 0)
+
+    def _stop(self):
+        """モータを停止状態にする
+        """
+        self.speed = 0.0
+        self.motion = STOPPED
+        self.mot_status = 0b00
+        if self.hiz_after_stop:
+            self.hiz = True
+            self.hiz_after_stop = False
+
+    def _start(self, motion, dir):
+        """モーションを開始する
+        """
+        self.motion = motion
+        self.dir = 1 if dir else -1
+        self.mot_status = 0b01
+        self.hiz = False
+        self.hiz_after_stop = False
+        self.sck_mod = False
+
+    def _goTo(self, abs_pos, dir=None):
+        """目標絶対位置への位置決めを開始する
+        """
+        current = int(math.floor(self.pos))
+        delta = (abs_pos - current) & 0x3fffff
+
+        if dir is None:
+            # 最短経路を選択する
+            dir = delta < 0x200000
+        if not dir:
+            delta = delta - 0x400000 if delta != 0 else 0
+
+        self.target_pos = float(current + delta)
+        self._start(POSITIONING, dir)
+
+        if delta == 0:
+            self._stop()
+
+    def _switchAction(self):
+        """スイッチイベント時のABS_POS/MARK処理
+        """
+        if self.act:
+            self.regs[l6470.MARK.addr] = int(math.floor(self.pos)) & 0x3fffff
+        else:
+            self.pos = 0.0
+
+    def _runTarget(self):
+        """RUN/GO_UNTILの目標速度[step/s]
+        """
+        return min(self.target_speed, self._maxSpeed())
+
+    def _maxSpeed(self):
+        """最大速度[step/s]
+        """
+        return self.regs[l6470.MAX_SPEED.addr] * MAX_SPEED_SCALE
+
+    def _stepSel(self):
+        """マイクロステップ分割数の指数
+        """
+        return min(self.regs[l6470.STEP_MODE.addr] & 0x07, 7)
+
+    def _stopped(self):
+        """モータが停止しているか
+        """
+        return self.motion == STOPPED
+
+    @staticmethod
+    def _fullMask(param):
+        """Paramのマスクを整数で返す
+        """
+        mask = 0
+        for value in param.mask:
+            mask = (mask << 8) | value
+
+        return mask
+
+    # === コマンド ===
+    def _decode(self, value):
+        """コマンドバイトを解釈し、必要な引数バイト数を設定する
+        """
+        if value < 0x40:
+            addr = value & 0x1f
+            if addr == 0x00 and value & 0x20 == 0:
+                # NOP
+                return
+            if addr not in self.PARAMS:
+                self.flags['WRONG_CMD'] = True
+                return
+
+            param = self.PARAMS[addr]
+            if value & 0x20:
+                # GET_PARAM: 続くバイトでレジスタ値を出力する
+                reg = self.read(addr)
+                n = len(param.mask)
+                self.out = [(reg >> (8 * (n - 1 - i))) & 0xff for i in range(n)]
+                self.cmd = value
+                self.n_args = n
+            else:
+                self.cmd = value
+                self.n_args = len(param.mask)
+            return
+
+        n_args = {
+            0x40: 3, 0x41: 3,                   # MOVE
+            0x50: 3, 0x51: 3,                   # RUN
+            0x58: 0, 0x59: 0,                   # STEP_CLOCK
+            0x60: 3,                            # GO_TO
+            0x68: 3, 0x69: 3,                   # GO_TO_DIR
+            0x70: 0, 0x78: 0,                   # GO_HOME, GO_MARK
+            0x82: 3, 0x83: 3, 0x8a: 3, 0x8b: 3, # GO_UNTIL
+            0x92: 0, 0x93: 0, 0x9a: 0, 0x9b: 0, # RELEASE_SW
+            0xa0: 0, 0xa8: 0, 0xb0: 0, 0xb8: 0, # SOFT/HARD HIZ, SOFT/HARD STOP
+            0xc0: 0, 0xd8: 0,                   # RESET_DEVICE, RESET_POS
+            0xd0: 2,                            # GET_STATUS
+        }.get(value)
+
+        if n_args is None:
+            self.flags['WRONG_CMD'] = True
+            return
+
+        if value == l6470.GET_STATUS.addr:
+            status = self.status()
+            self.out = [(status >> 8) & 0xff, status & 0xff]
+            for name in LATCHED_FLAGS:
+                self.flags[name] = False
+
+        self.cmd = value
+        self.n_args = n_args
+
+    def _execute(self, cmd, args):
+        """コマンドを実行する
+        """
+        value = 0
+        for arg in args:
+            value = (value << 8) | arg
+
+        dir = bool(cmd & 0x01)
+
+        if cmd < 0x20:
+            self._setParam(cmd & 0x1f, value)
+        elif cmd < 0x40:
+            pass
+        elif cmd in (0x40, 0x41):
+            # MOVE
+            if not self._stopped():
+                self.flags['NOTPERF_CMD'] = True
+                return
+            n_step = value & 0x3fffff
+            self.target_pos = math.floor(self.pos) + (n_step if dir else -n_step)
+            self._start(POSITIONING, dir)
+            if n_step == 0:
+                self._stop()
+        elif cmd in (0x50, 0x51):
+            # RUN
+            if self.motion != RUNNING or self.dir != (1 if dir else -1):
+                if not self._stopped() and self.dir != (1 if dir else -1):
+                    self.flags['NOTPERF_CMD'] = True
+                    return
+                self._start(RUNNING, dir)
+            self.target_speed = (value & 0xfffff) * SPEED_SCALE
+        elif cmd in (0x58, 0x59):
+            # STEP_CLOCK
+            if not self._stopped():
+                self.flags['NOTPERF_CMD'] = True
+                return
+            self.dir = 1 if dir else -1
+            self.hiz = False
+            self.sck_mod = True
+        elif cmd == 0x60:
+            # GO_TO
+            if self.busy():
+                self.flags['NOTPERF_CMD'] = True
+                return
+            self._goTo(value & 0x3fffff)
+        elif cmd in (0x68, 0x69):
+            # GO_TO_DIR
+            if self.busy():
+                self.flags['NOTPERF_CMD'] = True
+                return
+            self._goTo(value & 0x3fffff, dir)
+        elif cmd == 0x70:
+            # GO_HOME
+            if self.busy():
+                self.flags['NOTPERF_CMD'] = True
+                return
+            self._goTo(0)
+        elif cmd == 0x78:
+            # GO_MARK
+            if self.busy():
+                self.flags['NOTPERF_CMD'] = True
+                return
+            self._goTo(self.regs[l6470.MARK.addr])
+        elif cmd in (0x82, 0x83, 0x8a, 0x8b):
+            # GO_UNTIL
+            self.act = bool(cmd & 0x08)
+            self._start(GO_UNTIL, dir)
+            self.target_speed = (value & 0xfffff) * SPEED_SCALE
+        elif cmd in (0x92, 0x93, 0x9a, 0x9b):
+            # RELEASE_SW
+            self.act = bool(cmd & 0x08)
+            if not self.switch:
+                return
+            self._start(RELEASE_SW, dir)
+        elif cmd == 0xa0:
+            # SOFT_HIZ
+            if self._stopped():
+                self.hiz = True
+            else:
+                self.motion = STOPPING
+                self.hiz_after_stop = True
+        elif cmd == 0xa8:
+            # HARD_HIZ
+            self._stop()
+            self.hiz = True
+        elif cmd == 0xb0:
+            # SOFT_STOP
+            if not self._stopped():
+                self.motion = STOPPING
+        elif cmd == 0xb8:
+            # HARD_STOP
+            self._stop()
+            self.hiz = False
+        elif cmd == 0xc0:
+            # RESET_DEVICE
+            self.powerOn()
+        elif cmd == 0xd8:
+            # RESET_POS
+            self.pos = 0.0
+
+    def _setParam(self, addr, value):
+        """SET_PARAMコマンドを書込みタイミングに従って実行する
+        """
+        rw = self.PARAMS[addr].rw
+
+        if(rw < 0
+            or (rw == 1 and not self._stopped())
+            or (rw == 2 and not self.hiz)):
+
+            self.flags['NOTPERF_CMD'] = True
+            return
+
+        self.write(addr, value)
+
+
+class SimTransport(Transport):
+    """
+    SimulatedL6470を接続したトランスポートクラス
+
+    複数のシミュレータを与えた場合はデイジーチェーン接続として扱い、
+    chips[0]をマスタのMOSIに最も近いデバイスとする。
+    """
+
+    def __init__(self, chips=None, clock=time.monotonic):
+        """シミュレータトランスポートコンストラクタ
+
+        Keyword Arguments:
+            chips {[SimulatedL6470] or int} -- 接続するシミュレータ、またはその台数 (default: {None})
+            clock {callable} -- シミュレータを生成する場合の時計 (default: {time.monotonic})
+        """
+        if chips is None:
+            chips = 1
+        if type(chips) is int:
+            chips = [SimulatedL6470(clock) for i in range(chips)]
+
+        self.chips = chips
+
+    def transfer(self, to_send, frame=1):
+        """送信データを送受信する
+
+        Arguments:
+            to_send {[int]} -- 送信データ
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        n = len(self.chips)
+
+        if frame != n:
+            err = '"transfer()"関数のフレームサイズ{}が接続デバイス数{}と不一致'.format(frame, n)
+            raise RuntimeError(err)
+
+        from_recv = []
+        for i in range(0, len(to_send), n):
+            for k in range(n):
+                from_recv.append(self.chips[n - 1 - k].shift(to_send[i + k]))
+
+        return from_recv
+
+
+if __name__ == '__main__':
+    pass
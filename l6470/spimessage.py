@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import ctypes
+import fcntl
+
+
+class SpiIocTransfer(ctypes.Structure):
+    """Linux spidevの struct spi_ioc_transfer
+    """
+    _fields_ = [
+        ('tx_buf', ctypes.c_uint64),
+        ('rx_buf', ctypes.c_uint64),
+        ('len', ctypes.c_uint32),
+        ('speed_hz', ctypes.c_uint32),
+        ('delay_usecs', ctypes.c_uint16),
+        ('bits_per_word', ctypes.c_uint8),
+        ('cs_change', ctypes.c_uint8),
+        ('tx_nbits', ctypes.c_uint8),
+        ('rx_nbits', ctypes.c_uint8),
+        ('word_delay_usecs', ctypes.c_uint8),
+        ('pad', ctypes.c_uint8),
+    ]
+
+
+# 1回のioctlのセグメント数の上限 (ioctlリクエスト値のサイズは14bit)
+MAX_SEGMENTS = ((1 << 14) - 1) // ctypes.sizeof(SpiIocTransfer)
+
+
+def SPI_IOC_MESSAGE(n):
+    """SPI_IOC_MESSAGE(n)のioctlリクエスト値を返す
+
+    Arguments:
+        n {int} -- セグメント数
+
+    Returns:
+        int -- ioctlリクエスト値 _IOW('k', 0, char[n * sizeof(spi_ioc_transfer)])
+
+    Raises:
+        RuntimeError: セグメント数がMAX_SEGMENTSを超える
+    """
+    size = n * ctypes.sizeof(SpiIocTransfer)
+    if size >= 1 << 14:
+        err = '"SPI_IOC_MESSAGE()"のセグメント数が上限({})を超える: {}'.format(MAX_SEGMENTS, n)
+        raise RuntimeError(err)
+
+    return (1 << 30) | (size << 16) | (ord('k') << 8) | 0
+
+
+class SpiMessage:
+    """
+    複数セグメントのSPIメッセージを1回のioctlで送受信するクラス
+
+    セグメント毎にチップセレクトを切り替えるため、L6470の
+    1バイト毎にCSを上げる必要があるプロトコルを1システムコールで実行できる。
+    セグメント数がMAX_SEGMENTSを超える場合はMAX_SEGMENTS毎に分割して送受信する。
+    """
+
+    def __init__(self, fd, delay_usecs=0):
+        """SPIメッセージコンストラクタ
+
+        Arguments:
+            fd {int} -- SPIデバイスのファイルディスクリプタ
+
+        Keyword Arguments:
+            delay_usecs {int} -- セグメント毎のCS切替前の待ち時間[us] (default: {0})
+        """
+        self.fd = fd
+        self.delay_usecs = delay_usecs
+
+        # (送信サイズ, フレームサイズ)毎に確保済みのバッファ
+        self._buffers = {}
+
+    def transfer(self, to_send, frame=1):
+        """送信データを1回のioctlで送受信する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+
+        Raises:
+            RuntimeError: 送信データがフレームサイズの倍数ではない
+        """
+        size = len(to_send)
+
+        key = (size, frame)
+        buffers = self._buffers.get(key)
+        if buffers is None:
+            buffers = self._allocate(size, frame)
+            self._buffers[key] = buffers
+
+        messages, tx, rx = buffers
+
+        tx[:size] = to_send
+        for request, xfers in messages:
+            fcntl.ioctl(self.fd, request, xfers)
+
+        return rx[:size]
+
+    def _allocate(self, size, frame):
+        """ioctl毎のセグメント配列と送受信バッファを確保する
+        """
+        if size % frame != 0:
+            err = '"transfer()"関数の送信データがフレームサイズの倍数ではない'
+            raise RuntimeError(err)
+
+        n_segment = size // frame
+
+        tx = (ctypes.c_uint8 * size)()
+        rx = (ctypes.c_uint8 * size)()
+
+        tx_addr = ctypes.addressof(tx)
+        rx_addr = ctypes.addressof(rx)
+
+        messages = []
+        for begin in range(0, n_segment, MAX_SEGMENTS):
+            n = min(n_segment - begin, MAX_SEGMENTS)
+            xfers = (SpiIocTransfer * n)()
+
+            for i in range(n):
+                offset = (begin + i) * frame
+                xfers[i].tx_buf = tx_addr + offset
+                xfers[i].rx_buf = rx_addr + offset
+                xfers[i].len = frame
+                xfers[i].delay_usecs = self.delay_usecs
+                # 最終セグメント以外はセグメント終了毎にCSを解除する
+                xfers[i].cs_change = 1 if i < n - 1 else 0
+
+            messages.append((SPI_IOC_MESSAGE(n), xfers))
+
+        return (messages, tx, rx)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import enum
+
+
+# ステータスレジスタのビットフィールド定義
+#   (フィールド名, シフト量, マスク)
+FIELDS = (
+    ('HiZ',         0,  0x1),
+    ('BUSY',        1,  0x1),
+    ('SW_F',        2,  0x1),
+    ('SW_EVN',      3,  0x1),
+    ('DIR',         4,  0x1),
+    # MOT_STATUS: モータ制御状態ビット
+    #   0b00: STOPPED, 0b01: ACC, 0b10: DEC, 0b11: CONST
+    ('MOT_STATUS',  5,  0x3),
+    ('NOTPERF_CMD', 7,  0x1),
+    ('WRONG_CMD',   8,  0x1),
+    ('UVLO',        9,  0x1),
+    ('TH_WRN',      10, 0x1),
+    ('TH_SD',       11, 0x1),
+    ('OCD',         12, 0x1),
+    ('STEP_LOSS_A', 13, 0x1),
+    ('STEP_LOSS_B', 14, 0x1),
+    ('SCK_MOD',     15, 0x1),
+)
+
+_FIELD_MAP = dict((name, (shift, mask)) for name, shift, mask in FIELDS)
+
+# MOT_STATUSの値
+STOPPED = 0b00
+ACC     = 0b01
+DEC     = 0b10
+CONST   = 0b11
+
+
+class StatusFlag(enum.IntFlag):
+    """ステータスレジスタのビットフラグ
+    """
+    HiZ         = 0x0001
+    BUSY        = 0x0002
+    SW_F        = 0x0004
+    SW_EVN      = 0x0008
+    DIR         = 0x0010
+    MOT_STATUS  = 0x0060
+    NOTPERF_CMD = 0x0080
+    WRONG_CMD   = 0x0100
+    UVLO        = 0x0200
+    TH_WRN      = 0x0400
+    TH_SD       = 0x0800
+    OCD         = 0x1000
+    STEP_LOSS_A = 0x2000
+    STEP_LOSS_B = 0x4000
+    SCK_MOD     = 0x8000
+
+
+class Status(int):
+    """
+    16bitステータスレジスタ値を保持する不変クラス
+
+    int のサブクラスのため、2つのステータスの比較は整数比較1回で済む。
+    各フィールドは属性 status.BUSY または status['BUSY'] で参照した時に
+    生データから取り出す。値はレジスタのビット値そのまま(負論理のビットも反転しない)。
+    """
+    __slots__ = ()
+
+    @classmethod
+    def fromBytes(cls, values):
+        """GET_STATUSの返り値からステータスを生成する
+
+        Arguments:
+            values {[int]} -- ステータスレジスタ値 ex.[0x7e, 0x03]
+
+        Returns:
+            Status -- ステータス
+        """
+        return cls((values[0] << 8) | values[1])
+
+    @property
+    def raw(self):
+        """16bitの生データ
+        """
+        return int(self)
+
+    @property
+    def flags(self):
+        """ビットフラグ表現
+        """
+        return StatusFlag(int(self))
+
+    def __getitem__(self, name):
+        """フィールド値を取得する
+
+        Arguments:
+            name {str} -- フィールド名 ex.'BUSY'
+
+        Returns:
+            int -- フィールド値
+        """
+        shift, mask = _FIELD_MAP[name]
+
+        return (int(self) >> shift) & mask
+
+    def keys(self):
+        """フィールド名の一覧を返す
+        """
+        return [name for name, shift, mask in FIELDS]
+
+    def items(self):
+        """(フィールド名, フィールド値)の一覧を返す
+        """
+        value = int(self)
+
+        return [(name, (value >> shift) & mask) for name, shift, mask in FIELDS]
+
+    def asdict(self):
+        """フィールド名をキーとする辞書に変換する
+        """
+        return dict(self.items())
+
+    def __repr__(self):
+        fields = ', '.join('{}={}'.format(name, value) for name, value in self.items())
+
+        return 'Status(0x{:04x}, {})'.format(int(self), fields)
+
+    __str__ = __repr__
+
+
+def _field(shift, mask):
+    """フィールド値を取り出すプロパティを生成する
+    """
+    return property(lambda self: (int(self) >> shift) & mask)
+
+
+for _name, _shift, _mask in FIELDS:
+    setattr(Status, _name, _field(_shift, _mask))
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .status import Status
+
+
+# 既定のファイルパス (/dev/shmはメモリ上のファイルシステム)
+DEFAULT_PATH = '/dev/shm/l6470-status'
+
+# ファイルヘッダ (マジック, バージョン, デバイス数, スロットのバイト数)
+MAGIC = b'L6470BRD'
+VERSION = 1
+_HEADER = struct.Struct('<8sHHI')
+_HEADER_SIZE = 64
+
+# スロット (キャッシュライン毎に1デバイス)
+#   先頭4バイトはシーケンス番号 (書込み中は奇数)
+#   続けて (時刻[s], ステータス, 位置, 速度[step/s], サンプル数)
+_SEQ = struct.Struct('<I')
+_SLOT = struct.Struct('<dH6xqdQ')
+_SLOT_OFFSET = 8
+SLOT_SIZE = 64
+
+# エラー/アラームフラグ (NOTPERF_CMD, WRONG_CMDは正論理、UVLO-STEP_LOSS_Bは負論理)
+_FAULT_HIGH = 0x0180
+_FAULT_LOW = 0x7e00
+
+
+class AxisState(object):
+    """
+    ステータスボードから読出した1デバイスの状態
+    """
+    __slots__ = ('t', 'status', 'position', 'speed', 'count')
+
+    def __init__(self, t, status, position, speed, count):
+        self.t = t                  # 取得時刻[s] (time.monotonic)
+        self.status = status        # ステータス {Status}
+        self.position = position    # 位置 (ABS_POS)
+        self.speed = speed          # 速度[step/s] (未取得はnan)
+        self.count = count          # 書込んだサンプル数
+
+    @property
+    def busy(self):
+        """動作中か
+        """
+        return not self.status.BUSY
+
+    @property
+    def fault(self):
+        """エラー/アラームフラグが立っているか
+        """
+        value = int(self.status)
+
+        return bool(value & _FAULT_HIGH) or (value & _FAULT_LOW) != _FAULT_LOW
+
+    def __repr__(self):
+        return 'AxisState(t={}, status={}, position={}, speed={}, count={})'.format(
+            self.t, self.status, self.position, self.speed, self.count)
+
+
+class StatusBoard(object):
+    """
+    デバイスの最新の状態を共有メモリに書込むクラス
+
+    デバイス毎の固定長スロットにシーケンスロックで書込み、
+    他のプロセスはBoardReaderでSPIに触れずに読出す。
+    書込むプロセスは1つとすること。
+
+    Pythonからはメモリバリアを発行できないため、シーケンス番号とデータの
+    書込み順は保証されない。x86では問題にならないが、ARM(Raspberry Pi)では
+    読出し側が稀に不整合な値を得る可能性がある。
+    """
+
+    def __init__(self, n_devices, path=DEFAULT_PATH):
+        """ステータスボードコンストラクタ
+
+        Arguments:
+            n_devices {int} -- デバイス数
+
+        Keyword Arguments:
+            path {str} -- 共有メモリのファイルパス (default: {DEFAULT_PATH})
+        """
+        self.n_devices = n_devices
+        self.path = path
+
+        size = _HEADER_SIZE + SLOT_SIZE * n_devices
+
+        # 既存のファイルを読出し中のプロセスがあるため、切詰めずに必要なら伸長する
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        _HEADER.pack_into(self.map, 0, MAGIC, VERSION, n_devices, SLOT_SIZE)
+
+        # 各スロットもシーケンスロックで初期化し、読出し中のプロセスに途中の値を見せない
+        self._seqs = []
+        empty = bytes(_SLOT.size)
+        for i in range(n_devices):
+            offset = _HEADER_SIZE + SLOT_SIZE * i
+            seq = (_SEQ.unpack_from(self.map, offset)[0] | 1) & 0xffffffff
+            _SEQ.pack_into(self.map, offset, seq)
+            self.map[offset + _SLOT_OFFSET:offset + _SLOT_OFFSET + _SLOT.size] = empty
+            seq = (seq + 1) & 0xffffffff
+            _SEQ.pack_into(self.map, offset, seq)
+            self._seqs.append(seq)
+
+        self._counts = [0] * n_devices
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def publish(self, i, t, status, position, speed=float('nan')):
+        """デバイスの状態を書込む
+
+        Arguments:
+            i {int} -- デバイス番号
+            t {float} -- 取得時刻[s]
+            status {int} -- ステータスレジスタ値
+            position {int} -- 位置
+
+        Keyword Arguments:
+            speed {float} -- 速度[step/s] (default: {nan})
+        """
+        offset = _HEADER_SIZE + SLOT_SIZE * i
+
+        with self._lock:
+            seq = self._seqs[i]
+            count = self._counts[i] + 1
+
+            # 奇数の間は読出し側が再試行する
+            _SEQ.pack_into(self.map, offset, (seq + 1) & 0xffffffff)
+            _SLOT.pack_into(self.map, offset + _SLOT_OFFSET, t, status, position, speed, count)
+            _SEQ.pack_into(self.map, offset, (seq + 2) & 0xffffffff)
+
+            self._seqs[i] = (seq + 2) & 0xffffffff
+            self._counts[i] = count
+
+    def attach(self, monitor):
+        """StatusMonitorのサンプルを書込むリスナーを登録する
+
+        Arguments:
+            monitor {StatusMonitor} -- ステータスモニタ
+
+        Returns:
+            callable -- 登録したリスナー (monitor.removeListener()で解除する)
+        """
+        histories = monitor.histories
+
+        def listener(i, t, status, position):
+            self.publish(i, t, status, position, histories[i].latestSpeed())
+
+        monitor.addListener(listener)
+
+        return listener
+
+    def close(self, unlink=False):
+        """共有メモリを閉じる
+
+        Keyword Arguments:
+            unlink {bool} -- ファイルを削除する (default: {False})
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+        if unlink and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class BoardReader(object):
+    """
+    ステータスボードを読出すクラス
+
+    読出しはロックを取らず、書込み中または読出し中に書換えられた場合は再試行する。
+    """
+
+    def __init__(self, path=DEFAULT_PATH, retries=10000):
+        """ステータスボード読出しコンストラクタ
+
+        Keyword Arguments:
+            path {str} -- 共有メモリのファイルパス (default: {DEFAULT_PATH})
+            retries {int} -- 1スロットの読出しの再試行回数 (default: {10000})
+
+        Raises:
+            RuntimeError: ステータスボードではない、または未対応のバージョン
+        """
+        self.path = path
+        self.retries = retries
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER_SIZE:
+                err = '"BoardReader()"のファイルが不正: {}'.format(path)
+                raise RuntimeError(err)
+
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.n_devices, slot_size = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE \
+                or size < _HEADER_SIZE + SLOT_SIZE * self.n_devices:
+            self.close()
+            err = '"BoardReader()"のファイルが不正: {}'.format(path)
+            raise RuntimeError(err)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.n_devices
+
+    def read(self, i):
+        """デバイスの状態を読出す
+
+        Arguments:
+            i {int} -- デバイス番号
+
+        Returns:
+            AxisState -- 状態、未書込みの場合はNone
+
+        Raises:
+            RuntimeError: デバイス番号が範囲外、または再試行回数内に一貫した値を読めない
+        """
+        if i < 0 or i >= self.n_devices:
+            err = '"read()"のデバイス番号が範囲外: {}'.format(i)
+            raise RuntimeError(err)
+
+        data = self.map
+        offset = _HEADER_SIZE + SLOT_SIZE * i
+        unpack_seq = _SEQ.unpack_from
+        unpack_slot = _SLOT.unpack_from
+
+        for retry in range(self.retries):
+            seq = unpack_seq(data, offset)[0]
+            if seq & 1:
+                # 書込み側が中断している場合に備えて実行を譲る
+                time.sleep(0)
+                continue
+
+            values = unpack_slot(data, offset + _SLOT_OFFSET)
+
+            if unpack_seq(data, offset)[0] == seq:
+                if values[4] == 0:
+                    return None
+                t, status, position, speed, count = values
+                return AxisState(t, Status(status), position, speed, count)
+
+        err = '"read()"で一貫した値を読めない: device {}'.format(i)
+        raise RuntimeError(err)
+
+    def readAll(self):
+        """全デバイスの状態を読出す
+
+        デバイス毎に一貫した値を返すが、デバイス間では同時刻とは限らない。
+
+        Returns:
+            [AxisState] -- デバイス毎の状態
+        """
+        return [self.read(i) for i in range(self.n_devices)]
+
+    def close(self):
+        """メモリマップを閉じる
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# モジュールインポート
+import time
+
+from .l6470 import ABS_POS, GET_STATUS, MAX_SPEED, STEP_MODE
+from .status import Status
+from . import units
+
+# ABS_POSの1周期 (22bit)
+WRAP = 1 << 22
+HALF = 1 << 21
+
+
+def minPollRate(max_speed, microsteps=128, use_dir=False):
+    """ABS_POSの周回を一意に判定できる最小のポーリング周波数を返す
+
+    Arguments:
+        max_speed {float} -- 最大速度[step/s] (フルステップ)
+
+    Keyword Arguments:
+        microsteps {int} -- 1フルステップあたりのマイクロステップ数 (default: {128})
+        use_dir {bool} -- DIRビットで移動方向を判定する場合True
+                          (ポーリング間で方向が変わらないことが前提) (default: {False})
+
+    Returns:
+        float -- 最小のポーリング周波数[Hz]
+    """
+    # 1回の間隔の移動量が、方向不明なら半周期、方向既知なら1周期未満であること
+    return max_speed * microsteps / (WRAP if use_dir else HALF)
+
+
+class PositionTracker(object):
+    """
+    22bitのABS_POSの周回を検出し、上限のない絶対位置を保持するクラス
+
+    前回の読出しからの経過時間とMAX_SPEEDから移動量の上限を求め、
+    上限が半周期未満なら最短の差分を、1周期未満ならDIRビットの方向の差分を
+    移動量とする。それ以上の場合は周回数を判定できないため ambiguous とする。
+    """
+
+    def __init__(self, device=None, max_speed=None, microsteps=None, margin=1.1,
+                 strict=False, clock=time.monotonic):
+        """位置トラッカーコンストラクタ
+
+        Keyword Arguments:
+            device {Device} -- 対象のデバイス、Noneの場合はfeed()で値を与える (default: {None})
+            max_speed {float} -- 最大速度[step/s]、Noneの場合はMAX_SPEEDを読出す (default: {None})
+            microsteps {int} -- マイクロステップ数、Noneの場合はSTEP_MODEを読出す (default: {None})
+            margin {float} -- 移動量の上限に掛ける余裕 (default: {1.1})
+            strict {bool} -- 周回数を判定できない場合に例外を発生させる (default: {False})
+            clock {callable} -- 時刻取得関数 (default: {time.monotonic})
+        """
+        self.device = device
+        self.margin = margin
+        self.strict = strict
+        self.clock = clock
+
+        self.max_speed = max_speed
+        self.microsteps = microsteps
+        if device is not None:
+            self.refresh(max_speed is None, microsteps is None)
+
+        # 上限のない絶対位置[マイクロステップ]
+        self.position = None
+
+        # 直前の更新で周回数を判定できなかった場合True
+        self.ambiguous = False
+        self.ambiguous_count = 0
+
+        self._raw = None
+        self._t = None
+
+    def refresh(self, max_speed=True, microsteps=True):
+        """デバイスからMAX_SPEED, STEP_MODEを読出し直す
+
+        Keyword Arguments:
+            max_speed {bool} -- MAX_SPEEDを読出す (default: {True})
+            microsteps {bool} -- STEP_MODEを読出す (default: {True})
+        """
+        if max_speed:
+            self.max_speed = units.regToMaxSpeed(self.device.getParamInt(MAX_SPEED))
+        if microsteps:
+            self.microsteps = units.microsteps(self.device.getParamInt(STEP_MODE))
+
+    def minPollRate(self, use_dir=True):
+        """現在の最大速度で周回を判定できる最小のポーリング周波数を返す
+
+        Keyword Arguments:
+            use_dir {bool} -- DIRビットで移動方向を判定する (default: {True})
+
+        Returns:
+            float -- 最小のポーリング周波数[Hz]
+        """
+        return minPollRate(self.max_speed * self.margin, self.microsteps or 128, use_dir)
+
+    def reset(self, position=0):
+        """現在の位置を指定した値とする
+
+        Keyword Arguments:
+            position {int} -- 絶対位置[マイクロステップ] (default: {0})
+        """
+        if self._raw is None and self.device is not None:
+            self.update()
+
+        # 最初の読出し前の場合は、最初の読出し位置を指定した値とする
+        self.position = position
+
+    def update(self):
+        """デバイスからステータスとABS_POSを1回の転送で読出し、絶対位置を更新する
+
+        Returns:
+            int -- 絶対位置[マイクロステップ]
+        """
+        device = self.device
+
+        status, value = device.commands([
+            (GET_STATUS.addr, [0x00, 0x00]),
+            (ABS_POS.getter()[0], [0x00, 0x00, 0x00]),
+        ])
+        device._checkStatus(status)
+        device.status = Status.fromBytes(status)
+
+        raw = (value[0] << 16) | (value[1] << 8) | value[2]
+
+        return self.feed(self.clock(), raw, device.status.DIR)
+
+    def feed(self, t, raw, dir=None):
+        """読出したABS_POSから絶対位置を更新する
+
+        StatusMonitorのリスナーからも使用できるよう、符号付きの値も受付ける。
+
+        Arguments:
+            t {float} -- 読出し時刻[s]
+            raw {int} -- ABS_POS (22bit、または符号付き)
+
+        Keyword Arguments:
+            dir {int} -- STATUSのDIRビット 1:正転, 0:逆転 (default: {None})
+
+        Returns:
+            int -- 絶対位置[マイクロステップ]
+
+        Raises:
+            RuntimeError: strictで周回数を判定できない
+        """
+        raw &= WRAP - 1
+
+        if self._raw is None:
+            if self.position is None:
+                self.position = units.toSigned22(raw)
+            self._raw = raw
+            self._t = t
+            return self.position
+
+        delta = (raw - self._raw) & (WRAP - 1)
+        bound = self._bound(t - self._t)
+
+        self.ambiguous = False
+        if bound < HALF:
+            # 半周期未満なら最短の差分
+            step = units.toSigned22(delta)
+        elif bound < WRAP and dir is not None:
+            # 1周期未満ならDIRの方向の差分
+            step = delta if (dir or delta == 0) else delta - WRAP
+        else:
+            self.ambiguous = True
+            self.ambiguous_count += 1
+
+            if self.strict:
+                err  = '"PositionTracker"のポーリング間隔が長く周回数を判定できない\n'
+                err += '   間隔 {:.3f}s, 最小ポーリング周波数 {:.1f}Hz'.format(
+                    t - self._t, self.minPollRate(dir is not None))
+                raise RuntimeError(err)
+
+            if dir is None:
+                step = units.toSigned22(delta)
+            else:
+                step = delta if (dir or delta == 0) else delta - WRAP
+
+        self.position += step
+        self._raw = raw
+        self._t = t
+
+        return self.position
+
+    @property
+    def wraps(self):
+        """ABS_POSの周回数
+        """
+        if self.position is None:
+            return 0
+
+        return (self.position + HALF) // WRAP
+
+    def _bound(self, elapsed):
+        """経過時間中の移動量の上限[マイクロステップ]
+        """
+        if self.max_speed is None:
+            return 0.0
+
+        return self.max_speed * (self.microsteps or 128) * elapsed * self.margin
+
+
+if __name__ == '__main__':
+    pass
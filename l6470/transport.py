@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+
+class Transport(object):
+    """
+    L6470とのバイト列送受信を行うトランスポートの基底クラス
+
+    L6470は1バイト毎にCSを上げる必要があるため、送信データは
+    frameバイト毎にCSを切り替えて送受信する。
+    """
+
+    def transfer(self, to_send, frame=1):
+        """送信データを送受信する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """トランスポートを閉じる
+        """
+        pass
+
+
+class SpiTransport(Transport):
+    """
+    spidevを使用したトランスポートクラス
+    """
+
+    def __init__(self, bus, client, max_speed_hz=5000, multi_segment=False):
+        """SPIトランスポートコンストラクタ
+
+        Arguments:
+            bus {int} -- SPIバスID
+            client {int} -- SPIチップセレクトID
+
+        Keyword Arguments:
+            max_speed_hz {int} -- SPIクロック周波数[Hz] (default: {5000})
+            multi_segment {bool} -- 送信データ全体を1回のioctlで送受信する (default: {False})
+
+        Raises:
+            RuntimeError: spidevモジュールが存在しない
+        """
+        # spidevはSPIを使用する場合のみ読込む
+        try:
+            import spidev
+        except ImportError:
+            err = '"SpiTransport()"にはspidevモジュールが必要'
+            raise RuntimeError(err)
+
+        # SPIデバイスの初期化
+        self.spi = spidev.SpiDev(bus, client)
+        self.spi.max_speed_hz = max_speed_hz
+        self.spi.mode = 0b11
+
+        # 複数セグメント転送の初期化
+        self.msg = None
+        if multi_segment:
+            from .spimessage import SpiMessage
+            self.msg = SpiMessage(self.spi.fileno())
+
+    def transfer(self, to_send, frame=1):
+        """送信データを送受信する
+
+        Arguments:
+            to_send {[int]} -- 送信データ ex.[0x21, 0x00, 0x00, 0x00]
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        # frameバイト毎にCSを切り替えたセグメントを1回のioctlで送受信する
+        if self.msg is not None:
+            return self.msg.transfer(to_send, frame)
+
+        from_recv = []
+
+        for i in range(0, len(to_send), frame):
+            from_recv += self.spi.xfer(to_send[i:i + frame])
+
+        return from_recv
+
+    def close(self):
+        """SPIデバイスを閉じる
+        """
+        if self.spi is not None:
+            self.spi.close()
+            self.spi = None
+
+
+class NullTransport(Transport):
+    """
+    送信データを捨て、0x00を返すトランスポートクラス
+
+    バスを含まないライブラリ自体の処理時間の計測に使用する。
+    """
+
+    def transfer(self, to_send, frame=1):
+        """送信データを捨て、同じ長さの0x00を返す
+
+        Arguments:
+            to_send {[int]} -- 送信データ
+
+        Keyword Arguments:
+            frame {int} -- CSを保持するバイト数 (default: {1})
+
+        Returns:
+            [int] -- 受信データ
+        """
+        return [0x00] * len(to_send)
+
+
+if __name__ == '__main__':
+    pass
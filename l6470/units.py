@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# 動作周期 tick = 250ns
+TICK = 250e-9
+
+# レジスタ値から物理量への変換係数 (データシートのtick換算式)
+SPEED_SCALE     = 2 ** -28 / TICK            # SPEED, RUN, GO_UNTIL [step/s]
+ACC_SCALE       = 2 ** -40 / (TICK * TICK)   # ACC, DEC [step/s^2]
+MAX_SPEED_SCALE = 2 ** -18 / TICK            # MAX_SPEED, FS_SPD [step/s]
+MIN_SPEED_SCALE = 2 ** -24 / TICK            # MIN_SPEED [step/s]
+
+# 物理量からレジスタ値への変換係数
+_SPEED_INV     = 1.0 / SPEED_SCALE
+_ACC_INV       = 1.0 / ACC_SCALE
+_MAX_SPEED_INV = 1.0 / MAX_SPEED_SCALE
+_MIN_SPEED_INV = 1.0 / MIN_SPEED_SCALE
+
+# レジスタ値の上限
+SPEED_MAX     = 0xfffff
+ACC_MAX       = 0xffe       # 0xfffは予約値
+MAX_SPEED_MAX = 0x3ff
+MIN_SPEED_MAX = 0xfff
+FS_SPD_MAX    = 0x3ff
+
+
+def _clamp(value, upper):
+    """0からupperの範囲に丸める
+    """
+    if value < 0:
+        return 0
+    if value > upper:
+        return upper
+
+    return value
+
+
+def speedToReg(speed):
+    """速度[step/s]をSPEED/RUN/GO_UNTILのレジスタ値に変換する
+
+    Arguments:
+        speed {float} -- 速度[step/s] (0 - 15625)
+
+    Returns:
+        int -- レジスタ値 (20bit)
+    """
+    return _clamp(int(speed * _SPEED_INV + 0.5), SPEED_MAX)
+
+
+def regToSpeed(value):
+    """SPEEDのレジスタ値を速度[step/s]に変換する
+    """
+    return value * SPEED_SCALE
+
+
+def accToReg(acc):
+    """加減速度[step/s^2]をACC/DECのレジスタ値に変換する
+
+    Arguments:
+        acc {float} -- 加減速度[step/s^2] (14.55 - 59590)
+
+    Returns:
+        int -- レジスタ値 (12bit)
+    """
+    return _clamp(int(acc * _ACC_INV + 0.5), ACC_MAX)
+
+
+def regToAcc(value):
+    """ACC/DECのレジスタ値を加減速度[step/s^2]に変換する
+    """
+    return value * ACC_SCALE
+
+
+def maxSpeedToReg(speed):
+    """最大速度[step/s]をMAX_SPEEDのレジスタ値に変換する
+
+    Arguments:
+        speed {float} -- 最大速度[step/s] (15.25 - 15610)
+
+    Returns:
+        int -- レジスタ値 (10bit)
+    """
+    return _clamp(int(speed * _MAX_SPEED_INV + 0.5), MAX_SPEED_MAX)
+
+
+def regToMaxSpeed(value):
+    """MAX_SPEEDのレジスタ値を最大速度[step/s]に変換する
+    """
+    return value * MAX_SPEED_SCALE
+
+
+def minSpeedToReg(speed):
+    """最小速度[step/s]をMIN_SPEEDのレジスタ値に変換する (LSPD_OPTビットは含まない)
+
+    Arguments:
+        speed {float} -- 最小速度[step/s] (0 - 976.3)
+
+    Returns:
+        int -- レジスタ値 (12bit)
+    """
+    return _clamp(int(speed * _MIN_SPEED_INV + 0.5), MIN_SPEED_MAX)
+
+
+def regToMinSpeed(value):
+    """MIN_SPEEDのレジスタ値を最小速度[step/s]に変換する (LSPD_OPTビットは無視する)
+    """
+    return (value & 0xfff) * MIN_SPEED_SCALE
+
+
+def fsSpdToReg(speed):
+    """フルステップ切替速度[step/s]をFS_SPDのレジスタ値に変換する
+
+    Arguments:
+        speed {float} -- 切替速度[step/s] (7.63 - 15625)
+
+    Returns:
+        int -- レジスタ値 (10bit)
+    """
+    return _clamp(int(speed * _MAX_SPEED_INV), FS_SPD_MAX)
+
+
+def regToFsSpd(value):
+    """FS_SPDのレジスタ値をフルステップ切替速度[step/s]に変換する
+    """
+    return (value + 0.5) * MAX_SPEED_SCALE
+
+
+def toSigned22(value):
+    """22bitの2の補数(ABS_POS, MARK)を符号付き整数に変換する
+
+    Arguments:
+        value {int} -- レジスタ値
+
+    Returns:
+        int -- 符号付き整数 (-2^21 - 2^21-1)
+    """
+    value &= 0x3fffff
+
+    return value - 0x400000 if value & 0x200000 else value
+
+
+def fromSigned22(value):
+    """符号付き整数を22bitの2の補数(ABS_POS, MARK)に変換する
+
+    Arguments:
+        value {int} -- 符号付き整数
+
+    Returns:
+        int -- レジスタ値
+    """
+    return value & 0x3fffff
+
+
+def microsteps(step_mode):
+    """STEP_MODEのレジスタ値から1フルステップあたりのマイクロステップ数を返す
+
+    Arguments:
+        step_mode {int} -- STEP_MODEのレジスタ値
+
+    Returns:
+        int -- マイクロステップ数 (1 - 128)
+    """
+    return 1 << min(step_mode & 0x07, 7)
+
+
+if __name__ == '__main__':
+    pass
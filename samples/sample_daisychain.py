@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+from l6470 import l6470
+from l6470 import daisychain
+
+import time
+import sys
+import traceback
+
+
+if __name__ == '__main__':
+
+    chain = None
+
+    try:
+        # open spi device bus:0, client0 with 2 L6470s in daisy chain
+        chain = daisychain.DaisyChain(0, 0, 2)
+
+        # reset all L6470s
+        chain.resetDevice()
+
+        # parameter value setting (common to all devices)
+        chain.setParam(l6470.MAX_SPEED, [0x00, 0x10])
+        chain.setParam(l6470.STEP_MODE, [0x03])
+        chain.setParam(l6470.KVAL_HOLD, [0x39])
+        chain.setParam(l6470.KVAL_RUN,  [0x39])
+        chain.setParam(l6470.KVAL_ACC,  [0x39])
+        chain.setParam(l6470.KVAL_DEC,  [0x39])
+
+        # exec "goTo" command on device 0 only, device 1 stays idle
+        chain.goTo([[0x00, 0x03, 0xff], None])
+
+        for i in range(5):
+
+            time.sleep(1)
+
+            # get all device status in one sweep
+            status = chain.getStatus()
+            print(status)
+
+            # get ABS_POS of all devices in one sweep
+            print(chain.getParam(l6470.ABS_POS))
+
+    except Exception as e:
+        t, v, tb = sys.exc_info()
+        print(traceback.format_exception(t,v,tb))
+        print(traceback.format_tb(e.__traceback__))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if chain is not None:
+            # exec "soft_stop" command
+            chain.softStop()
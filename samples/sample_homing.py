@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+from l6470 import l6470
+from l6470 import homing
+
+import sys
+import traceback
+
+
+if __name__ == '__main__':
+
+    device = None
+
+    try:
+        # open spi device bus:0, client0
+        device = l6470.Device(0, 0)
+
+        # parameter value setting
+        device.setMaxSpeed(1000.0)
+        device.setAcc(2000.0)
+        device.setDec(2000.0)
+        device.setParam(l6470.STEP_MODE, [0x03])
+        device.setParam(l6470.KVAL_HOLD, [0x39])
+        device.setParam(l6470.KVAL_RUN,  [0x39])
+        device.setParam(l6470.KVAL_ACC,  [0x39])
+        device.setParam(l6470.KVAL_DEC,  [0x39])
+
+        home = homing.Homing(device, dir=False, timeout=20.0)
+
+        # limit switch: fast approach, slow release
+        report = home.repeatability('switch', n=5, backoff=800,
+                                    fast_speed=400.0, slow_speed=20.0)
+        print(report)
+
+        # sensorless: calibrate STALL_TH, then home against the hard stop
+        print('STALL_TH', home.calibrate(200.0))
+        report = home.repeatability('sensorless', n=5, backoff=800, speed=200.0)
+        print(report)
+
+    except Exception as e:
+        t, v, tb = sys.exc_info()
+        print(traceback.format_exception(t,v,tb))
+        print(traceback.format_tb(e.__traceback__))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if device is not None:
+            # exec "soft_stop" command
+            device.softStop()
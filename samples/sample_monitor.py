@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+from l6470 import l6470
+from l6470 import monitor
+
+import time
+import sys
+import traceback
+
+
+if __name__ == '__main__':
+
+    device = None
+    mon = None
+
+    try:
+        # open spi device bus:0, client0
+        device = l6470.Device(0, 0)
+
+        # reset L6470 
+        device.resetDevice()
+
+        # parameter value setting
+        device.setParam(l6470.MAX_SPEED, [0x00, 0x41])
+        device.setParam(l6470.KVAL_HOLD, [0x29])
+        device.setParam(l6470.KVAL_RUN, [0x29])
+        device.setParam(l6470.KVAL_ACC, [0x29])
+        device.setParam(l6470.KVAL_DEC, [0x29])
+        device.setParam(l6470.STEP_MODE, [0x07])
+
+        # start background status polling
+        mon = monitor.StatusMonitor(device)
+        mon.start()
+
+        # exec "goTo" command while holding the bus lock
+        with mon.lock:
+            device.goTo(0x4000)
+        mon.notify(device)
+
+        for i in range(5):
+
+            time.sleep(1)
+
+            # read the latest sample without touching the bus
+            t, status, position = mon.history(device).latest()
+            print(t, position, status)
+
+    except Exception as e:
+        t, v, tb = sys.exc_info()
+        print(traceback.format_exception(t,v,tb))
+        print(traceback.format_tb(e.__traceback__))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if mon is not None:
+            mon.stop()
+        if device is not None:
+            # exec "soft_stop" command
+            device.softStop()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+from l6470 import l6470
+
+import time
+import sys
+import traceback
+
+
+if __name__ == '__main__':
+
+    device = None
+
+    try:
+        # open spi device bus:0, client0
+        device = l6470.Device(0, 0)
+
+        # reset L6470 
+        device.resetDevice()
+
+        # parameter value setting from profile file in one transfer
+        written = device.setParams('profile.json')
+        print('written: {}'.format(len(written)))
+
+        # re-applying the same profile writes nothing
+        written = device.setParams('profile.json')
+        print('written: {}'.format(len(written)))
+
+        # exec "run" command
+        device.run(True, [0x00, 0x10, 0x00])
+
+        for i in range(5):
+
+            time.sleep(1)
+
+            # get device status
+            status = device.updateStatus()
+            print(status)
+
+    except Exception as e:
+        t, v, tb = sys.exc_info()
+        print(traceback.format_exception(t,v,tb))
+        print(traceback.format_tb(e.__traceback__))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if device is not None:
+            # exec "soft_stop" command
+            device.softStop()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+from l6470 import l6470
+
+import time
+import sys
+import traceback
+
+
+def measure(device, count):
+    # time "getParam(ABS_POS)" and "getStatus" count times
+    start = time.perf_counter()
+    for i in range(count):
+        device.getParam(l6470.ABS_POS)
+    abs_pos = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for i in range(count):
+        device.getStatus()
+    status = (time.perf_counter() - start) / count
+
+    return abs_pos, status
+
+
+if __name__ == '__main__':
+
+    count = 1000
+
+    try:
+        results = {}
+
+        for multi_segment in (False, True):
+            # open spi device bus:0, client0
+            device = l6470.Device(0, 0, multi_segment=multi_segment)
+
+            results[multi_segment] = measure(device, count)
+
+            del device
+
+        byte_pos, byte_status = results[False]
+        msg_pos, msg_status = results[True]
+
+        print('getParam(ABS_POS): per-byte {:.1f} us, multi-segment {:.1f} us ({:.2f}x)'.format(
+            byte_pos * 1e6, msg_pos * 1e6, byte_pos / msg_pos))
+        print('getStatus()      : per-byte {:.1f} us, multi-segment {:.1f} us ({:.2f}x)'.format(
+            byte_status * 1e6, msg_status * 1e6, byte_status / msg_status))
+
+    except Exception as e:
+        t, v, tb = sys.exc_info()
+        print(traceback.format_exception(t,v,tb))
+        print(traceback.format_tb(e.__traceback__))
+    except KeyboardInterrupt:
+        pass
@@ -18,6 +18,9 @@ setup(
     install_requires=[
         'spidev',
     ],
+    extras_require={
+        'planner': ['numpy'],
+    },
     setup_requires=[
         'pytest-runner',
     ],
@@ -0,0 +1,34 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+
+import time
+
+
+@pytest.fixture
+def sim_device():
+    """シミュレータに接続して速度、加減速度を設定したDeviceを生成する関数
+    """
+    def factory(speed=1000.0, acc=1000.0, dec=None, step_mode=0x00, clock=time.monotonic):
+        """Deviceを生成する
+
+        Keyword Arguments:
+            speed {float} -- MAX_SPEED[step/s] (default: {1000.0})
+            acc {float} -- ACC[step/s^2] (default: {1000.0})
+            dec {float} -- DEC[step/s^2]、Noneの場合はaccと同じ (default: {None})
+            step_mode {int} -- STEP_MODEのレジスタ値 (default: {0x00})
+            clock {callable} -- シミュレータの時計 (default: {time.monotonic})
+
+        Returns:
+            Device -- デバイス (シミュレータはdevice.transport.chips[0])
+        """
+        device = l6470.Device(0, 0, transport=sim.SimTransport(clock=clock))
+        device.setMaxSpeed(speed)
+        device.setAcc(acc)
+        device.setDec(acc if dec is None else dec)
+        device.setParam(l6470.STEP_MODE, step_mode)
+
+        return device
+
+    return factory
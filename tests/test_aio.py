@@ -0,0 +1,42 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import aio
+
+import asyncio
+import time
+
+
+class TestClass(object):
+
+    def test_goTo(self, sim_device):
+        devices = [aio.AsyncDevice(sim_device(10000.0, 50000.0)) for i in range(4)]
+
+        async def main():
+            # 複数軸を並行して動かす
+            return await asyncio.gather(*[d.goTo(200 * (i + 1), timeout=5.0)
+                                          for i, d in enumerate(devices)])
+
+        start = time.monotonic()
+        statuses = asyncio.run(main())
+
+        assert time.monotonic() - start < 2.0
+        for i, (status, device) in enumerate(zip(statuses, devices)):
+            assert status.BUSY == 0b1
+            assert device.device.getPosition() == 200 * (i + 1)
+
+    def test_wrapper(self, sim_device):
+        device = aio.AsyncDevice(sim_device(10000.0, 50000.0))
+
+        async def main():
+            await device.setParam(l6470.KVAL_RUN, 0x39)
+            value = await device.getParamInt(l6470.KVAL_RUN)
+
+            await device.run(True, 0x1000, wait=False)
+            with pytest.raises(asyncio.TimeoutError):
+                await device.wait_idle(timeout=0.0)
+            await device.hardStop()
+
+            return value
+
+        assert asyncio.run(main()) == 0x39
@@ -0,0 +1,134 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import transport
+from l6470 import sim
+from l6470 import arbiter
+
+import threading
+import time
+
+
+class BusTransport(transport.Transport):
+
+    def __init__(self, bus, name):
+        self.bus = bus
+        self.name = name
+
+    def transfer(self, to_send, frame=1):
+        # バイト毎に送受信し、他スレッドに割込みの機会を与える
+        for value in to_send:
+            self.bus.log.append((self.name, value))
+            self.bus.gate.wait()
+            time.sleep(0)
+
+        return [0x00] * len(to_send)
+
+
+class Bus(object):
+
+    def __init__(self):
+        self.log = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+
+class TestClass(object):
+
+    def test_serialize(self):
+        bus = Bus()
+        arb = arbiter.BusArbiter()
+        transports = [arb.wrap(BusTransport(bus, i)) for i in range(4)]
+
+        def worker(t):
+            for i in range(50):
+                t.transfer([0x21, 0x00, 0x00, 0x00])
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in transports]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 4バイトのコマンドが途中で他のデバイスと混在しない
+        assert len(bus.log) == 4 * 50 * 4
+        for i in range(0, len(bus.log), 4):
+            assert len(set(name for name, value in bus.log[i:i + 4])) == 1
+
+    def test_priority(self):
+        bus = Bus()
+        arb = arbiter.BusArbiter()
+        t = arb.wrap(BusTransport(bus, 0))
+
+        # 送受信中のままバスを止める
+        bus.gate.clear()
+        threads = [threading.Thread(target=t.transfer, args=([0xd0, 0x00, 0x00],))]
+        threads[0].start()
+        while len(bus.log) == 0:
+            time.sleep(0.001)
+
+        for i in range(5):
+            threads.append(threading.Thread(target=t.transfer, args=([0xd0, 0x00, 0x00],)))
+            threads[-1].start()
+        threads.append(threading.Thread(target=t.transfer, args=([0xb8],)))
+        threads[-1].start()
+
+        while arb.pending() < 6:
+            time.sleep(0.001)
+
+        bus.gate.set()
+        for thread in threads:
+            thread.join()
+
+        # 実行中のコマンドの直後にHARD_STOPを送信する
+        values = [value for name, value in bus.log]
+        assert values[:4] == [0xd0, 0x00, 0x00, 0xb8]
+
+    def test_stop(self):
+        # 2番目以降のコマンドも調べ、データ部の値(SET_PARAM KVAL_HOLD 0xb8)は無視する
+        assert arbiter.hasStop([0xb8])
+        assert arbiter.hasStop([0x51, 0x00, 0x10, 0x00, 0xa8])
+        assert arbiter.hasStop([0x09, 0xb8, 0xd0, 0x00, 0x00, 0xb0])
+        assert not arbiter.hasStop([0x09, 0xb8, 0xd0, 0x00, 0x00])
+        assert not arbiter.hasStop([0x60, 0x00, 0xb8, 0xa0])
+
+        # デイジーチェーンは各デバイスのバイト列を調べる
+        assert arbiter.hasStop([0x09, 0xd0, 0x39, 0x00, 0xb8, 0x00], frame=2)
+        assert not arbiter.hasStop([0x09, 0x00, 0xb8, 0x00], frame=2)
+
+        bus = Bus()
+        arb = arbiter.BusArbiter()
+        device = l6470.Device(0, 0, transport=arb.wrap(BusTransport(bus, 0)))
+        del bus.log[:]
+
+        bus.gate.clear()
+        threads = [threading.Thread(target=device.transport.transfer, args=([0xd0, 0x00, 0x00],))]
+        threads[0].start()
+        while len(bus.log) == 0:
+            time.sleep(0.001)
+
+        for i in range(3):
+            threads.append(threading.Thread(target=device.transport.transfer, args=([0xd0, 0x00, 0x00],)))
+            threads[-1].start()
+        cmds = [(l6470.KVAL_RUN.addr, [0x39]), (l6470.HARD_STOP.addr, [])]
+        threads.append(threading.Thread(target=device.commands, args=(cmds,)))
+        threads[-1].start()
+
+        while arb.pending() < 4:
+            time.sleep(0.001)
+
+        bus.gate.set()
+        for thread in threads:
+            thread.join()
+
+        # 先頭以外にHARD_STOPを含む転送も実行中のコマンドの直後に送信する
+        values = [value for name, value in bus.log]
+        assert values[:6] == [0xd0, 0x00, 0x00, 0x0a, 0x39, 0xb8]
+
+    def test_device(self):
+        arb = arbiter.BusArbiter()
+        device = l6470.Device(0, 0, transport=arb.wrap(sim.SimTransport()))
+
+        device.setParam(l6470.KVAL_RUN, 0x39)
+        assert device.getParamInt(l6470.KVAL_RUN) == 0x39
+        device.hardStop()
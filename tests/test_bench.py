@@ -0,0 +1,45 @@
+import pytest
+
+from l6470 import bench
+
+import json
+import tracemalloc
+
+
+class TestClass(object):
+
+    def test_bench_null(self, tmp_path):
+        output = str(tmp_path / 'bench.json')
+
+        assert bench.main(['--transport', 'null', '-n', '5', '-o', output]) == 0
+
+        with open(output) as f:
+            result = json.load(f)
+
+        assert result['transport'] == 'null'
+        for name in ['updateStatus', 'getParam(ABS_POS)', 'setParam(KVAL_RUN)', 'run', 'goTo']:
+            r = result['results'][name]
+            assert r['iterations'] == 5
+            assert r['p50_us'] <= r['p99_us']
+            assert r['calls_per_s'] > 0
+
+    def test_measure(self, monkeypatch):
+        kept = []
+
+        def func():
+            kept.append(bytearray(1000))
+
+        result = bench.measure(func, 20, warmup=0)
+        assert result['alloc_bytes_per_call'] >= 1000
+
+        # reset_peak()がない場合(Python 3.9未満)は残った割当てを計測する
+        monkeypatch.delattr(tracemalloc, 'reset_peak')
+        result = bench.measure(func, 20, warmup=0)
+        assert result['iterations'] == 20
+        assert result['alloc_bytes_per_call'] >= 1000
+
+    def test_compare(self):
+        baseline = {'results': {'run': {'p50_us': 10.0}, 'goTo': {'p50_us': 10.0}}}
+        result = {'results': {'run': {'p50_us': 11.0}, 'goTo': {'p50_us': 13.0}}}
+
+        assert bench.compare(result, baseline, 1.2) == [('goTo', 10.0, 13.0)]
@@ -0,0 +1,96 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import daisychain
+from l6470 import coordinated
+from l6470 import planner
+
+
+class TestClass(object):
+
+    def finish(self, clock, busy):
+        # BUSY解除までの時間を軸毎に求める
+        finish = [None, None]
+        t = 0.0
+        while None in finish and t < 10.0:
+            clock.advance(0.001)
+            t += 0.001
+            for i, value in enumerate(busy()):
+                if finish[i] is None and value:
+                    finish[i] = t
+
+        return finish
+
+    def test_plan(self):
+        profiles = coordinated.plan([100.0, 50.0, 0.0],
+                                    [(1000.0, 2000.0, 4000.0), (200.0, 2000.0, 2000.0),
+                                     (10.0, 10.0, 10.0)])
+
+        # 軸1の速度制限で全軸の速度が決まる
+        assert profiles[0] == pytest.approx((400.0, 2000.0, 4000.0))
+        assert profiles[1] == pytest.approx((200.0, 1000.0, 2000.0))
+        assert profiles[2] is None
+
+        t0 = planner.profile(100.0, *profiles[0]).total
+        t1 = planner.profile(50.0, *profiles[1]).total
+        assert t0 == pytest.approx(t1)
+
+    def test_devices(self, sim_device):
+        clock = sim.ManualClock()
+        devices = [sim_device(acc=2000.0, clock=clock) for i in range(2)]
+
+        group = coordinated.AxisGroup(devices, clock=clock)
+        move = group.goTo([1000, -400])
+
+        assert len(move.starts) == 2
+        assert move.skew == 0.0
+
+        finish = self.finish(clock, lambda: [d.updateStatus().BUSY for d in devices])
+        # シミュレータの積分誤差(1ms周期)を許容する
+        assert move.finishSkew < 0.005
+        assert abs(finish[0] - finish[1]) < 0.02 * move.duration
+        assert finish[0] == pytest.approx(move.duration, rel=0.02)
+        assert group.getPositions() == [1000, -400]
+
+        # 書換えたMAX_SPEED, ACC, DECを元に戻す
+        assert devices[1].getParam(l6470.MAX_SPEED) != move.saved[1][0]
+        group.restore(move)
+        for device, saved in zip(devices, move.saved):
+            assert (device.getParamInt(l6470.MAX_SPEED), device.getParamInt(l6470.ACC),
+                    device.getParamInt(l6470.DEC)) == saved
+
+        # GO_TOは短い方向に移動するため、ABS_POSの範囲の半分以上は移動できない
+        with pytest.raises(RuntimeError):
+            group.goTo([1000 + (1 << 21), None])
+
+    def test_min_speed(self, sim_device):
+        clock = sim.ManualClock()
+        devices = [sim_device(acc=2000.0, clock=clock) for i in range(2)]
+        devices[0].setMinSpeed(200.0)
+
+        # MIN_SPEEDから加速する軸は相似にならないが、到着時刻のずれは予測に含まれる
+        group = coordinated.AxisGroup(devices, clock=clock)
+        move = group.goTo([2000, 500])
+        assert move.finishSkew > 0.05
+
+        finish = self.finish(clock, lambda: [d.updateStatus().BUSY for d in devices])
+        assert finish == pytest.approx(move.finish, rel=0.02)
+
+    def test_daisychain(self):
+        clock = sim.ManualClock()
+        chain = daisychain.DaisyChain(0, 0, 2, transport=sim.SimTransport(2, clock=clock))
+        chain.setParam(l6470.STEP_MODE, [[0x00], [0x00]])
+
+        group = coordinated.AxisGroup(chain, limits=[(1000.0, 2000.0, 2000.0)] * 2, clock=clock)
+        move = group.goTo([300, 900])
+
+        assert move.skew == 0.0
+
+        finish = self.finish(clock, lambda: [s.BUSY for s in chain.updateStatus()])
+        assert move.finishSkew < 0.005
+        assert abs(finish[0] - finish[1]) < 0.02 * move.duration
+        assert group.getPositions() == [300, 900]
+
+        group.restore(move)
+        assert chain.getParam(l6470.ACC) == [[0x00, 0x8a]] * 2
@@ -0,0 +1,120 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import daemon
+from l6470.status import Status
+
+import os
+import threading
+
+
+class TestClass(object):
+
+    @pytest.fixture
+    def server(self, sim_device, tmp_path):
+        devices = [sim_device() for i in range(2)]
+        server = daemon.Daemon(devices, str(tmp_path / 'l6470.sock'))
+        server.start()
+
+        yield server
+
+        server.shutdown()
+
+    def test_pack(self):
+        values = [None, True, False, 0, -1, 1 << 70, 1.5, 'abc', b'\x00\x01',
+                  [1, [2, 3]], {'KVAL_RUN': 0x39}, Status(0x7e03), l6470.KVAL_RUN]
+        out = bytearray()
+        daemon.pack(values, out)
+
+        value, pos = daemon.unpack(bytes(out))
+        assert pos == len(out)
+        assert value == values
+        assert type(value[11]) is Status
+        assert value[12] is l6470.KVAL_RUN
+
+        with pytest.raises(RuntimeError):
+            daemon.pack(object(), bytearray())
+
+    def test_remote(self, server, tmp_path):
+        with daemon.Client(server.path) as client:
+            assert client.n_devices == 2
+
+            x = client.device(0)
+            x.setParam(l6470.KVAL_RUN, 0x39)
+            assert x.getParamInt(l6470.KVAL_RUN) == 0x39
+            assert server.devices[0].getParamInt(l6470.KVAL_RUN) == 0x39
+            assert type(x.updateStatus()) is Status
+
+            with pytest.raises(daemon.RemoteError):
+                x.goTo('bad')
+
+            # デーモン側のファイルは開かない
+            path = tmp_path / 'profile.json'
+            path.write_text('{"KVAL_RUN": 64}')
+            with pytest.raises(daemon.RemoteError):
+                x.setParams(str(path))
+            assert x.getParamInt(l6470.KVAL_RUN) == 0x39
+            with pytest.raises(AttributeError):
+                x.send
+            with pytest.raises(RuntimeError):
+                client.device(2)
+
+            # バッチ
+            results = client.batch([(0, 'setParams', ({'KVAL_ACC': 0x20},)),
+                                    (1, 'goTo', (100,)),
+                                    (1, 'getParamInt', (l6470.KVAL_ACC,))])
+            assert results[0] == [l6470.KVAL_ACC]
+            assert results[1] is None
+
+            # パイプライン
+            pendings = [client.submit([(1, 'getPosition', ())]) for i in range(10)]
+            positions = [client.wait(p)[0][1] for p in reversed(pendings)]
+            assert all(type(p) is int for p in positions)
+
+    def test_malformed(self, server):
+        # 所有者とグループのみ接続できる
+        assert os.stat(server.path).st_mode & 0o777 == 0o660
+
+        with daemon.Client(server.path) as client:
+            # 未知のアドレスで復号に失敗した以降の呼出しは実行しない
+            payload = bytearray(daemon._REQUEST.pack(7, 3))
+            payload += daemon._CALL.pack(0, daemon._METHOD_IDS['getParam'])
+            payload += b'l' + daemon._U32.pack(1) + b'P\xff'
+            payload += daemon._CALL.pack(0, daemon._METHOD_IDS['getPosition'])
+            payload += b'?'
+            payload += daemon._CALL.pack(0, daemon._METHOD_IDS['getPosition'])
+            client.sock.sendall(daemon._frame(bytes(payload)))
+
+            results = client.wait(daemon.Pending(7))
+            assert [code for code, value in results] == [daemon.ERROR] * 3
+            assert 'アドレス' in results[0][1]
+
+            # 接続は維持される
+            assert client.device(0).getPosition() == 0
+
+        # ヘッダを復号できない場合は切断する
+        with daemon.Client(server.path) as client:
+            client.sock.sendall(daemon._frame(b'\x00'))
+            with pytest.raises(RuntimeError):
+                client.wait(daemon.Pending(0))
+
+    def test_clients(self, server):
+        errors = []
+
+        def worker(index):
+            try:
+                with daemon.Client(server.path) as client:
+                    device = client.device(index % 2)
+                    for i in range(20):
+                        device.setParam(l6470.KVAL_HOLD, index)
+                        device.updateStatus()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
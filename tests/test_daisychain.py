@@ -0,0 +1,81 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import transport
+from l6470 import daisychain
+
+
+class FakeTransport(transport.Transport):
+
+    def __init__(self, recv):
+        self.recv = recv
+        self.sent = []
+
+    def transfer(self, to_send, frame=1):
+        self.sent.append((list(to_send), frame))
+        return list(self.recv[:len(to_send)])
+
+
+class TestClass(object):
+
+    def setup_method(self, method):
+        # 受信データは各フレームのバイト位置が分かる値にする (0x10 x フレーム + 位置)
+        self.fake = FakeTransport([0x10 * i + j for i in range(4) for j in range(3)])
+        self.chain = daisychain.DaisyChain(0, 0, 3, transport=self.fake)
+
+    def test_pack(self):
+        frames = self.chain.pack([(0x51, [0x00, 0x12, 0x34]),
+                                  None,
+                                  (0xb8, [])])
+
+        # 先に送信したバイトほどチェーンの奥(デバイス番号の大きい方)に届く
+        assert frames == [[0xb8, daisychain.NOP, 0x51],
+                          [daisychain.NOP, daisychain.NOP, 0x00],
+                          [daisychain.NOP, daisychain.NOP, 0x12],
+                          [daisychain.NOP, daisychain.NOP, 0x34]]
+
+    def test_unpack(self):
+        cmds = [(0x21, [0x00, 0x00, 0x00]), None, (0x2a, [0x00])]
+        frames = [[0x00, 0x01, 0x02], [0x10, 0x11, 0x12], [0x20, 0x21, 0x22], [0x30, 0x31, 0x32]]
+
+        # 先頭フレームはコマンド送信中の応答のため除く
+        assert self.chain.unpack(cmds, frames) == [[0x12, 0x22, 0x32], [], [0x10]]
+
+    def test_command(self):
+        results = self.chain.getParam([l6470.ABS_POS, None, l6470.KVAL_RUN])
+
+        assert self.fake.sent == [([0x2a, daisychain.NOP, 0x21,
+                                    0x00, daisychain.NOP, 0x00,
+                                    daisychain.NOP, daisychain.NOP, 0x00,
+                                    daisychain.NOP, daisychain.NOP, 0x00], 3)]
+        assert results == [[0x12, 0x22, 0x32], [], [0x10]]
+
+        # パラメータ値にはデータマスクを適用する
+        self.fake.sent = []
+        self.chain.setParam(l6470.MAX_SPEED, [[0xff, 0xff]] * 3)
+        assert self.fake.sent[0][0] == [0x07, 0x07, 0x07, 0x03, 0x03, 0x03, 0xff, 0xff, 0xff]
+
+        self.fake.sent = []
+        self.chain.run([True, False, True], [[0xff, 0x12, 0x34], None, [0x00, 0x00, 0x01]])
+        assert self.fake.sent[0][0] == [0x51, daisychain.NOP, 0x51,
+                                        0x00, daisychain.NOP, 0x0f,
+                                        0x00, daisychain.NOP, 0x12,
+                                        0x01, daisychain.NOP, 0x34]
+        assert self.fake.sent[0][1] == 3
+
+    def test_status(self):
+        statuses = self.chain.updateStatus()
+
+        assert [int(status) for status in statuses] == [0x1222, 0x1121, 0x1020]
+
+    def test_arguments(self):
+        with pytest.raises(RuntimeError):
+            self.chain.command([(0xd0, [0x00, 0x00])] * 2)
+        with pytest.raises(RuntimeError):
+            self.chain.getParam([l6470.ABS_POS, 0x21, None])
+        with pytest.raises(RuntimeError):
+            self.chain.setParam(l6470.ACC, [[0x01]] * 3)
+        with pytest.raises(RuntimeError):
+            daisychain.DaisyChain(0, 0, 0, transport=self.fake)
+
+        assert self.fake.sent == []
@@ -0,0 +1,73 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import aio
+from l6470 import gpio
+
+import asyncio
+import threading
+import time
+
+
+class TestClass(object):
+
+    def test_ioctl(self):
+        # linux/gpio.h の値と一致すること
+        assert gpio.GPIO_GET_LINEEVENT_IOCTL == 0xc030b404
+        assert gpio.GPIOHANDLE_GET_LINE_VALUES_IOCTL == 0xc040b408
+
+    def test_waitIdle(self):
+        busy = gpio.FakeLineEvent(0)
+        waiter = gpio.PinWaiter(busy=busy)
+
+        assert waiter.waitIdle(timeout=0.01) is False
+
+        timer = threading.Timer(0.05, busy.set, (1,))
+        timer.start()
+        start = time.monotonic()
+        assert waiter.waitIdle(timeout=2.0) is True
+        assert time.monotonic() - start < 1.0
+
+        # 既に解除されていれば即座に戻る
+        assert waiter.waitIdle(timeout=0.0) is True
+
+        with pytest.raises(RuntimeError):
+            waiter.waitFlag(timeout=0.0)
+
+        busy.close()
+
+    def test_wait(self):
+        busy = gpio.FakeLineEvent(0)
+        flag = gpio.FakeLineEvent(1)
+        waiter = gpio.PinWaiter(busy=busy, flag=flag)
+
+        assert waiter.wait(timeout=0.01) is None
+
+        threading.Timer(0.02, flag.set, (0,)).start()
+        assert waiter.wait(timeout=2.0) == 'FLAG'
+        assert waiter.waitFlag(timeout=0.0) is True
+
+        busy.close()
+        flag.close()
+
+    def test_aio(self):
+        busy = gpio.FakeLineEvent(0)
+        device = aio.AsyncDevice(l6470.Device(0, 0, transport=sim.SimTransport()),
+                                 pins=gpio.PinWaiter(busy=busy))
+
+        async def main():
+            loop = asyncio.get_event_loop()
+            loop.call_later(0.02, busy.set, 1)
+
+            status = await device.wait_idle(timeout=2.0)
+
+            with pytest.raises(RuntimeError):
+                await device.wait_flag(timeout=0.0)
+
+            return status
+
+        status = asyncio.run(main())
+        assert status.BUSY == 0b1
+
+        busy.close()
@@ -0,0 +1,84 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import homing
+
+
+class TestClass(object):
+
+    @pytest.fixture(autouse=True)
+    def setup_home(self, sim_device):
+        self.clock = sim.ManualClock()
+        self.device = sim_device(acc=2000.0, clock=self.clock)
+        self.chip = self.device.transport.chips[0]
+
+        self.home = homing.Homing(self.device, poll_interval=0.001, timeout=10.0,
+                                  clock=self.clock, sleep=self.clock.advance)
+
+    def test_switch(self):
+        self.chip.setLimits(switch_pos=-200, stop_pos=-1000)
+
+        result = self.home.switch(400.0, slow_speed=20.0)
+
+        assert result.method == 'switch'
+        assert 0 < result.duration < 10.0
+        assert self.device.getPosition() == 0
+        assert abs(self.chip.mech + 200) < 1
+        assert abs(result.position + 200) <= 1
+
+        # MIN_SPEEDは元に戻す
+        assert self.device.getParamInt(l6470.MIN_SPEED) == 0
+
+        report = self.home.repeatability('switch', n=3, backoff=300, fast_speed=400.0, slow_speed=20.0)
+        assert len(report.durations) == 3
+        assert report.spread <= 1
+        assert all(abs(position) <= 1 for position in report.positions)
+
+        with pytest.raises(RuntimeError):
+            self.home.repeatability('unknown')
+
+    def test_switch_missing(self):
+        self.home.timeout = 1.0
+
+        with pytest.raises(RuntimeError):
+            self.home.switch(400.0)
+
+    def test_switch_timeout(self):
+        self.chip.setLimits(switch_pos=-200, stop_pos=-1000)
+        self.device.setParam(l6470.MIN_SPEED, 0x10)
+        self.home.timeout = 1.5
+
+        # RELEASE_SWの途中でタイムアウトしても停止してからMIN_SPEEDを戻す
+        with pytest.raises(RuntimeError):
+            self.home.switch(400.0, slow_speed=2.0)
+
+        assert not self.device.moving
+        assert self.device.getParamInt(l6470.MIN_SPEED) == 0x10
+
+    def test_sensorless(self):
+        self.chip.setLimits(stop_pos=-300)
+
+        # 初期値(2A)ではストールを検出できない
+        self.home.timeout = 2.0
+        with pytest.raises(RuntimeError):
+            self.home.sensorless(200.0)
+
+        self.device.hardStop()
+        self.device.goTo(0)
+        self.home._waitIdle(self.home.clock() + 5.0)
+        self.home.timeout = 10.0
+
+        # 自由回転の相電流(400 + 0.5 x 200 = 500mA強)を越える最小値(17 x 31.25mA) + 余裕
+        stall_th = self.home.calibrate(200.0, margin=2)
+        assert stall_th == 16 + 2
+        assert self.device.getParamInt(l6470.STALL_TH) == stall_th
+
+        report = self.home.repeatability('sensorless', n=3, backoff=200, speed=200.0)
+        assert self.device.getPosition() == 0
+        assert self.chip.mech == -300
+        assert report.spread <= 2
+
+        # 前回の原点(ハードストップ)から検出までの遅れ分だけ行過ぎる
+        assert all(-5 <= position <= 0 for position in report.positions)
+        assert report.max_time < 3.0
@@ -0,0 +1,59 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import transport
+from l6470 import metrics
+
+
+class FailingTransport(transport.Transport):
+
+    def transfer(self, to_send, frame=1):
+        raise IOError('bus error')
+
+
+class TestClass(object):
+
+    def test_names(self):
+        assert metrics.OPCODE_NAMES[0xd0] == 'GET_STATUS'
+        assert metrics.OPCODE_NAMES[0x51] == 'RUN'
+        assert metrics.OPCODE_NAMES[0x8a] == 'GO_UNTIL'
+        assert metrics.OPCODE_NAMES[0x21] == 'GET_PARAM.ABS_POS'
+        assert metrics.OPCODE_NAMES[0x07] == 'SET_PARAM.MAX_SPEED'
+        assert metrics.OPCODE_NAMES[0x00] == 'NOP'
+
+    def test_device(self):
+        m = metrics.Metrics({'axis': 'x'})
+        device = l6470.Device(0, 0, transport=sim.SimTransport(), metrics=m)
+
+        device.updateStatus()
+        device.setParams({'KVAL_RUN': 0x30, 'KVAL_ACC': 0x30})
+        device.setParam(l6470.SPEED, 0x1000)
+        device.updateStatus()
+
+        snapshot = m.snapshot()
+        assert snapshot['labels'] == {'axis': 'x'}
+        assert snapshot['commands']['RESET_DEVICE']['count'] == 1
+        assert snapshot['commands']['GET_STATUS']['count'] == 5
+        assert snapshot['commands']['GET_STATUS']['bytes'] == 15
+        assert snapshot['commands']['SET_PARAM.KVAL_RUN']['count'] == 1
+        assert snapshot['latency']['BATCH']['count'] == 1
+        assert snapshot['latency']['GET_STATUS']['count'] == 3
+        assert snapshot['flags']['NOTPERF_CMD'] == 1
+        assert snapshot['flags']['UVLO'] == 1
+
+        text = m.prometheus()
+        assert 'l6470_commands_total{axis="x",opcode="GET_STATUS"} 5' in text
+        assert 'l6470_transfer_seconds_count{axis="x",opcode="GET_STATUS"} 3' in text
+        assert 'l6470_transfer_seconds_bucket{axis="x",opcode="GET_STATUS",le="+Inf"} 3' in text
+
+    def test_errors(self):
+        m = metrics.Metrics()
+
+        with pytest.raises(IOError):
+            m.transfer(FailingTransport(), [0xd0, 0x00, 0x00])
+
+        assert m.snapshot()['commands']['GET_STATUS']['errors'] == 1
+
+        m.reset()
+        assert m.snapshot()['commands'] == {}
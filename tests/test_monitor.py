@@ -0,0 +1,88 @@
+import pytest
+
+from l6470 import sim
+from l6470 import monitor
+
+import time
+
+
+class TestClass(object):
+
+    def test_history(self):
+        history = monitor.History(4)
+        assert history.latest() is None
+
+        for i in range(6):
+            history.append(float(i), i, -i)
+
+        assert history.latest() == (5.0, 5, -5)
+        assert [s[0] for s in history.read()] == [2.0, 3.0, 4.0, 5.0]
+        assert [s[2] for s in history.read(2)] == [-4, -5]
+
+    def test_history_overwrite(self):
+        history = monitor.History(4)
+        for i in range(4):
+            history.append(float(i), i, -i)
+
+        # 読出し中にモニタスレッドが2サンプルを書込み、3つ目を書込み中
+        class Writer(object):
+            def __init__(self, values):
+                self.values = values
+                self.reads = 0
+
+            def __getitem__(self, index):
+                self.reads += 1
+                if self.reads == 2:
+                    history.append(4.0, 4, -4)
+                    history.append(5.0, 5, -5)
+                    self.values[history.count % history.slots] = -1.0
+                return self.values[index]
+
+            def __setitem__(self, index, value):
+                self.values[index] = value
+
+        history.times = Writer(history.times)
+        samples = history.read()
+
+        assert [s[0] for s in samples] == [2.0, 3.0]
+        assert all(s[0] == -s[2] for s in samples)
+
+    def test_adaptive(self, sim_device):
+        clock = sim.ManualClock()
+        device = sim_device(clock=clock)
+        mon = monitor.StatusMonitor(device, size=16, clock=clock)
+
+        samples = []
+        mon.addListener(lambda i, t, status, position: samples.append(position))
+
+        # 停止中は周期を延ばす
+        mon.poll()
+        clock.advance(mon.poll())
+        mon.poll()
+        assert mon._intervals[0] > mon.fast_interval
+
+        # 加速中は短い周期に戻す
+        device.goTo(500)
+        mon.notify(device)
+        mon.poll()
+        clock.advance(0.1)
+        status = mon.sample(0)
+        assert status.MOT_STATUS == monitor.ACC
+        assert mon._intervals[0] == mon.fast_interval
+
+        clock.advance(5.0)
+        mon.poll()
+        assert samples[-1] == 500
+        assert device.status.BUSY == 0b1
+        assert len(mon.history(device).read()) == len(samples)
+
+    def test_thread(self, sim_device):
+        device = sim_device()
+
+        with monitor.StatusMonitor([device], fast_interval=0.001) as mon:
+            time.sleep(0.05)
+
+        count = mon.history().count
+        assert count > 0
+        time.sleep(0.02)
+        assert mon.history().count == count
@@ -0,0 +1,46 @@
+import pytest
+
+from l6470 import motionqueue
+
+
+class TestClass(object):
+
+    def test_encode(self):
+        assert motionqueue.encode(('goTo', 0x1234)) == [0x60, 0x00, 0x12, 0x34]
+        assert motionqueue.encode(('move', True, 0x10)) == [0x41, 0x00, 0x00, 0x10]
+        assert motionqueue.encode(('goHome',)) == [0x70]
+
+        with pytest.raises(RuntimeError):
+            motionqueue.encode(('hardStop',))
+        with pytest.raises(RuntimeError):
+            motionqueue.encode(('goTo',))
+
+    def test_run(self, sim_device):
+        device = sim_device(10000.0, 50000.0)
+        queue = motionqueue.MotionQueue(device)
+
+        def moves():
+            for pos in [200, -100, 300]:
+                yield ('goTo', pos)
+            yield ('move', False, 50)
+
+        segments = queue.run(moves(), timeout=5.0)
+
+        assert [s.move for s in segments] == list(moves())
+        assert all(s.end > s.start for s in segments)
+        assert all(0 <= gap < 0.05 for gap in queue.gaps())
+        assert device.getPosition() == 250
+
+    def test_background(self, sim_device):
+        device = sim_device(10000.0, 50000.0)
+        queue = motionqueue.MotionQueue(device)
+
+        queue.start([('goTo', 100), ('goTo', 0)], timeout=5.0)
+        segments = queue.join()
+
+        assert len(segments) == 2
+        assert device.getPosition() == 0
+
+        queue.start([('goTo', 100), ('bad',)])
+        with pytest.raises(RuntimeError):
+            queue.join()
@@ -0,0 +1,67 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from l6470 import sim
+from l6470 import planner
+
+import time
+
+
+class TestClass(object):
+
+    def test_profile(self):
+        # 台形: 加速 1s, 定速 1s, 減速 0.5s
+        p = planner.profile(100.0 * 1 / 2 + 100.0 + 100.0 * 0.5 / 2, 100.0, 100.0, 200.0)
+        assert float(p.t_acc) == pytest.approx(1.0)
+        assert float(p.t_const) == pytest.approx(1.0)
+        assert float(p.t_dec) == pytest.approx(0.5)
+        assert float(p.v_peak) == pytest.approx(100.0)
+
+        # 三角形: 最大速度に達しない
+        p = planner.profile(25.0, 100.0, 100.0, 100.0, min_speed=0.0)
+        assert float(p.v_peak) == pytest.approx(50.0)
+        assert float(p.total) == pytest.approx(1.0)
+
+        # MIN_SPEEDから加速する
+        p = planner.profile(100.0, 20.0, 100.0, 100.0, min_speed=10.0)
+        assert float(p.t_acc) == pytest.approx(0.1)
+        assert float(p.t_const) == pytest.approx((100.0 - 3.0) / 20.0)
+
+        assert float(planner.profile(0.0, 100.0, 100.0, 100.0).total) == 0.0
+
+    def test_vectorized(self):
+        distance = np.arange(0, 10000, 10)
+        p = planner.fromRegisters(distance, 0x41, 0x8a, 0x8a, 0, 0x07)
+
+        assert p.total.shape == distance.shape
+        assert np.all(np.diff(p.total) > 0)
+
+        single = planner.fromRegisters(5000, 0x41, 0x8a, 0x8a, 0, 0x07)
+        assert float(p.total[500]) == pytest.approx(float(single.total))
+
+    def test_sim(self, sim_device):
+        clock = sim.ManualClock()
+        device = sim_device(500.0, 1000.0, dec=2000.0, step_mode=0x02, clock=clock)
+        device.setMinSpeed(50.0)
+
+        p = planner.predict(device, target=2000)
+        device.goTo(2000)
+
+        t = 0.0
+        while not device.updateStatus().BUSY:
+            clock.advance(0.001)
+            t += 0.001
+
+        assert t == pytest.approx(float(p.total), rel=0.02)
+
+    def test_waitIdle(self, sim_device):
+        device = sim_device(2000.0, 10000.0)
+
+        p = planner.predict(device, distance=200)
+        start = time.monotonic()
+        device.move(True, 200)
+
+        status = planner.waitIdle(device, p, start=start, timeout=1.0)
+        assert status.BUSY == 0b1
+        assert device.getPosition() == 200
@@ -0,0 +1,102 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import recorder
+from l6470 import bench
+
+
+class TestClass(object):
+
+    def session(self, device):
+        device.setParam(l6470.KVAL_RUN, 0x39)
+        device.setParam(l6470.ABS_POS, 0x1234)
+        device.run(True, 0x1000)
+
+        return [device.updateStatus(), device.getParamInt(l6470.ABS_POS),
+                device.getParamInt(l6470.KVAL_RUN)]
+
+    def test_replay(self, tmp_path):
+        path = str(tmp_path / 'traffic.bin')
+
+        clock = sim.ManualClock()
+        transport = recorder.RecordingTransport(sim.SimTransport(clock=clock), path)
+        device = l6470.Device(0, 0, transport=transport, cache=False)
+        expected = self.session(device)
+        transport.close()
+
+        with recorder.LogReader(path) as log:
+            records = list(log)
+            assert log.count() == len(records)
+        assert records[0].opcode == 0xc0
+        assert records[0].frame == 1
+        assert all(len(r.tx) == len(r.rx) for r in records)
+        assert [r.t for r in records] == sorted(r.t for r in records)
+
+        replay = recorder.ReplayTransport(path)
+        device = l6470.Device(0, 0, transport=replay, cache=False)
+        assert self.session(device) == expected
+
+        with pytest.raises(RuntimeError):
+            device.updateStatus()
+
+        # 記録と異なる送信データ
+        device = l6470.Device(0, 0, transport=recorder.ReplayTransport(path), cache=False)
+        with pytest.raises(RuntimeError):
+            device.setParam(l6470.KVAL_RUN, 0x10)
+
+    def test_truncated(self, tmp_path):
+        path = str(tmp_path / 'traffic.bin')
+
+        transport = recorder.RecordingTransport(sim.SimTransport(), path)
+        device = l6470.Device(0, 0, transport=transport)
+        transport.flush()
+
+        with recorder.LogReader(path) as log:
+            count = log.count()
+
+        with open(path, 'ab') as f:
+            f.write(b'\x00' * 5)
+
+        with recorder.LogReader(path) as log:
+            assert log.count() == count
+
+        with open(str(tmp_path / 'bad.bin'), 'wb') as f:
+            f.write(b'x' * 64)
+        with pytest.raises(RuntimeError):
+            recorder.LogReader(str(tmp_path / 'bad.bin'))
+
+    def test_append(self, tmp_path):
+        path = str(tmp_path / 'traffic.bin')
+
+        for i in range(2):
+            transport = recorder.RecordingTransport(sim.SimTransport(), path)
+            l6470.Device(0, 0, transport=transport).updateStatus()
+            transport.close()
+
+        with recorder.LogReader(path) as log:
+            records = list(log)
+            assert len(log.sessions()) == 2
+            assert log.sessions()[0] <= log.sessions()[1]
+
+        # 記録開始毎に時刻は0から始まる
+        sessions = [[r.t for r in records if r.session == i] for i in range(2)]
+        assert len(sessions[0]) == len(sessions[1]) > 0
+        assert all(t == sorted(t) for t in sessions)
+        assert all(r.frame != recorder.SESSION for r in records)
+
+        replay = recorder.ReplayTransport(path, realtime=True)
+        device = l6470.Device(0, 0, transport=replay)
+        device.updateStatus()
+        l6470.Device(0, 0, transport=replay).updateStatus()
+        assert replay.index == len(records)
+
+    def test_bench(self, tmp_path):
+        path = str(tmp_path / 'traffic.bin')
+
+        transport = recorder.RecordingTransport(sim.SimTransport(), path)
+        self.session(l6470.Device(0, 0, transport=transport))
+        transport.close()
+
+        assert bench.main(['--transport', 'null', '-n', '5', '--filter', 'replay',
+                           '--replay', path]) == 0
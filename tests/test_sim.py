@@ -0,0 +1,404 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import transport
+from l6470 import sim
+from l6470 import daisychain
+
+
+class CountingTransport(transport.Transport):
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.count = 0
+
+    def transfer(self, to_send, frame=1):
+        self.count += 1
+        return self.inner.transfer(to_send, frame)
+
+
+class TestClass(object):
+
+    @classmethod
+    def setup_class(self):
+        self.clock = sim.ManualClock()
+        self.device = l6470.Device(0, 0, transport=sim.SimTransport(clock=self.clock), cache=False)
+
+    def setup_method(self, method):
+        self.device.resetDevice()
+        self.device.getStatus()
+
+    def test_set_get_Param(self):
+        for name in ['ABS_POS', 'EL_POS', 'MARK', 'ACC', 'DEC', 'MAX_SPEED',
+                     'MIN_SPEED', 'FS_SPD', 'KVAL_HOLD', 'KVAL_RUN', 'KVAL_ACC',
+                     'KVAL_DEC', 'INIT_SPEED', 'ST_SLP', 'FN_SLP_ACC',
+                     'FN_SLP_DEC', 'K_THERM', 'OCD_TH', 'STALL_TH',
+                     'STEP_MODE', 'ALARM_EN', 'CONFIG']:
+            param = getattr(l6470, name)
+            send = list(param.mask)
+            self.device.setParam(param, send)
+            recv = self.device.getParam(param)
+            assert send == recv, name
+
+    def test_readonly_Param(self):
+        self.device.setParam(l6470.SPEED, [0x00, 0x10, 0x00])
+        status = self.device.updateStatus()
+
+        assert status['NOTPERF_CMD'] == 0b1
+        assert self.device.getParam(l6470.SPEED) == [0x00, 0x00, 0x00]
+
+    def test_run(self):
+        self.device.setParam(l6470.MAX_SPEED, [0x03, 0xff])
+        self.device.setParam(l6470.STEP_MODE, [0x07])
+
+        self.device.run(True, [0x00, 0x3f, 0xff])
+
+        status = self.device.updateStatus()
+        assert status['BUSY'] == 0b0
+        assert status['MOT_STATUS'] == 0b01
+
+        self.clock.advance(5)
+        status = self.device.updateStatus()
+
+        assert status['BUSY'] == 0b1
+        assert status['DIR'] == 0b1
+        assert status['MOT_STATUS'] == 0b11
+        assert self.device.getParam(l6470.SPEED) == [0x00, 0x3f, 0xff]
+
+        self.device.softStop()
+        self.clock.advance(5)
+        status = self.device.updateStatus()
+
+        assert status['BUSY'] == 0b1
+        assert status['MOT_STATUS'] == 0b00
+
+    def test_goTo(self):
+        self.device.goTo([0x00, 0x10, 0x00])
+
+        self.clock.advance(0.01)
+        status = self.device.updateStatus()
+        assert status['BUSY'] == 0b0
+        assert status['HiZ'] == 0b0
+
+        self.clock.advance(10)
+        status = self.device.updateStatus()
+
+        assert status['BUSY'] == 0b1
+        assert self.device.getParam(l6470.ABS_POS) == [0x00, 0x10, 0x00]
+
+        # 停止中でないとMOVEは実行されない
+        self.device.goToDir(False, [0x00, 0x00, 0x00])
+        self.clock.advance(0.01)
+        self.device.move(True, [0x00, 0x00, 0x10])
+        status = self.device.updateStatus()
+        assert status['NOTPERF_CMD'] == 0b1
+
+    def test_encoders(self):
+        assert l6470.RUN.encode(0xfffff, dir=True) == [0x51, 0x0f, 0xff, 0xff]
+        assert l6470.GO_UNTIL.encode(0x01234, dir=True, act=True) == [0x8b, 0x00, 0x12, 0x34]
+        assert l6470.RELEASE_SW.encoders[True][False]() == [0x9a]
+        assert l6470.GO_TO.encode(0xffffffff) == [0x60, 0x3f, 0xff, 0xff]
+        assert l6470.MAX_SPEED.setter(0xffff) == [0x07, 0x03, 0xff]
+        assert l6470.ABS_POS.getter() == [0x21, 0x00, 0x00, 0x00]
+
+        with pytest.raises(AttributeError):
+            l6470.RUN.foo = 1
+
+    def test_no_mutation(self):
+        speed = [0xff, 0xff, 0xff]
+        self.device.run(True, speed)
+        assert speed == [0xff, 0xff, 0xff]
+
+        values = [0xff, 0xff]
+        self.device.setParam(l6470.MAX_SPEED, values)
+        assert values == [0xff, 0xff]
+        self.device.hardHiz()
+
+    def test_fast(self):
+        device = l6470.Device(0, 0, transport=sim.SimTransport(clock=self.clock), fast=True)
+
+        device.setParam(l6470.KVAL_RUN, [0x39])
+        assert device.getParam(l6470.KVAL_RUN) == [0x39]
+
+        device.goTo([0x00, 0x01, 0x00])
+        self.clock.advance(10)
+        assert device.getParam(l6470.ABS_POS) == [0x00, 0x01, 0x00]
+
+    def test_shadow_cache(self):
+        device = l6470.Device(0, 0, transport=sim.SimTransport(clock=self.clock))
+        chip = device.transport.chips[0]
+
+        device.setParam(l6470.KVAL_RUN, [0x39])
+        device.setParam(l6470.MARK, [0x00, 0x12, 0x34])
+
+        # 書込んだ値はバスを使わずに返る
+        chip.regs[l6470.KVAL_RUN.addr] = 0x00
+        assert device.getParam(l6470.KVAL_RUN) == [0x39]
+        assert device.getParam(l6470.MARK) == [0x00, 0x12, 0x34]
+
+        # 読出しても未書込みのレジスタはチップから取得してキャッシュする
+        assert device.getParam(l6470.KVAL_HOLD) == [0x29]
+        chip.regs[l6470.KVAL_HOLD.addr] = 0x00
+        assert device.getParam(l6470.KVAL_HOLD) == [0x29]
+
+        # 揮発レジスタは常にチップから読出す
+        chip.write(l6470.ABS_POS.addr, 0x000100)
+        assert device.getParam(l6470.ABS_POS) == [0x00, 0x01, 0x00]
+
+        # 移動中は停止中のみキャッシュ可能なレジスタをチップから読出す
+        device.run(True, [0x00, 0x10, 0x00])
+        chip.regs[l6470.MARK.addr] = 0x000042
+        assert device.getParam(l6470.MARK) == [0x00, 0x00, 0x42]
+        device.hardStop()
+
+        # UVLOでキャッシュを破棄する
+        chip.inject('UVLO')
+        device.updateStatus()
+        assert device.getParam(l6470.KVAL_RUN) == [0x00]
+
+        # リセットでキャッシュを破棄する
+        device.setParam(l6470.KVAL_RUN, [0x39])
+        device.resetDevice()
+        assert device.getParam(l6470.KVAL_RUN) == [0x29]
+
+    def test_shadow_rejected(self):
+        device = l6470.Device(0, 0, transport=sim.SimTransport(clock=self.clock))
+        device.setParam(l6470.MIN_SPEED, 0x0010)
+        device.setParam(l6470.ACC, 0x0100)
+        device.setParam(l6470.STEP_MODE, 0x03)
+
+        # 動作中のWS書込みはNOTPERF_CMDで無視され、キャッシュにも残らない
+        device.run(True, 0x1000)
+        self.clock.advance(0.01)
+        device.setParam(l6470.MIN_SPEED, 0x0020)
+        device.setParam(l6470.ACC, 0x0200)
+        assert device.getParam(l6470.MIN_SPEED) == [0x00, 0x10]
+        assert device.getParam(l6470.ACC) == [0x01, 0x00]
+
+        # 残ったNOTPERF_CMDを以降のsetParams()の失敗とみなさない
+        # (書込み前に発生していたアラームはステータスに残す)
+        device.transport.chips[0].inject('OCD')
+        assert device.setParams({'KVAL_RUN': 0x30}) == [l6470.KVAL_RUN]
+        assert device.status.OCD == 0b0
+        assert device.status.NOTPERF_CMD == 0b0
+        assert device.status.BUSY == 0b0
+        with pytest.raises(RuntimeError):
+            device.setParams({'ACC': 0x0300})
+
+        device.hardStop()
+        device.updateStatus()
+        assert device.getParam(l6470.MIN_SPEED) == [0x00, 0x10]
+        assert device.getParam(l6470.ACC) == [0x01, 0x00]
+
+        # HiZでない間のWH書込みもキャッシュしない
+        device.setParam(l6470.STEP_MODE, 0x00)
+        assert device.getParam(l6470.STEP_MODE) == [0x03]
+
+        device.hardHiz()
+        device.updateStatus()
+        device.setParam(l6470.STEP_MODE, 0x00)
+        assert device.getParam(l6470.STEP_MODE) == [0x00]
+
+    def test_setParams(self, tmp_path):
+        counter = CountingTransport(sim.SimTransport(clock=self.clock))
+        device = l6470.Device(0, 0, transport=counter)
+        chip = counter.inner.chips[0]
+
+        profile = {
+            'MAX_SPEED': [0x00, 0x10],
+            'STEP_MODE': [0x03],
+            'KVAL_RUN': 0x39,
+            l6470.ACC: [0x00, 0x20],
+        }
+
+        counter.count = 0
+        written = device.setParams(profile)
+
+        assert counter.count == 1
+        assert written[0] is l6470.STEP_MODE
+        assert chip.regs[l6470.MAX_SPEED.addr] == 0x010
+        assert chip.regs[l6470.STEP_MODE.addr] == 0x03
+        assert chip.regs[l6470.KVAL_RUN.addr] == 0x39
+        assert chip.regs[l6470.ACC.addr] == 0x020
+
+        # 変更のないプロファイルはバスを使わない
+        counter.count = 0
+        assert device.setParams(profile) == []
+        assert counter.count == 0
+
+        path = tmp_path / 'profile.json'
+        path.write_text('{"MAX_SPEED": [0, 16], "KVAL_RUN": 64}')
+        assert device.setParams(str(path)) == [l6470.KVAL_RUN]
+
+        # WHレジスタはHiZ中でないと書込めない
+        device.run(True, [0x00, 0x10, 0x00])
+        with pytest.raises(RuntimeError):
+            device.setParams({'STEP_MODE': [0x02]})
+        assert device.shadow == {}
+        device.hardHiz()
+
+        with pytest.raises(RuntimeError):
+            device.setParams({'SPEED': [0x00, 0x00, 0x00]})
+
+    def test_daisychain(self):
+        transport = sim.SimTransport(3, clock=self.clock)
+        chain = daisychain.DaisyChain(0, 0, 3, transport=transport)
+
+        chain.setParam([l6470.KVAL_RUN, None, l6470.ACC], [[0x12], None, [0x01, 0x23]])
+
+        assert transport.chips[0].regs[l6470.KVAL_RUN.addr] == 0x12
+        assert transport.chips[1].regs[l6470.KVAL_RUN.addr] == 0x29
+        assert transport.chips[2].regs[l6470.ACC.addr] == 0x123
+
+        recv = chain.getParam([l6470.KVAL_RUN, l6470.KVAL_RUN, l6470.ACC])
+        assert recv == [[0x12], [0x29], [0x01, 0x23]]
+
+        transport.chips[1].inject('OCD')
+        status = chain.getStatus()
+        assert [len(s) for s in status] == [2, 2, 2]
+        assert status[1][0] & 0x10 == 0x00
+        assert status[0][0] & 0x10 == 0x10
+
+    def test_attach(self):
+        clock = sim.ManualClock()
+        transport = sim.SimTransport(clock=clock)
+        device = l6470.Device(0, 0, transport=transport)
+        device.setParam(l6470.KVAL_RUN, 0x39)
+        device.setParam(l6470.ABS_POS, 0x1234)
+        device.setParam(l6470.STEP_MODE, 0x00)
+        device.run(True, 0x1000)
+        clock.advance(0.1)
+
+        # リセットせずに接続する
+        counting = CountingTransport(transport)
+        attached = l6470.Device(0, 0, transport=counting, reset=False)
+
+        assert counting.count == 1
+        assert attached.moving
+        assert attached.status.MOT_STATUS != 0b00
+        assert attached.getParamInt(l6470.KVAL_RUN) == 0x39
+        assert attached.getPosition() > 0x1234
+        assert counting.count == 2
+
+        values = attached.readAll()
+        assert values['KVAL_RUN'] == 0x39
+        assert values['STEP_MODE'] == 0x00
+
+    def test_attachAll(self):
+        chips = {}
+
+        def factory(bus, client):
+            chips[(bus, client)] = sim.SimTransport()
+            return chips[(bus, client)]
+
+        devices = l6470.attachAll([(0, 0), (1, 0), (0, 1)], factory=factory, cache=False)
+
+        assert [d.devInfo for d in devices] == [{'bus': 0, 'client': 0},
+                                                {'bus': 1, 'client': 0},
+                                                {'bus': 0, 'client': 1}]
+        assert all(d.transport is chips[(d.devInfo['bus'], d.devInfo['client'])]
+                   for d in devices)
+
+    def test_lazy_import(self):
+        import subprocess
+        import sys
+
+        code = 'import sys, l6470.l6470, l6470.sim; print("spidev" in sys.modules)'
+        out = subprocess.check_output([sys.executable, '-c', code])
+
+        assert out.strip() == b'False'
+
+    def test_snapshot(self):
+        device = l6470.Device(0, 0, transport=sim.SimTransport())
+        device.setParam(l6470.KVAL_RUN, 0x39)
+        device.setParam(l6470.ACC, 0x0123)
+        device.setParam(l6470.ABS_POS, 0x1234)
+
+        counting = CountingTransport(device.transport)
+        device.transport = counting
+        snap = device.snapshot()
+
+        assert counting.count == 1
+        assert len(bytes(snap)) == l6470.SNAPSHOT_SIZE
+        assert snap['KVAL_RUN'] == 0x39
+        assert snap[l6470.ACC] == 0x0123
+        assert snap.getBytes('ABS_POS') == [0x00, 0x12, 0x34]
+        assert list(snap.keys())[-1] == 'STATUS'
+        assert l6470.Snapshot(bytes(snap)) == snap
+
+        with pytest.raises(RuntimeError):
+            l6470.Snapshot(b'\x00')
+
+        # 交換したデバイスに書戻す (WHのレジスタはHiZ中のみ書込める)
+        replaced = l6470.Device(0, 0, transport=sim.SimTransport())
+        assert 'KVAL_RUN' in snap.diff(replaced.snapshot())
+
+        replaced.hardHiz()
+        written = replaced.restore(bytes(snap))
+        assert l6470.SPEED not in written and l6470.STATUS not in written
+        assert [param.rw for param in written] == sorted([param.rw for param in written], reverse=True)
+
+        restored = replaced.snapshot()
+        assert set(snap.diff(restored)) <= set(['SPEED', 'ADC_OUT', 'STATUS'])
+
+        # シャドウキャッシュと一致するレジスタは書込まない
+        assert replaced.restore(snap) == [l6470.ABS_POS]
+        assert replaced.restore(snap, params=['KVAL_RUN', l6470.ACC]) == []
+
+    def test_batch(self):
+        device = l6470.Device(0, 0, transport=sim.SimTransport())
+        counting = CountingTransport(device.transport)
+        device.transport = counting
+
+        with device.batch() as batch:
+            device.setMaxSpeed(500.0)
+            device.setAcc(1000.0)
+            device.setDec(1000.0)
+            device.setParam(l6470.KVAL_RUN, 0x40)
+            written = device.setParams({'KVAL_ACC': 0x40, 'KVAL_DEC': 0x40})
+            device.run(True, 0x1000)
+            status = device.updateStatus()
+            position = device.getPosition()
+
+            assert counting.count == 0
+            assert not status.done()
+
+        assert counting.count == 1
+        assert len(batch) == 11
+        assert written.result() == [l6470.KVAL_ACC, l6470.KVAL_DEC]
+        assert status.result() is device.status
+        assert type(position.result()) is int
+
+        # バッチ外では従来どおり値を返す
+        assert device.getParamInt(l6470.KVAL_RUN) == 0x40
+        assert counting.count == 1
+
+        # シャドウキャッシュから返す値もPendingにする
+        with device.batch():
+            device.setParam(l6470.KVAL_RUN, 0x41)
+            kval = device.getParamInt(l6470.KVAL_RUN)
+            raw = device.getParam(l6470.KVAL_RUN)
+        assert counting.count == 2
+        assert kval.result() == 0x41
+        assert raw.result() == [0x41]
+
+        # 例外で抜けた場合は送信せず、シャドウキャッシュを破棄する
+        with pytest.raises(ValueError):
+            with device.batch():
+                device.setParam(l6470.KVAL_RUN, 0x10)
+                raise ValueError()
+        assert counting.count == 2
+        assert device.shadow == {}
+
+        with device.batch():
+            snap = device.snapshot()
+            with pytest.raises(RuntimeError):
+                device.batch().__enter__()
+        assert snap.result()['KVAL_RUN'] == 0x41
+
+        # 書込めないレジスタのエラーはバッチを抜ける時に発生する
+        with pytest.raises(RuntimeError):
+            with device.batch():
+                failed = device.setParams({'STEP_MODE': 0x00})
+        with pytest.raises(RuntimeError):
+            failed.result()
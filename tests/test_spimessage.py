@@ -0,0 +1,45 @@
+import pytest
+
+from l6470 import spimessage
+
+import ctypes
+
+
+class TestClass(object):
+
+    def setup_method(self, method):
+        self.calls = []
+
+    def ioctl(self, fd, request, xfers):
+        # 送信データを反転して受信データとする
+        self.calls.append((request, len(xfers), [xfer.cs_change for xfer in xfers]))
+        for xfer in xfers:
+            data = ctypes.string_at(xfer.tx_buf, xfer.len)
+            ctypes.memmove(xfer.rx_buf, bytes(0xff ^ value for value in data), xfer.len)
+
+    def test_request(self):
+        assert ctypes.sizeof(spimessage.SpiIocTransfer) == 32
+        assert spimessage.SPI_IOC_MESSAGE(1) == 0x40206b00
+        assert spimessage.MAX_SEGMENTS == 511
+
+        # ioctlリクエスト値のサイズは14bit
+        spimessage.SPI_IOC_MESSAGE(spimessage.MAX_SEGMENTS)
+        with pytest.raises(RuntimeError):
+            spimessage.SPI_IOC_MESSAGE(spimessage.MAX_SEGMENTS + 1)
+
+    def test_transfer(self, monkeypatch):
+        monkeypatch.setattr(spimessage.fcntl, 'ioctl', self.ioctl)
+        msg = spimessage.SpiMessage(3)
+
+        assert msg.transfer([0x21, 0x00, 0x00, 0x00]) == [0xde, 0xff, 0xff, 0xff]
+        assert self.calls == [(spimessage.SPI_IOC_MESSAGE(4), 4, [1, 1, 1, 0])]
+
+        # 上限を超えるセグメント数は分割して送受信する
+        self.calls = []
+        to_send = [i & 0xff for i in range(2 * 1200)]
+        assert msg.transfer(to_send, frame=2) == [0xff ^ value for value in to_send]
+        assert [(n, cs[-1]) for request, n, cs in self.calls] == [(511, 0), (511, 0), (178, 0)]
+        assert self.calls[0][0] == spimessage.SPI_IOC_MESSAGE(511)
+
+        with pytest.raises(RuntimeError):
+            msg.transfer([0x00] * 3, frame=2)
@@ -0,0 +1,41 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import status
+
+
+class TestClass(object):
+
+    def test_fields(self):
+        s = l6470.Status.fromBytes([0x7e, 0x73])
+
+        assert s == 0x7e73
+        assert s.raw == 0x7e73
+        assert s['HiZ'] == 0b1
+        assert s.BUSY == 0b1
+        assert s['SW_F'] == 0b0
+        assert s['SW_EVN'] == 0b0
+        assert s.DIR == 0b1
+        assert s['MOT_STATUS'] == status.CONST
+        assert s.NOTPERF_CMD == 0b0
+        assert s['WRONG_CMD'] == 0b0
+        assert s.UVLO == 0b1
+        assert s['OCD'] == 0b1
+        assert s.STEP_LOSS_B == 0b1
+        assert s.SCK_MOD == 0b0
+
+        assert len(s.keys()) == 15
+        assert s.asdict()['MOT_STATUS'] == 0b11
+        assert status.StatusFlag.BUSY in s.flags
+        assert status.StatusFlag.SCK_MOD not in s.flags
+
+    def test_compare(self):
+        a = l6470.Status(0x7e03)
+        b = l6470.Status.fromBytes([0x7e, 0x03])
+
+        assert a == b
+        assert a != l6470.Status(0x7c03)
+        assert {a: 1}[b] == 1
+
+        with pytest.raises(AttributeError):
+            a.foo = 1
@@ -0,0 +1,133 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import monitor
+from l6470 import statusboard
+
+import os
+import subprocess
+import sys
+import threading
+
+
+class TestClass(object):
+
+    def test_publish(self, tmp_path):
+        path = str(tmp_path / 'board')
+
+        with statusboard.StatusBoard(2, path) as board:
+            reader = statusboard.BoardReader(path)
+            assert len(reader) == 2
+            assert reader.read(0) is None
+
+            board.publish(1, 1.5, 0x7e03, -100, 250.0)
+            state = reader.read(1)
+            assert state.t == 1.5
+            assert state.status.BUSY == 1
+            assert state.position == -100
+            assert state.speed == 250.0
+            assert state.count == 1
+            assert not state.busy
+            assert not state.fault
+
+            board.publish(1, 2.0, 0x7c01, 0)
+            state = reader.readAll()[1]
+            assert state.busy
+            assert state.fault
+            assert state.count == 2
+
+            with pytest.raises(RuntimeError):
+                reader.read(2)
+
+            reader.close()
+
+        with open(path, 'wb') as f:
+            f.write(bytes(64))
+        with pytest.raises(RuntimeError):
+            statusboard.BoardReader(path)
+
+    def test_reopen(self, tmp_path):
+        path = str(tmp_path / 'board')
+
+        board = statusboard.StatusBoard(2, path)
+        board.publish(1, 1.0, 0x7e03, 10)
+        board.close()
+        reader = statusboard.BoardReader(path)
+        seq = reader.map[128]
+
+        # 読出し中のファイルを切詰めず、スロットはシーケンスロックで初期化する
+        board = statusboard.StatusBoard(1, path)
+        assert os.path.getsize(path) == 64 + 64 * 2
+        assert reader.read(0) is None
+        assert reader.map[128] == seq
+        assert reader.map[64] == 4
+
+        board.publish(0, 2.0, 0x7e03, 20)
+        assert reader.read(0).position == 20
+
+        reader.close()
+        board.close(unlink=True)
+
+    def test_consistent(self, tmp_path):
+        path = str(tmp_path / 'board')
+        board = statusboard.StatusBoard(1, path)
+        reader = statusboard.BoardReader(path)
+
+        # 書込み中の値を読まないことを確認する (位置と速度は常に同じ値)
+        stop = threading.Event()
+
+        def writer():
+            n = 0
+            while not stop.is_set():
+                n += 1
+                board.publish(0, float(n), 0x7e03, n, float(n))
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for i in range(20000):
+                state = reader.read(0)
+                if state is not None:
+                    assert state.position == state.speed == state.t
+        finally:
+            stop.set()
+            thread.join()
+
+        # 書込み中のまま止まったスロットはエラーにする
+        board.map[64:68] = b'\x01\x00\x00\x00'
+        reader.retries = 10
+        with pytest.raises(RuntimeError):
+            reader.read(0)
+
+        reader.close()
+        board.close(unlink=True)
+
+    def test_monitor(self, tmp_path):
+        path = str(tmp_path / 'board')
+        clock = sim.ManualClock()
+        device = l6470.Device(0, 0, transport=sim.SimTransport(clock=clock))
+        device.setMaxSpeed(1000.0)
+        device.setAcc(1000.0)
+        device.setDec(1000.0)
+
+        mon = monitor.StatusMonitor(device, speed=True, clock=clock)
+        board = statusboard.StatusBoard(1, path)
+        board.attach(mon)
+
+        device.goTo(100000)
+        clock.advance(0.2)
+        mon.sample(0)
+
+        # 別プロセスから読出す
+        code = ('from l6470 import statusboard\n'
+                'state = statusboard.BoardReader({!r}).read(0)\n'
+                'print(state.position, int(state.speed), int(state.busy))').format(path)
+        out = subprocess.check_output([sys.executable, '-c', code]).split()
+
+        t, status, position = mon.history(0).latest()
+        assert int(out[0]) == position > 0
+        assert int(out[1]) == int(mon.history(0).latestSpeed()) > 0
+        assert out[2] == b'1'
+
+        board.close(unlink=True)
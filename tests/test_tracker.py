@@ -0,0 +1,65 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import tracker
+
+import math
+
+
+class TestClass(object):
+
+    def test_feed(self):
+        t = tracker.PositionTracker(max_speed=1000.0, microsteps=128)
+
+        assert t.feed(0.0, 0x3ffff0) == -0x10
+
+        # 正転で0x3fffffから0へ周回
+        t.feed(0.01, 0x3ffff0 + 0x100 - tracker.WRAP, 1)
+        assert t.position == 0xf0
+        assert not t.ambiguous
+
+        # 逆転
+        t.feed(0.02, 0x3fff00, 0)
+        assert t.position == -0x100
+
+        # 半周期以上、1周期未満はDIRで判定する
+        t.feed(20.0, 0x3fff00 + 0x300000 - tracker.WRAP, 1)
+        assert t.position == -0x100 + 0x300000
+        assert not t.ambiguous
+
+        # 1周期以上は判定できない
+        t.feed(60.0, 0x000000, 1)
+        assert t.ambiguous
+        assert t.ambiguous_count == 1
+
+        strict = tracker.PositionTracker(max_speed=1000.0, microsteps=128, strict=True)
+        strict.feed(0.0, 0)
+        with pytest.raises(RuntimeError):
+            strict.feed(60.0, 0, 1)
+
+    def test_minPollRate(self):
+        assert tracker.minPollRate(1000.0, 128) == pytest.approx(1000.0 * 128 / 2 ** 21)
+        assert tracker.minPollRate(1000.0, 128, True) == pytest.approx(1000.0 * 128 / 2 ** 22)
+
+    def test_sim(self):
+        clock = sim.ManualClock()
+        transport = sim.SimTransport(clock=clock)
+        device = l6470.Device(0, 0, transport=transport)
+        device.setMaxSpeed(15000.0)
+        device.setAcc(50000.0)
+
+        t = tracker.PositionTracker(device, clock=clock)
+        t.reset(0)
+
+        # 約2秒で1周する速度で逆転
+        device.runSpeed(-15000.0)
+        interval = 0.9 / t.minPollRate()
+        for i in range(40):
+            clock.advance(interval)
+            t.update()
+
+        assert not t.ambiguous
+        assert t.wraps <= -5
+        assert t.position == math.floor(transport.chips[0].pos)
+        assert t.position < -tracker.WRAP * 5
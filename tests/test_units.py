@@ -0,0 +1,75 @@
+import pytest
+
+from l6470 import l6470
+from l6470 import sim
+from l6470 import units
+
+
+class TestClass(object):
+
+    def test_speed(self):
+        # データシートの換算値
+        assert units.regToSpeed(1) == pytest.approx(0.0149, abs=1e-4)
+        assert units.regToAcc(1) == pytest.approx(14.55, abs=1e-2)
+        assert units.regToMaxSpeed(1) == pytest.approx(15.25, abs=1e-2)
+        assert units.regToMinSpeed(1) == pytest.approx(0.238, abs=1e-3)
+        assert units.regToFsSpd(0) == pytest.approx(7.63, abs=1e-2)
+
+        for value in [0, 1, 0x123, 0xfffff]:
+            assert units.speedToReg(units.regToSpeed(value)) == value
+        for value in [0, 0x8a, 0xffe]:
+            assert units.accToReg(units.regToAcc(value)) == value
+        for value in [0, 0x41, 0x3ff]:
+            assert units.maxSpeedToReg(units.regToMaxSpeed(value)) == value
+            assert units.fsSpdToReg(units.regToFsSpd(value)) == value
+        for value in [0, 0x123, 0xfff]:
+            assert units.minSpeedToReg(units.regToMinSpeed(value)) == value
+
+        assert units.speedToReg(-1.0) == 0
+        assert units.maxSpeedToReg(1e9) == 0x3ff
+
+    def test_signed22(self):
+        assert units.toSigned22(0x000000) == 0
+        assert units.toSigned22(0x1fffff) == 0x1fffff
+        assert units.toSigned22(0x200000) == -0x200000
+        assert units.toSigned22(0x3fffff) == -1
+        assert units.fromSigned22(-1) == 0x3fffff
+        assert units.fromSigned22(-0x200000) == 0x200000
+
+    def test_device(self):
+        clock = sim.ManualClock()
+        device = l6470.Device(0, 0, transport=sim.SimTransport(clock=clock))
+
+        device.setMaxSpeed(1000.0)
+        device.setAcc(2000.0)
+        device.setDec(2000.0)
+        device.setParam(l6470.STEP_MODE, 0x02)
+        assert device.getParamInt(l6470.MAX_SPEED) == units.maxSpeedToReg(1000.0)
+        assert device.getMicrosteps() == 4
+
+        device.goTo(-100)
+        clock.advance(5)
+        assert device.getPosition() == -100
+        assert device.getParam(l6470.ABS_POS) == [0x3f, 0xff, 0x9c]
+
+        device.moveSteps(150)
+        clock.advance(5)
+        assert device.getPosition() == 50
+
+        device.setParam(l6470.MARK, -5)
+        assert device.getMark() == -5
+
+        device.runSpeed(-500.0)
+        clock.advance(5)
+        assert device.updateStatus().DIR == 0b0
+        assert device.getSpeed() == pytest.approx(500.0, abs=0.1)
+
+        # レジスタの範囲外の値はマスクせずにエラーにする
+        with pytest.raises(RuntimeError):
+            device.move(True, -1)
+        with pytest.raises(RuntimeError):
+            device.moveSteps(0x400000)
+        with pytest.raises(RuntimeError):
+            device.run(True, 0x100000)
+        with pytest.raises(RuntimeError):
+            device.goUntil(False, True, -1)